@@ -2,17 +2,37 @@ from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 import uvicorn
+import os
 from contextlib import asynccontextmanager
 
 from app.routers import courses, colleges, aptitude, ai_recommendations, enhanced_ai, users
 from app.services.database import connect_to_mongo, close_mongo_connection
+from app.services.migrations import migrate_on_startup
+from app.services.groq_service import close_http_client
+from app.services.web_scraper import open_http_session, close_http_session
+from app.services.crawler import crawler
+from app.services.html_parser import html_parser_pool
+from app.services.question_bank import answer_key_cache
+from app.services.deadline import DeadlineMiddleware, DeadlineExceeded, deadline_exceeded_handler
+from app.services.pagination import InvalidCursorError, invalid_cursor_handler, NEXT_CURSOR_HEADER
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     await connect_to_mongo()
+    await migrate_on_startup()
+    await answer_key_cache.start()
+    await open_http_session()
+    if crawler is not None:
+        crawler.start()
     yield
     # Shutdown
+    if crawler is not None:
+        await crawler.stop()
+    await answer_key_cache.stop()
+    await close_http_session()
+    html_parser_pool.shutdown()
+    await close_http_client()
     await close_mongo_connection()
 
 app = FastAPI(
@@ -29,8 +49,31 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Browsers only let page scripts read the paging cursor header when it is exposed
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
+# Request deadlines (seconds); clients may ask for a shorter or longer budget
+# with the X-Request-Timeout header, capped at REQUEST_TIMEOUT_MAX
+app.add_middleware(
+    DeadlineMiddleware,
+    default_timeout=float(os.getenv("REQUEST_TIMEOUT_DEFAULT", "30")),
+    max_timeout=float(os.getenv("REQUEST_TIMEOUT_MAX", "120")),
+    route_timeouts={
+        "/api/ai-enhanced/recommendations/comprehensive": 45,
+        "/api/ai-enhanced/chat": 30,
+        "/api/ai-enhanced": 20,
+        "/api/ai": 30,
+        "/api/courses/recommendations": 30,
+        "/api/users": 30,
+        "/api/colleges": 10,
+        "/api/aptitude/submit/batch": 60,
+        "/api/aptitude": 10,
+    }
+)
+app.add_exception_handler(DeadlineExceeded, deadline_exceeded_handler)
+app.add_exception_handler(InvalidCursorError, invalid_cursor_handler)
+
 # Include routers
 app.include_router(courses.router, prefix="/api/courses", tags=["courses"])
 app.include_router(colleges.router, prefix="/api/colleges", tags=["colleges"])
@@ -44,7 +44,7 @@ class AptitudeQuestion(BaseModel):
     time_limit: int  # in seconds
 
 class AptitudeResult(BaseModel):
-    id: Optional[str] = Field(alias="_id")
+    id: Optional[str] = Field(None, alias="_id")
     user_id: str
     test_type: str
     score: int
@@ -1,11 +1,16 @@
 from fastapi import APIRouter, HTTPException, Body
+from fastapi.responses import StreamingResponse
 from typing import List, Dict, Any
 from app.services.database import get_database
-from app.services.groq_service import GroqService
+from app.services.groq_service import groq_service
+from app.services.llm_scheduler import LLMUnavailableError
+from app.services.deadline import DeadlineExceeded, max_time_ms
+from app.services.streaming import sse_event, SSE_HEADERS
+from app.services.projections import college_projection, course_projection
+from app.services.search import college_search, course_search, regex_any
 import json
 
 router = APIRouter()
-groq_service = GroqService()
 
 @router.post("/recommendations/personalized")
 async def get_personalized_recommendations(
@@ -21,14 +26,14 @@ async def get_personalized_recommendations(
     db = get_database()
     
     # Get user data
-    user = await db.users.find_one({"_id": user_id})
+    user = await db.users.find_one({"_id": user_id}, max_time_ms=max_time_ms())
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     # Get user's aptitude results
     aptitude_results = []
     if user.get("aptitude_results"):
-        cursor = db.aptitude_results.find({"_id": {"$in": user["aptitude_results"]}})
+        cursor = db.aptitude_results.find({"_id": {"$in": user["aptitude_results"]}}, max_time_ms=max_time_ms())
         aptitude_results = await cursor.to_list(length=None)
     
     # Prepare data for AI analysis
@@ -63,6 +68,10 @@ async def get_personalized_recommendations(
             "next_steps": recommendations.get("next_steps", [])
         }
         
+    except LLMUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"AI service error: {str(e)}")
 
@@ -80,16 +89,50 @@ async def ai_chat(
     
     try:
         # Get AI response
-        ai_response = await groq_service.get_chat_response(message, context)
+        ai_response = await groq_service.get_chat_response(
+            message, context, bypass_cache=bool(payload.get("bypass_cache", False))
+        )
         
         return {
             "response": ai_response,
             "suggestions": generate_follow_up_suggestions(message)
         }
         
+    except LLMUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"AI service error: {str(e)}")
 
+@router.post("/chat/stream")
+async def ai_chat_stream(
+    payload: Dict[str, Any] = Body(...)
+):
+    """AI-powered career guidance chat streamed as Server-Sent Events"""
+    message = payload.get("message")
+    context = payload.get("context", {})
+    
+    if not message:
+        raise HTTPException(status_code=400, detail="Message is required")
+    
+    async def event_stream():
+        try:
+            async for chunk in groq_service.stream_chat_response(
+                message, context, bypass_cache=bool(payload.get("bypass_cache", False))
+            ):
+                yield sse_event({"content": chunk}, event="token")
+        except LLMUnavailableError as e:
+            yield sse_event({"detail": str(e), "status_code": 503}, event="error")
+            return
+        except Exception as e:
+            yield sse_event({"detail": f"AI service error: {str(e)}", "status_code": 500}, event="error")
+            return
+        
+        yield sse_event({"suggestions": generate_follow_up_suggestions(message)}, event="suggestions")
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
 @router.post("/analyze/skills")
 async def analyze_skills(
     payload: Dict[str, Any] = Body(...)
@@ -111,6 +154,10 @@ async def analyze_skills(
             "recommended_courses": analysis.get("courses", [])
         }
         
+    except LLMUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"AI service error: {str(e)}")
 
@@ -132,25 +179,33 @@ async def get_market_trends(
             "growth_predictions": trends.get("growth", [])
         }
         
+    except LLMUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"AI service error: {str(e)}")
 
+@router.get("/service/stats")
+async def get_ai_service_stats():
+    """Get AI service scheduling statistics"""
+    return groq_service.get_stats()
+
 async def find_matching_courses(db, course_suggestions: List[str]) -> List[Dict]:
     """Find courses matching AI suggestions"""
     if not course_suggestions:
         return []
     
-    # Create search query for course suggestions
-    query = {
-        "$or": [
-            {"title": {"$regex": "|".join(course_suggestions), "$options": "i"}},
-            {"category": {"$in": course_suggestions}},
-            {"skills": {"$in": course_suggestions}}
-        ]
-    }
-    
-    cursor = db.courses.find(query).limit(5)
-    courses = await cursor.to_list(length=None)
+    # Any word of any suggestion through the text index, most relevant first
+    fallback_query = regex_any(["title"], course_suggestions)
+    fallback_query["$or"] += [
+        {"category": {"$in": course_suggestions}},
+        {"skills": {"$in": course_suggestions}}
+    ]
+    courses, _ = await course_search.find(
+        db, " ".join(course_suggestions), {}, [], 5, fallback_query,
+        prefix=False, projection=course_projection.resolve("card"), max_time_ms=max_time_ms()
+    )
     
     # Convert ObjectId to string
     for course in courses:
@@ -163,17 +218,16 @@ async def find_matching_colleges(db, college_suggestions: List[str]) -> List[Dic
     if not college_suggestions:
         return []
     
-    # Create search query for college suggestions
-    query = {
-        "$or": [
-            {"courses_offered": {"$in": college_suggestions}},
-            {"type": {"$in": college_suggestions}},
-            {"name": {"$regex": "|".join(college_suggestions), "$options": "i"}}
-        ]
-    }
-    
-    cursor = db.colleges.find(query).limit(5)
-    colleges = await cursor.to_list(length=None)
+    # The text index covers name, location, type and courses offered
+    fallback_query = regex_any(["name"], college_suggestions)
+    fallback_query["$or"] += [
+        {"courses_offered": {"$in": college_suggestions}},
+        {"type": {"$in": college_suggestions}}
+    ]
+    colleges, _ = await college_search.find(
+        db, " ".join(college_suggestions), {}, [("ranking", 1)], 5, fallback_query,
+        prefix=False, projection=college_projection.resolve("card"), max_time_ms=max_time_ms()
+    )
     
     # Convert ObjectId to string
     for college in colleges:
@@ -1,45 +1,45 @@
-from fastapi import APIRouter, HTTPException, Body
-from typing import List, Dict, Any
+from fastapi import APIRouter, HTTPException, Body, Query
+from typing import List, Dict, Any, Optional
+import asyncio
+import os
+import time
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
 from app.services.database import get_database
+from app.services.deadline import max_time_ms, with_deadline
+from app.services.grading import GradedSubmission, grade_submissions
+from app.services.pagination import MAX_PAGE_SIZE, fetch_page
+from app.services.projections import aptitude_result_projection
+from app.services.question_bank import NotEnoughQuestionsError, answer_key_cache, sample_questions
+from app.services.serialization import FastJSONResponse
 from app.models.schemas import AptitudeQuestion, AptitudeResult
 from datetime import datetime
-import random
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+BATCH_MAX_SUBMISSIONS = int(os.getenv("APTITUDE_BATCH_MAX_SUBMISSIONS", "10000"))
+
 @router.get("/questions/{test_type}")
 async def get_aptitude_questions(
     test_type: str,
     difficulty: str = "mixed",
-    count: int = 10
+    count: int = Query(10, ge=1, le=100)
 ):
     """Get aptitude test questions"""
     db = get_database()
     
-    # Build query
-    query = {"category": test_type}
-    if difficulty != "mixed":
-        query["difficulty"] = difficulty
-    
-    # Get questions from database
-    cursor = db.aptitude_questions.find(query)
-    all_questions = await cursor.to_list(length=None)
-    
-    if len(all_questions) < count:
-        raise HTTPException(
-            status_code=404, 
-            detail=f"Not enough {test_type} questions available"
-        )
-    
-    # Randomly select questions
-    selected_questions = random.sample(all_questions, count)
+    # Sampled in the database, without correct answers or explanations
+    try:
+        selected_questions = await sample_questions(db, test_type, difficulty, count, max_time_ms=max_time_ms())
+    except NotEnoughQuestionsError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     
-    # Convert ObjectId to string and remove correct_answer for test
+    # Convert ObjectId to string
     for question in selected_questions:
         question["_id"] = str(question["_id"])
-        # Don't send correct answer to client
-        question.pop("correct_answer", None)
-        question.pop("explanation", None)
     
     return {"questions": selected_questions, "test_type": test_type}
 
@@ -58,57 +58,16 @@ async def submit_aptitude_test(
     if not user_id or not test_type or not answers:
         raise HTTPException(status_code=400, detail="Missing required fields")
     
-    # Get correct answers
-    question_ids = list(answers.keys())
-    cursor = db.aptitude_questions.find({"_id": {"$in": question_ids}})
-    questions = await cursor.to_list(length=None)
-    
-    # Calculate score
-    correct_answers = 0
-    total_questions = len(questions)
-    category_scores = {}
-    
-    for question in questions:
-        question_id = str(question["_id"])
-        user_answer = answers.get(question_id)
-        correct_answer = question["correct_answer"]
-        category = question["category"]
-        
-        # Initialize category score if not exists
-        if category not in category_scores:
-            category_scores[category] = {"correct": 0, "total": 0}
-        
-        category_scores[category]["total"] += 1
-        
-        if user_answer == correct_answer:
-            correct_answers += 1
-            category_scores[category]["correct"] += 1
-    
-    # Calculate percentage scores
-    overall_score = (correct_answers / total_questions) * 100
-    for category in category_scores:
-        total = category_scores[category]["total"]
-        correct = category_scores[category]["correct"]
-        category_scores[category]["percentage"] = (correct / total) * 100
-    
-    # Generate recommendations based on performance
-    recommendations = generate_recommendations(overall_score, category_scores, test_type)
-    
-    # Save result
-    result = AptitudeResult(
-        user_id=user_id,
-        test_type=test_type,
-        score=int(overall_score),
-        total_questions=total_questions,
-        time_taken=time_taken,
-        category_scores=category_scores,
-        recommendations=recommendations
-    )
+    # Get correct answers from the in-memory answer keys
+    answer_keys = await answer_key_cache.get_many(list(answers.keys()), max_time_ms=max_time_ms())
+    graded = grade_submissions([answers], answer_keys)[0]
+    if graded is None:
+        raise HTTPException(status_code=400, detail="None of the answered questions exist")
     
     # Insert into database
-    result_dict = result.dict()
-    result_dict.pop("id", None)  # Remove id field for insertion
-    insert_result = await db.aptitude_results.insert_one(result_dict)
+    result_dict = build_result(user_id, test_type, time_taken, graded)
+    # Inserts take no maxTimeMS, so bound the wait on the client instead
+    insert_result = await with_deadline(db.aptitude_results.insert_one(result_dict), what="saving the result")
     
     # Update user's aptitude results
     await db.users.update_one(
@@ -118,27 +77,165 @@ async def submit_aptitude_test(
     
     return {
         "result_id": str(insert_result.inserted_id),
-        "score": int(overall_score),
-        "total_questions": total_questions,
-        "correct_answers": correct_answers,
-        "category_scores": category_scores,
-        "recommendations": recommendations,
-        "performance_level": get_performance_level(overall_score)
+        "score": result_dict["score"],
+        "total_questions": graded.total_questions,
+        "correct_answers": graded.correct_answers,
+        "category_scores": graded.category_scores,
+        "recommendations": result_dict["recommendations"],
+        "performance_level": get_performance_level(graded.score)
+    }
+
+@router.post("/submit/batch")
+async def submit_aptitude_tests_batch(
+    payload: Dict[str, Any] = Body(...)
+):
+    """Grade and save many submissions at once, e.g. a whole exam session
+
+    Body: {"submissions": [{"user_id", "test_type", "answers", "time_taken"}, ...]}. Submissions
+    that cannot be graded are reported under "failed" with their index; the rest are saved.
+    """
+    db = get_database()
+    started = time.perf_counter()
+    
+    submissions = payload.get("submissions")
+    if not isinstance(submissions, list) or not submissions:
+        raise HTTPException(status_code=400, detail="submissions must be a non-empty list")
+    if len(submissions) > BATCH_MAX_SUBMISSIONS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {BATCH_MAX_SUBMISSIONS} submissions per batch"
+        )
+    
+    failed = []
+    valid = []
+    for index, submission in enumerate(submissions):
+        if not isinstance(submission, dict):
+            failed.append({"index": index, "error": "Submission must be an object"})
+        elif not submission.get("user_id") or not submission.get("test_type") or not submission.get("answers"):
+            failed.append({"index": index, "error": "Missing required fields"})
+        elif not isinstance(submission["answers"], dict):
+            failed.append({"index": index, "error": "answers must map question ids to answers"})
+        else:
+            valid.append((index, submission))
+    
+    # One answer key lookup for the whole batch, then grade every submission in NumPy off the event loop
+    question_ids = list({question_id for _, submission in valid for question_id in submission["answers"]})
+    answer_keys = await answer_key_cache.get_many(question_ids, max_time_ms=max_time_ms())
+    grading_started = time.perf_counter()
+    graded = await asyncio.to_thread(
+        grade_submissions, [submission["answers"] for _, submission in valid], answer_keys
+    )
+    grading_seconds = time.perf_counter() - grading_started
+    
+    documents = []
+    saved = []
+    for (index, submission), result in zip(valid, graded):
+        if result is None:
+            failed.append({"index": index, "error": "None of the answered questions exist"})
+            continue
+        try:
+            documents.append(build_result(
+                submission["user_id"], submission["test_type"], submission.get("time_taken", 0), result
+            ))
+        except ValueError as e:
+            failed.append({"index": index, "error": f"Invalid submission: {e}"})
+            continue
+        saved.append((index, result))
+    
+    # One bulk insert for the results and one bulk write for the users' result lists
+    results = []
+    result_ids: Dict[str, List[str]] = {}
+    if documents:
+        try:
+            await with_deadline(db.aptitude_results.insert_many(documents, ordered=False), what="saving the results")
+            write_errors = []
+        except BulkWriteError as e:
+            # Unordered: every document without a write error was still inserted
+            write_errors = e.details.get("writeErrors", [])
+            logger.warning(f"{len(write_errors)} of {len(documents)} aptitude results could not be saved")
+        rejected = {error["index"]: error.get("errmsg", "write failed") for error in write_errors}
+        
+        for position, (document, (index, result)) in enumerate(zip(documents, saved)):
+            if position in rejected:
+                failed.append({"index": index, "error": f"Could not save result: {rejected[position]}"})
+                continue
+            # insert_many sets _id on each document it sends
+            inserted_id = document["_id"]
+            result_ids.setdefault(document["user_id"], []).append(str(inserted_id))
+            results.append({
+                "index": index,
+                "result_id": str(inserted_id),
+                "user_id": document["user_id"],
+                "score": document["score"],
+                "correct_answers": result.correct_answers,
+                "total_questions": result.total_questions,
+                "performance_level": get_performance_level(result.score)
+            })
+    # Users whose result lists were not updated; their results are saved but not linked to them
+    unlinked_users: List[str] = []
+    if result_ids:
+        user_ids = list(result_ids)
+        try:
+            await db.users.bulk_write([
+                UpdateOne({"_id": user_id}, {"$push": {"aptitude_results": {"$each": result_ids[user_id]}}})
+                for user_id in user_ids
+            ], ordered=False)
+        except BulkWriteError as e:
+            # Unordered: every user without a write error was still updated
+            unlinked_users = [user_ids[error["index"]] for error in e.details.get("writeErrors", [])]
+            logger.warning(f"Could not add aptitude results to {len(unlinked_users)} of {len(user_ids)} users: {unlinked_users}")
+        except PyMongoError as e:
+            unlinked_users = user_ids
+            logger.warning(f"Could not add aptitude results to {len(user_ids)} users: {e}")
+    
+    total_seconds = time.perf_counter() - started
+    stats = {
+        "submissions": len(submissions),
+        "graded": len(results),
+        "failed": len(failed),
+        "unlinked_users": len(unlinked_users),
+        "grading_seconds": round(grading_seconds, 4),
+        "total_seconds": round(total_seconds, 4),
+        "grading_submissions_per_second": round(len(valid) / grading_seconds, 1) if grading_seconds else None,
+        "submissions_per_second": round(len(submissions) / total_seconds, 1) if total_seconds else None
+    }
+    logger.info(f"Graded aptitude batch: {stats}")
+    
+    return {
+        "results": results,
+        "failed": sorted(failed, key=lambda item: item["index"]),
+        "unlinked_users": sorted(unlinked_users),
+        "stats": stats
     }
 
 @router.get("/results/{user_id}")
-async def get_user_aptitude_results(user_id: str):
-    """Get all aptitude test results for a user"""
+async def get_user_aptitude_results(
+    user_id: str,
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    skip: int = Query(0, ge=0, description="Offset; prefer cursor for deep pages"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    view: str = Query("full", description="full or card (test type, score, question count and date)"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return instead of a view")
+):
+    """Get a user's aptitude test results, newest first"""
     db = get_database()
     
-    cursor = db.aptitude_results.find({"user_id": user_id}).sort("completed_at", -1)
-    results = await cursor.to_list(length=None)
+    try:
+        projection = aptitude_result_projection.resolve(view, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    # Convert ObjectId to string
-    for result in results:
-        result["_id"] = str(result["_id"])
+    results, next_cursor = await fetch_page(
+        db.aptitude_results, {"user_id": user_id}, [("completed_at", -1)], limit, cursor, skip,
+        projection=projection, max_time_ms=max_time_ms()
+    )
     
-    return {"results": results}
+    return FastJSONResponse({"results": results, "next_cursor": next_cursor})
+
+@router.get("/answer-keys/status")
+async def get_answer_key_cache_status():
+    """Size, freshness and hit rate of the answer key cache used for grading"""
+    return answer_key_cache.get_stats()
 
 @router.get("/categories")
 async def get_test_categories():
@@ -168,6 +265,22 @@ async def get_test_categories():
         ]
     }
 
+def build_result(user_id: str, test_type: str, time_taken: Any, graded: GradedSubmission) -> Dict[str, Any]:
+    """aptitude_results document for a graded submission"""
+    recommendations = generate_recommendations(graded.score, graded.category_scores, test_type)
+    result = AptitudeResult(
+        user_id=user_id,
+        test_type=test_type,
+        score=int(graded.score),
+        total_questions=graded.total_questions,
+        time_taken=time_taken,
+        category_scores=graded.category_scores,
+        recommendations=recommendations
+    )
+    result_dict = result.dict()
+    result_dict.pop("id", None)  # Remove id field for insertion
+    return result_dict
+
 def generate_recommendations(score: float, category_scores: Dict, test_type: str) -> List[str]:
     """Generate career recommendations based on aptitude test results"""
     recommendations = []
@@ -1,48 +1,63 @@
 from fastapi import APIRouter, HTTPException, Query
-from typing import List, Optional
+from typing import Optional
+import re
 from app.services.database import get_database
+from app.services.deadline import max_time_ms
+from app.services.pagination import MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, header_page_responses
+from app.services.projections import college_projection
+from app.services.search import SEARCH_KEYS_FIELD, college_search, query_keys, regex_any
+from app.services.serialization import FastJSONResponse
 from app.models.schemas import College
 
 router = APIRouter()
 
-@router.get("/", response_model=List[College])
+@router.get("/", responses=header_page_responses(
+    "Colleges with the fields of the requested view, or only those listed in fields"
+))
 async def get_colleges(
-    location: Optional[str] = Query(None, description="Filter by location"),
-    type: Optional[str] = Query(None, description="Filter by type (Government/Private/Deemed)"),
+    location: Optional[str] = Query(None, description="Filter by location; each word matches the start of a location word, so 'mum' finds Mumbai but 'bai' does not"),
+    type: Optional[str] = Query(None, description="Filter by type (Government/Private/Deemed); matches the start of a word like location"),
     course: Optional[str] = Query(None, description="Filter by course offered"),
-    search: Optional[str] = Query(None, description="Search in name and location"),
-    limit: int = Query(20, ge=1, le=100),
-    skip: int = Query(0, ge=0)
+    search: Optional[str] = Query(None, description="Search by words of the name and location, also matching courses offered and type; a partial last word matches name and location word starts"),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    skip: int = Query(0, ge=0, description="Offset; prefer cursor for deep pages"),
+    cursor: Optional[str] = Query(None, description=f"Continue from the {NEXT_CURSOR_HEADER} header of the previous page"),
+    view: str = Query("full", description="full or card (name, location, type, ranking, rating, fees and placement)"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return instead of a view")
 ):
     """Get colleges with optional filtering"""
     db = get_database()
     
-    # Build query
-    query = {}
+    try:
+        projection = college_projection.resolve(view, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Build query; location and type match word prefixes through the search keys index
+    keys = query_keys(location, "location:") + query_keys(type, "type:")
+    query = {SEARCH_KEYS_FIELD: {"$all": keys}} if keys else {}
+    
+    # Regex equivalent, used until the search indexes have been created
+    fallback_query = {}
     if location:
-        query["location"] = {"$regex": location, "$options": "i"}
+        fallback_query["location"] = {"$regex": re.escape(location), "$options": "i"}
     if type:
-        query["type"] = {"$regex": type, "$options": "i"}
-    if course:
-        query["courses_offered"] = {"$in": [{"$regex": course, "$options": "i"}]}
+        fallback_query["type"] = {"$regex": re.escape(type), "$options": "i"}
     if search:
-        query["$or"] = [
-            {"name": {"$regex": search, "$options": "i"}},
-            {"location": {"$regex": search, "$options": "i"}}
-        ]
-    
-    # Execute query with sorting by ranking (ascending, nulls last)
-    cursor = db.colleges.find(query).sort([
-        ("ranking", 1)  # Lower ranking number = better rank
-    ]).skip(skip).limit(limit)
-    
-    colleges = await cursor.to_list(length=None)
-    
-    # Convert ObjectId to string
-    for college in colleges:
-        college["_id"] = str(college["_id"])
-    
-    return colleges
+        fallback_query.update(regex_any(["name", "location"], [search]))
+    if course:
+        query["courses_offered"] = {"$in": [{"$regex": re.escape(course), "$options": "i"}]}
+        fallback_query["courses_offered"] = query["courses_offered"]
+    
+    # Best text matches first, then by ranking (lower ranking number = better rank)
+    colleges, next_cursor = await college_search.find(
+        db, search, query, [("ranking", 1)], limit, fallback_query,
+        skip=skip, cursor=cursor, projection=projection, max_time_ms=max_time_ms()
+    )
+    
+    # Documents come from the database already projected, so skip response_model validation
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return FastJSONResponse(colleges, headers=headers)
 
 @router.get("/{college_id}", response_model=College)
 async def get_college(college_id: str):
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Response
 from typing import List, Optional
 import json
 from datetime import datetime
@@ -11,10 +11,8 @@ from ..models.schemas import (
     UserProfileForRecommendations
 )
 from ..services.database import get_database
-from ..services.groq_service import GroqService
-
-# Create groq service instance
-groq_service = GroqService()
+from ..services.pagination import MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, InvalidCursorError, decode_cursor, encode_cursor, header_page_responses
+from ..services.groq_service import groq_service
 
 router = APIRouter()
 
@@ -23,13 +21,15 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "service": "courses"}
 
-@router.get("/")
+@router.get("/", responses=header_page_responses("Courses"))
 async def get_courses(
+    response: Response,
     category: Optional[str] = Query(None, description="Filter by category"),
     difficulty: Optional[str] = Query(None, description="Filter by difficulty"),
     search: Optional[str] = Query(None, description="Search in title and description"),
-    limit: int = Query(20, ge=1, le=100),
-    skip: int = Query(0, ge=0)
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    skip: int = Query(0, ge=0, description="Offset; prefer cursor for deep pages"),
+    cursor: Optional[str] = Query(None, description=f"Continue from the {NEXT_CURSOR_HEADER} header of the previous page")
 ):
     """Get courses with optional filtering"""
     # Return sample courses for now
@@ -83,8 +83,19 @@ async def get_courses(
                           search.lower() in c['title'].lower() or 
                           search.lower() in c['description'].lower()]
     
-    # Apply pagination
-    paginated_courses = filtered_courses[skip:skip + limit]
+    # Apply pagination: continue after the cursor's position in the course list, or from the offset.
+    # Positions, not _id strings, because "course_10" sorts before "course_2"
+    positions = {c["_id"]: position for position, c in enumerate(sample_courses)}
+    if cursor:
+        after = decode_cursor(cursor).get("position")
+        if not isinstance(after, int):
+            raise InvalidCursorError("Invalid cursor")
+        filtered_courses = [c for c in filtered_courses if positions[c["_id"]] > after]
+    else:
+        filtered_courses = filtered_courses[skip:]
+    paginated_courses = filtered_courses[:limit]
+    if len(filtered_courses) > limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor({"position": positions[paginated_courses[-1]["_id"]]})
     
     return paginated_courses
 
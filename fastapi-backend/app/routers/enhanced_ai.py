@@ -3,11 +3,17 @@ Enhanced AI Recommendations Router with Agentic AI Integration
 """
 
 from fastapi import APIRouter, HTTPException, Body, Query
+from fastapi.responses import StreamingResponse
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
 from app.services.database import get_database
 from app.services.ai_agent import agent_orchestrator, UserProfile
 from app.services.web_scraper import data_aggregator
+from app.services.crawler import crawler
+from app.services.html_parser import html_parser_pool
+from app.services.llm_scheduler import Priority
+from app.services.streaming import sse_event, SSE_HEADERS
+from app.services.deadline import DeadlineExceeded, max_time_ms
 import json
 from datetime import datetime
 
@@ -36,61 +42,65 @@ async def get_comprehensive_recommendations(request: PersonalizedRecommendationR
     """Get comprehensive AI-powered recommendations using multiple agents"""
     
     try:
-        db = get_database()
-        
-        # Get user data from database
-        user = await db.users.find_one({"_id": request.user_id})
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        
-        # Get user's aptitude results
-        aptitude_scores = {}
-        if user.get("aptitude_results"):
-            cursor = db.aptitude_results.find({"user_id": request.user_id})
-            results = await cursor.to_list(length=None)
-            
-            for result in results:
-                test_type = result.get("test_type", "general")
-                aptitude_scores[test_type] = result.get("score", 0)
-        
-        # Create user profile for AI agents
-        user_profile = UserProfile(
-            user_id=request.user_id,
-            age=user.get("age", 18),
-            grade=user.get("grade", "12th"),
-            interests=request.interests or user.get("interests", []),
-            aptitude_scores=aptitude_scores,
-            academic_performance=user.get("academic_performance", {}),
-            location=request.location or user.get("location", {}),
-            career_goals=request.career_goals or user.get("career_goals", []),
-            personality_traits=user.get("personality_traits", {})
-        )
+        user_profile = await _build_user_profile(request)
         
         # Get comprehensive guidance from AI agents
         guidance = await agent_orchestrator.get_comprehensive_guidance(user_profile)
         
         # Enhance with real-time market data
         market_insights = {}
-        for career_path in guidance.get("consolidated_recommendations", {}).get("career_paths", []):
-            if isinstance(career_path, dict) and "field" in career_path:
-                field = career_path["field"]
-                location = request.location.get("state", "India")
-                insights = await data_aggregator.get_market_insights(field, location)
-                market_insights[field] = insights
+        async for field, insights in _iter_market_insights(guidance, request):
+            market_insights[field] = insights
         
-        return {
-            "user_id": request.user_id,
-            "timestamp": datetime.now().isoformat(),
-            "ai_guidance": guidance,
-            "market_insights": market_insights,
-            "personalization_score": guidance.get("confidence_score", 0.8),
-            "recommendations_count": len(guidance.get("consolidated_recommendations", {})),
-            "data_sources": ["ai_agents", "market_data", "database"]
-        }
+        return _comprehensive_response(request, guidance, market_insights)
         
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating recommendations: {str(e)}")
 
+@router.post("/recommendations/comprehensive/stream")
+async def stream_comprehensive_recommendations(request: PersonalizedRecommendationRequest):
+    """Stream comprehensive recommendations as Server-Sent Events
+
+    Emits one "agent" event per agent as it finishes, one "market_insights" event
+    per career path, then "consolidated" and a final "complete" event.
+    """
+    
+    user_profile = await _build_user_profile(request)
+    
+    async def event_stream():
+        try:
+            guidance = {}
+            async for event, data in agent_orchestrator.iter_comprehensive_guidance(user_profile):
+                if event == "agent":
+                    yield sse_event(data, event="agent")
+                else:
+                    guidance = data
+            
+            market_insights = {}
+            async for field, insights in _iter_market_insights(guidance, request):
+                market_insights[field] = insights
+                yield sse_event({"field": field, "insights": insights}, event="market_insights")
+            
+            yield sse_event({
+                "consolidated_recommendations": guidance.get("consolidated_recommendations", {}),
+                "confidence_score": guidance.get("confidence_score", 0.0),
+                "agent_status": guidance.get("agent_status", {}),
+                "partial": guidance.get("partial", False)
+            }, event="consolidated")
+            
+            summary = _comprehensive_response(request, guidance, market_insights)
+            summary.pop("ai_guidance")
+            summary.pop("market_insights")
+            yield sse_event(summary, event="complete")
+        except DeadlineExceeded as e:
+            yield sse_event({"detail": str(e), "status_code": 504}, event="error")
+        except Exception as e:
+            yield sse_event({"detail": f"Error generating recommendations: {str(e)}", "status_code": 500}, event="error")
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
 @router.post("/analysis/skills")
 async def analyze_skills_and_gaps(request: SkillAnalysisRequest):
     """Analyze user skills and identify gaps for target career"""
@@ -132,6 +142,8 @@ async def analyze_skills_and_gaps(request: SkillAnalysisRequest):
             "timestamp": datetime.now().isoformat()
         }
         
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error analyzing skills: {str(e)}")
 
@@ -152,9 +164,8 @@ async def get_market_insights(
         additional_data = {}
         
         if include_scholarships:
-            async with data_aggregator.scraper:
-                scholarship_data = await data_aggregator.scraper.scrape_scholarship_data(field, location)
-                additional_data["scholarships"] = [data.content for data in scholarship_data]
+            scholarship_data = await data_aggregator.get_scholarship_data(field, location)
+            additional_data["scholarships"] = [data.content for data in scholarship_data.items]
         
         return {
             "field": field,
@@ -162,10 +173,15 @@ async def get_market_insights(
             "market_overview": market_data,
             "additional_opportunities": additional_data,
             "analysis_timestamp": datetime.now().isoformat(),
-            "data_freshness": "real-time",
+            "data_freshness": {
+                "last_updated": market_data["last_updated"],
+                "age_seconds": market_data["data_age_seconds"]
+            },
             "recommendations": await _generate_market_recommendations(market_data, field)
         }
         
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting market insights: {str(e)}")
 
@@ -192,9 +208,12 @@ async def get_academic_timeline(
             "upcoming_deadlines": timeline_data.get("upcoming_events", []),
             "important_dates": timeline_data.get("deadlines", []),
             "preparation_schedule": await _generate_preparation_schedule(grade, target_field),
-            "last_updated": datetime.now().isoformat()
+            "last_updated": timeline_data["last_updated"],
+            "data_age_seconds": timeline_data["data_age_seconds"]
         }
         
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating timeline: {str(e)}")
 
@@ -207,35 +226,14 @@ async def intelligent_career_chat(
     """Intelligent career guidance chat with context awareness"""
     
     try:
-        db = get_database()
-        
-        # Get user context
-        user = await db.users.find_one({"_id": user_id})
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        
-        # Enhance context with user data
-        enhanced_context = {
-            **context,
-            "user_interests": user.get("interests", []),
-            "user_grade": user.get("grade", ""),
-            "user_location": user.get("location", {}),
-            "conversation_history": context.get("history", [])
-        }
+        enhanced_context = await _build_chat_context(user_id, context)
         
         # Use AI agent for intelligent response
         response = await agent_orchestrator.groq_service.get_completion(
             prompt=message,
-            system_prompt=f"""
-            You are an intelligent career guidance counselor. Use the following context to provide personalized advice:
-            
-            User Context: {json.dumps(enhanced_context, indent=2)}
-            
-            Provide helpful, actionable career guidance. Be empathetic and understanding.
-            If asked about specific colleges, courses, or career paths, provide detailed information.
-            Always encourage the student and provide hope and motivation.
-            """,
-            temperature=0.7
+            system_prompt=_build_chat_system_prompt(enhanced_context),
+            temperature=0.7,
+            priority=Priority.INTERACTIVE
         )
         
         # Generate follow-up suggestions
@@ -249,9 +247,44 @@ async def intelligent_career_chat(
             "context_used": bool(enhanced_context)
         }
         
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error in chat: {str(e)}")
 
+@router.post("/chat/intelligent/stream")
+async def intelligent_career_chat_stream(
+    message: str = Body(..., embed=True),
+    user_id: str = Body(..., embed=True),
+    context: Dict[str, Any] = Body(default={}, embed=True)
+):
+    """Intelligent career guidance chat streamed as Server-Sent Events"""
+    
+    enhanced_context = await _build_chat_context(user_id, context)
+    
+    async def event_stream():
+        try:
+            async for chunk in agent_orchestrator.groq_service.stream_completion(
+                prompt=message,
+                system_prompt=_build_chat_system_prompt(enhanced_context),
+                temperature=0.7,
+                priority=Priority.INTERACTIVE
+            ):
+                yield sse_event({"content": chunk}, event="token")
+        except Exception as e:
+            yield sse_event({"detail": f"Error in chat: {str(e)}"}, event="error")
+            return
+        
+        follow_ups = await _generate_follow_up_suggestions(message, enhanced_context)
+        yield sse_event({
+            "follow_up_suggestions": follow_ups,
+            "user_id": user_id,
+            "timestamp": datetime.now().isoformat(),
+            "context_used": bool(enhanced_context)
+        }, event="suggestions")
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
 @router.get("/colleges/enhanced/{college_name}")
 async def get_enhanced_college_info(
     college_name: str,
@@ -262,7 +295,10 @@ async def get_enhanced_college_info(
     try:
         # Get college data from database
         db = get_database()
-        college = await db.colleges.find_one({"name": {"$regex": college_name, "$options": "i"}})
+        college = await db.colleges.find_one(
+            {"name": {"$regex": college_name, "$options": "i"}},
+            max_time_ms=max_time_ms()
+        )
         
         # Get additional data from web scraping
         scraped_data = await data_aggregator.get_comprehensive_college_data(college_name, state)
@@ -273,18 +309,117 @@ async def get_enhanced_college_info(
             "real_time_data": scraped_data,
             "analysis": {
                 "data_completeness": _calculate_data_completeness(college, scraped_data),
-                "last_updated": datetime.now().isoformat(),
+                "last_updated": scraped_data["last_updated"],
+                "data_age_seconds": scraped_data["data_age_seconds"],
                 "reliability_score": _calculate_reliability_score(scraped_data)
             }
         }
         
         return enhanced_info
         
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting college info: {str(e)}")
 
+@router.get("/data/status")
+async def get_scraped_data_status():
+    """Get scraped data store and background crawler statistics"""
+    return {
+        "store": data_aggregator.store.get_stats(),
+        "rate_limiter": data_aggregator.scraper.rate_limiter.get_stats(),
+        "page_cache": data_aggregator.scraper.page_cache.get_stats(),
+        "html_parser": html_parser_pool.get_stats(),
+        "crawler": crawler.get_stats() if crawler is not None else {"running": False}
+    }
+
 # Helper functions
 
+async def _build_user_profile(request: PersonalizedRecommendationRequest) -> UserProfile:
+    """Load the stored user and merge it with request overrides for the AI agents"""
+    
+    db = get_database()
+    
+    # Get user data from database
+    user = await db.users.find_one({"_id": request.user_id}, max_time_ms=max_time_ms())
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    # Get user's aptitude results
+    aptitude_scores = {}
+    if user.get("aptitude_results"):
+        cursor = db.aptitude_results.find({"user_id": request.user_id}, max_time_ms=max_time_ms())
+        results = await cursor.to_list(length=None)
+        
+        for result in results:
+            test_type = result.get("test_type", "general")
+            aptitude_scores[test_type] = result.get("score", 0)
+    
+    return UserProfile(
+        user_id=request.user_id,
+        age=user.get("age", 18),
+        grade=user.get("grade", "12th"),
+        interests=request.interests or user.get("interests", []),
+        aptitude_scores=aptitude_scores,
+        academic_performance=user.get("academic_performance", {}),
+        location=request.location or user.get("location", {}),
+        career_goals=request.career_goals or user.get("career_goals", []),
+        personality_traits=user.get("personality_traits", {})
+    )
+
+def _iter_market_insights(guidance: Dict[str, Any], request: PersonalizedRecommendationRequest):
+    """Yield (field, insights) for the recommended career paths as each one is ready"""
+    
+    fields = [
+        career_path["field"]
+        for career_path in guidance.get("consolidated_recommendations", {}).get("career_paths", [])
+        if isinstance(career_path, dict) and "field" in career_path
+    ]
+    return data_aggregator.iter_market_insights(fields, request.location.get("state", "India"))
+
+def _comprehensive_response(request: PersonalizedRecommendationRequest, guidance: Dict[str, Any],
+                            market_insights: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "user_id": request.user_id,
+        "timestamp": datetime.now().isoformat(),
+        "ai_guidance": guidance,
+        "market_insights": market_insights,
+        "personalization_score": guidance.get("confidence_score", 0.8),
+        "recommendations_count": len(guidance.get("consolidated_recommendations", {})),
+        "data_sources": ["ai_agents", "market_data", "database"]
+    }
+
+async def _build_chat_context(user_id: str, context: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge request context with the stored user profile"""
+    
+    db = get_database()
+    
+    # Get user context
+    user = await db.users.find_one({"_id": user_id}, max_time_ms=max_time_ms())
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    return {
+        **context,
+        "user_interests": user.get("interests", []),
+        "user_grade": user.get("grade", ""),
+        "user_location": user.get("location", {}),
+        "conversation_history": context.get("history", [])
+    }
+
+def _build_chat_system_prompt(enhanced_context: Dict[str, Any]) -> str:
+    """Build the counselor system prompt for intelligent chat"""
+    
+    return f"""
+            You are an intelligent career guidance counselor. Use the following context to provide personalized advice:
+            
+            User Context: {json.dumps(enhanced_context, indent=2)}
+            
+            Provide helpful, actionable career guidance. Be empathetic and understanding.
+            If asked about specific colleges, courses, or career paths, provide detailed information.
+            Always encourage the student and provide hope and motivation.
+            """
+
 async def _generate_learning_plan(skill_gaps: List[str], target_career: str, experience_level: str) -> Dict[str, Any]:
     """Generate a personalized learning plan for skill gaps"""
     
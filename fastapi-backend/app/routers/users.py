@@ -2,10 +2,10 @@ from fastapi import APIRouter, HTTPException
 from typing import Dict, List, Optional, Any
 from pydantic import BaseModel
 import json
-from ..services.groq_service import GroqService
+from ..services.groq_service import groq_service
+from ..services.llm_scheduler import LLMUnavailableError
 
 router = APIRouter()
-groq_service = GroqService()
 
 class AcademicProfile(BaseModel):
     educationLevel: Optional[str] = ""
@@ -39,6 +39,71 @@ class UserAnalysisRequest(BaseModel):
     email: str
     profile_data: Optional[ProfileData] = None
 
+def _fallback_analysis(profile: ProfileData, skills: SkillsProfile) -> Dict[str, Any]:
+    """Rule-based analysis used when the AI response is unusable or the AI service is down"""
+    return {
+        "personality_assessment": {
+            "primary_traits": ["Analytical", "Detail-oriented", "Goal-driven"],
+            "learning_style": "visual",
+            "work_preferences": "hybrid",
+            "risk_tolerance": "medium"
+        },
+        "career_insights": {
+            "recommended_career_paths": [
+                {
+                    "title": "Software Developer",
+                    "match_percentage": 85,
+                    "reasoning": "Strong technical foundation with growth potential",
+                    "required_skills": ["Programming", "Problem Solving"],
+                    "growth_potential": "high"
+                }
+            ],
+            "industry_alignment": [
+                {
+                    "industry": "Technology",
+                    "alignment_score": 90,
+                    "opportunities": ["Software Development", "Data Analysis"]
+                }
+            ]
+        },
+        "skill_analysis": {
+            "strengths": skills.technicalSkills or ["Communication", "Problem Solving"],
+            "gaps": skills.skillGaps or ["Programming", "Data Analysis"],
+            "priority_skills": [
+                {
+                    "skill": skill,
+                    "importance": "high",
+                    "timeline": "short-term"
+                } for skill in (skills.skillGaps or ["Programming"])[:3]
+            ]
+        },
+        "learning_recommendations": {
+            "immediate_courses": [
+                {
+                    "course_type": interest,
+                    "priority": "high",
+                    "reasoning": f"Aligns with your interest in {interest}"
+                } for interest in (profile.interests or ["Programming"])[:3]
+            ],
+            "learning_path": [
+                {
+                    "phase": "Phase 1",
+                    "duration": "3-6 months",
+                    "focus_areas": (profile.interests or ["Programming"])[:2],
+                    "expected_outcomes": ["Build foundational skills", "Complete first project"]
+                }
+            ]
+        },
+        "market_insights": {
+            "demand_trends": ["AI/ML Skills", "Cloud Computing", "Data Science"],
+            "salary_outlook": {
+                "current_range": "$70,000 - $120,000",
+                "growth_projection": "15-20% over next 3 years"
+            },
+            "job_market_health": "excellent"
+        }
+    }
+
 @router.post("/analyze-profile")
 async def analyze_user_profile(request: UserAnalysisRequest):
     """
@@ -153,76 +218,13 @@ async def analyze_user_profile(request: UserAnalysisRequest):
         Focus on actionable insights and be specific with recommendations.
         """
 
-        # Get AI analysis
-        analysis_response = await groq_service.get_completion(analysis_prompt)
-        
-        # Parse the JSON response
+        # Get AI analysis, answering from the rule-based analysis straight away
+        # when the AI service refuses the call (circuit open, queue full)
         try:
+            analysis_response = await groq_service.get_completion(analysis_prompt)
             analysis_data = json.loads(analysis_response)
-        except json.JSONDecodeError:
-            # If JSON parsing fails, create a structured response
-            analysis_data = {
-                "personality_assessment": {
-                    "primary_traits": ["Analytical", "Detail-oriented", "Goal-driven"],
-                    "learning_style": "visual",
-                    "work_preferences": "hybrid",
-                    "risk_tolerance": "medium"
-                },
-                "career_insights": {
-                    "recommended_career_paths": [
-                        {
-                            "title": "Software Developer",
-                            "match_percentage": 85,
-                            "reasoning": "Strong technical foundation with growth potential",
-                            "required_skills": ["Programming", "Problem Solving"],
-                            "growth_potential": "high"
-                        }
-                    ],
-                    "industry_alignment": [
-                        {
-                            "industry": "Technology",
-                            "alignment_score": 90,
-                            "opportunities": ["Software Development", "Data Analysis"]
-                        }
-                    ]
-                },
-                "skill_analysis": {
-                    "strengths": skills.technicalSkills or ["Communication", "Problem Solving"],
-                    "gaps": skills.skillGaps or ["Programming", "Data Analysis"],
-                    "priority_skills": [
-                        {
-                            "skill": skill,
-                            "importance": "high",
-                            "timeline": "short-term"
-                        } for skill in (skills.skillGaps or ["Programming"])[:3]
-                    ]
-                },
-                "learning_recommendations": {
-                    "immediate_courses": [
-                        {
-                            "course_type": interest,
-                            "priority": "high",
-                            "reasoning": f"Aligns with your interest in {interest}"
-                        } for interest in (profile.interests or ["Programming"])[:3]
-                    ],
-                    "learning_path": [
-                        {
-                            "phase": "Phase 1",
-                            "duration": "3-6 months",
-                            "focus_areas": (profile.interests or ["Programming"])[:2],
-                            "expected_outcomes": ["Build foundational skills", "Complete first project"]
-                        }
-                    ]
-                },
-                "market_insights": {
-                    "demand_trends": ["AI/ML Skills", "Cloud Computing", "Data Science"],
-                    "salary_outlook": {
-                        "current_range": "$70,000 - $120,000",
-                        "growth_projection": "15-20% over next 3 years"
-                    },
-                    "job_market_health": "excellent"
-                }
-            }
+        except (json.JSONDecodeError, LLMUnavailableError):
+            analysis_data = _fallback_analysis(profile, skills)
 
         return {
             "success": True,
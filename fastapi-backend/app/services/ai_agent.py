@@ -4,12 +4,15 @@ Implements agentic AI with multiple specialized agents for different tasks
 """
 
 import json
+import os
 import asyncio
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Optional, Tuple, AsyncIterator
 from dataclasses import dataclass
 from enum import Enum
-from app.services.groq_service import GroqService
+from app.services.groq_service import GroqService, groq_service
+from app.services.llm_scheduler import Priority
 from app.services.database import get_database
+from app.services.deadline import check as check_deadline, bounded_timeout, max_time_ms, DeadlineExceeded
 import logging
 
 logger = logging.getLogger(__name__)
@@ -122,7 +125,7 @@ class CareerAdvisorAgent(AIAgent):
         """
         
         try:
-            response = await self.groq_service.get_completion(prompt, self.system_prompt)
+            response = await self.groq_service.get_completion(prompt, self.system_prompt, priority=Priority.BATCH)
             parsed_response = self._parse_response(response)
             
             return AgentResponse(
@@ -132,6 +135,10 @@ class CareerAdvisorAgent(AIAgent):
                 reasoning=parsed_response.get("reasoning", ""),
                 next_actions=parsed_response.get("next_steps", [])
             )
+        except DeadlineExceeded:
+            # Out of time; _run_agent reports it instead of fallback content. A refused AI call
+            # (open breaker, full queue) still answers from the fallback straight away
+            raise
         except Exception as e:
             logger.error(f"Career advisor agent error: {e}")
             return self._fallback_response()
@@ -165,9 +172,9 @@ class CourseRecommenderAgent(AIAgent):
     async def process(self, user_profile: UserProfile, context: Dict[str, Any] = None) -> AgentResponse:
         db = get_database()
         
-        # Get available courses from database
-        courses_cursor = db.courses.find({})
-        available_courses = await courses_cursor.to_list(length=100)
+        # Only titles go into the prompt; full documents are read later for the courses picked
+        courses_cursor = db.courses.find({}, {"_id": 0, "title": 1}, max_time_ms=max_time_ms()).limit(20)
+        available_titles = [course.get('title', '') for course in await courses_cursor.to_list(length=20)]
         
         prompt = f"""
         Based on the student profile, recommend the best courses from available options:
@@ -179,7 +186,7 @@ class CourseRecommenderAgent(AIAgent):
         - Career Goals: {', '.join(user_profile.career_goals)}
         
         Available Courses:
-        {json.dumps([course.get('title', '') for course in available_courses[:20]], indent=2)}
+        {json.dumps(available_titles, indent=2)}
         
         Provide:
         1. Top 5 course recommendations with match percentage
@@ -192,12 +199,12 @@ class CourseRecommenderAgent(AIAgent):
         """
         
         try:
-            response = await self.groq_service.get_completion(prompt, self.system_prompt)
+            response = await self.groq_service.get_completion(prompt, self.system_prompt, priority=Priority.BATCH)
             parsed_response = self._parse_response(response)
             
             # Enrich recommendations with database data
             enriched_recommendations = await self._enrich_course_recommendations(
-                parsed_response.get("recommendations", []), available_courses
+                db, parsed_response.get("recommendations", []), available_titles
             )
             
             return AgentResponse(
@@ -207,14 +214,20 @@ class CourseRecommenderAgent(AIAgent):
                 reasoning=parsed_response.get("reasoning", ""),
                 next_actions=parsed_response.get("next_steps", [])
             )
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f"Course recommender agent error: {e}")
             return self._fallback_response()
     
-    async def _enrich_course_recommendations(self, recommendations: List[Dict], available_courses: List[Dict]) -> List[Dict]:
+    async def _enrich_course_recommendations(self, db, recommendations: List[Dict], available_titles: List[str]) -> List[Dict]:
         """Enrich recommendations with detailed course data"""
         enriched = []
-        course_map = {course['title']: course for course in available_courses}
+        titles = [rec.get('course_name', '') for rec in recommendations if rec.get('course_name') in available_titles]
+        course_map = {}
+        if titles:
+            cursor = db.courses.find({"title": {"$in": titles}}, max_time_ms=max_time_ms())
+            course_map = {course['title']: course for course in await cursor.to_list(length=None)}
         
         for rec in recommendations:
             course_title = rec.get('course_name', '')
@@ -261,7 +274,7 @@ class CollegeFinderAgent(AIAgent):
         if user_profile.location.get('state'):
             location_filter['location.state'] = user_profile.location['state']
         
-        colleges_cursor = db.colleges.find(location_filter).limit(50)
+        colleges_cursor = db.colleges.find(location_filter, max_time_ms=max_time_ms()).limit(50)
         available_colleges = await colleges_cursor.to_list(length=50)
         
         prompt = f"""
@@ -292,7 +305,7 @@ class CollegeFinderAgent(AIAgent):
         """
         
         try:
-            response = await self.groq_service.get_completion(prompt, self.system_prompt)
+            response = await self.groq_service.get_completion(prompt, self.system_prompt, priority=Priority.BATCH)
             parsed_response = self._parse_response(response)
             
             # Enrich with real college data
@@ -307,6 +320,8 @@ class CollegeFinderAgent(AIAgent):
                 reasoning=parsed_response.get("reasoning", ""),
                 next_actions=parsed_response.get("next_steps", [])
             )
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f"College finder agent error: {e}")
             return self._fallback_response()
@@ -354,58 +369,109 @@ class AgentOrchestrator:
     """Orchestrates multiple AI agents for comprehensive guidance"""
     
     def __init__(self):
-        self.groq_service = GroqService()
+        self.groq_service = groq_service
         self.agents = {
             AgentType.CAREER_ADVISOR: CareerAdvisorAgent(AgentType.CAREER_ADVISOR, self.groq_service),
             AgentType.COURSE_RECOMMENDER: CourseRecommenderAgent(AgentType.COURSE_RECOMMENDER, self.groq_service),
             AgentType.COLLEGE_FINDER: CollegeFinderAgent(AgentType.COLLEGE_FINDER, self.groq_service),
         }
+        # Per-agent time budgets in seconds, e.g. AGENT_TIMEOUT_COLLEGE_FINDER=10
+        default_timeout = float(os.getenv("AGENT_TIMEOUT", "20"))
+        self.agent_timeouts = {
+            agent_type: float(os.getenv(f"AGENT_TIMEOUT_{agent_type.name}", default_timeout))
+            for agent_type in self.agents
+        }
     
-    async def get_comprehensive_guidance(self, user_profile: UserProfile) -> Dict[str, Any]:
-        """Get comprehensive guidance by coordinating multiple agents"""
-        
-        # Run agents in parallel for efficiency
-        tasks = []
-        for agent_type, agent in self.agents.items():
-            tasks.append(agent.process(user_profile))
-        
-        responses = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        # Compile results
-        results = {
+    async def _run_agent(self, agent_type: AgentType, user_profile: UserProfile) -> Tuple[AgentType, str, Optional[AgentResponse]]:
+        """Run one agent within its time budget; returns (agent type, status, response)"""
+        try:
+            response = await asyncio.wait_for(
+                self.agents[agent_type].process(user_profile),
+                timeout=bounded_timeout(self.agent_timeouts[agent_type], f"{agent_type.value} agent")
+            )
+            return agent_type, "completed", response
+        except (asyncio.TimeoutError, DeadlineExceeded):
+            logger.warning(f"Agent {agent_type.value} ran out of time")
+            return agent_type, "timed_out", None
+        except Exception as e:
+            logger.error(f"Agent {agent_type.value} failed: {e}")
+            return agent_type, "failed", None
+    
+    def _new_results(self, user_profile: UserProfile) -> Dict[str, Any]:
+        return {
             "user_profile": user_profile.__dict__,
             "agent_responses": {},
+            "agent_status": {},
             "consolidated_recommendations": {},
-            "confidence_score": 0.0
+            "confidence_score": 0.0,
+            "partial": False
+        }
+    
+    def _record_agent_result(self, results: Dict[str, Any], agent_type: AgentType, status: str,
+                             response: Optional[AgentResponse]) -> Optional[Dict[str, Any]]:
+        """Add one agent's outcome to the results and return its serialized response"""
+        results["agent_status"][agent_type.value] = status
+        if response is None:
+            results["partial"] = True
+            return None
+        
+        serialized = {
+            "confidence": response.confidence,
+            "recommendations": response.recommendations,
+            "reasoning": response.reasoning,
+            "next_actions": response.next_actions
         }
+        results["agent_responses"][response.agent_type.value] = serialized
+        return serialized
+    
+    def _finalize_confidence(self, results: Dict[str, Any]):
+        confidences = [response["confidence"] for response in results["agent_responses"].values()]
+        if confidences:
+            results["confidence_score"] = sum(confidences) / len(confidences)
+    
+    async def get_comprehensive_guidance(self, user_profile: UserProfile) -> Dict[str, Any]:
+        """Get comprehensive guidance by coordinating multiple agents"""
         
-        total_confidence = 0
-        valid_responses = 0
+        results = {}
+        async for event, data in self.iter_comprehensive_guidance(user_profile):
+            if event == "guidance":
+                results = data
+        return results
+    
+    async def iter_comprehensive_guidance(self, user_profile: UserProfile) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Yield ("agent", outcome) as each agent finishes, then ("guidance", results)"""
         
-        for i, response in enumerate(responses):
-            if isinstance(response, Exception):
-                logger.error(f"Agent {list(self.agents.keys())[i]} failed: {response}")
-                continue
-            
-            agent_type = response.agent_type
-            results["agent_responses"][agent_type.value] = {
-                "confidence": response.confidence,
-                "recommendations": response.recommendations,
-                "reasoning": response.reasoning,
-                "next_actions": response.next_actions
-            }
-            
-            total_confidence += response.confidence
-            valid_responses += 1
+        # Nobody is waiting for guidance on an expired request
+        check_deadline("comprehensive guidance")
+        
+        # Run agents in parallel, each cancelled once its own budget is spent
+        tasks = [
+            asyncio.create_task(self._run_agent(agent_type, user_profile))
+            for agent_type in self.agents
+        ]
+        results = self._new_results(user_profile)
         
-        # Calculate overall confidence
-        if valid_responses > 0:
-            results["confidence_score"] = total_confidence / valid_responses
+        try:
+            # Compile results from whichever agents finished
+            for next_done in asyncio.as_completed(tasks):
+                agent_type, status, response = await next_done
+                serialized = self._record_agent_result(results, agent_type, status, response)
+                yield "agent", {
+                    "agent": agent_type.value,
+                    "status": status,
+                    "response": serialized
+                }
+        finally:
+            # The consumer may stop early (e.g. a streaming client disconnected)
+            for task in tasks:
+                task.cancel()
+        
+        self._finalize_confidence(results)
         
         # Generate consolidated recommendations
         results["consolidated_recommendations"] = await self._consolidate_recommendations(results)
         
-        return results
+        yield "guidance", results
     
     async def _consolidate_recommendations(self, results: Dict[str, Any]) -> Dict[str, Any]:
         """Consolidate recommendations from multiple agents"""
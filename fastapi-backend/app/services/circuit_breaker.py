@@ -0,0 +1,138 @@
+"""
+Circuit breaker for upstream dependencies
+Fails fast while a dependency is unhealthy and probes it with trial calls before recovering
+"""
+
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from enum import Enum
+from typing import Callable, Dict, Any, Optional
+from app.services.llm_scheduler import LLMUnavailableError
+from app.services.deadline import DeadlineExceeded
+import logging
+
+logger = logging.getLogger(__name__)
+
+class CircuitState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+class CircuitOpenError(LLMUnavailableError):
+    """Raised instead of calling a dependency whose circuit is open"""
+
+class CircuitBreaker:
+    """Error-rate circuit breaker over a sliding window of recent calls"""
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float = 0.5,
+        minimum_calls: int = 10,
+        window_size: int = 20,
+        open_seconds: float = 30,
+        half_open_max_calls: int = 2,
+        is_failure: Optional[Callable[[BaseException], bool]] = None
+    ):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.minimum_calls = minimum_calls
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self.is_failure = is_failure or (lambda e: True)
+        self.state = CircuitState.CLOSED
+        self._window = deque(maxlen=window_size)
+        self._opened_at = 0.0
+        self._trial_calls = 0
+        self._trial_successes = 0
+        self.times_opened = 0
+        self.rejected = 0
+
+    def _failure_rate(self) -> float:
+        if not self._window:
+            return 0.0
+        return self._window.count(False) / len(self._window)
+
+    def _open(self):
+        self.state = CircuitState.OPEN
+        self._opened_at = time.monotonic()
+        self.times_opened += 1
+        logger.warning(f"Circuit '{self.name}' opened (failure rate {self._failure_rate():.0%})")
+
+    def _close(self):
+        self.state = CircuitState.CLOSED
+        self._window.clear()
+        logger.info(f"Circuit '{self.name}' closed")
+
+    def _before_call(self):
+        if self.state == CircuitState.OPEN:
+            if time.monotonic() - self._opened_at < self.open_seconds:
+                self.rejected += 1
+                raise CircuitOpenError(f"{self.name} is temporarily unavailable")
+            self.state = CircuitState.HALF_OPEN
+            self._trial_calls = 0
+            self._trial_successes = 0
+
+        if self.state == CircuitState.HALF_OPEN:
+            if self._trial_calls >= self.half_open_max_calls:
+                self.rejected += 1
+                raise CircuitOpenError(f"{self.name} is recovering, please retry shortly")
+            self._trial_calls += 1
+
+    def _record(self, success: bool):
+        if self.state == CircuitState.HALF_OPEN:
+            if not success:
+                self._open()
+                return
+            self._trial_successes += 1
+            if self._trial_successes >= self.half_open_max_calls:
+                self._close()
+            return
+
+        if self.state == CircuitState.CLOSED:
+            self._window.append(success)
+            if len(self._window) >= self.minimum_calls and self._failure_rate() >= self.failure_rate_threshold:
+                self._open()
+
+    def _release_trial(self):
+        """Give back a half-open trial slot that ended without a verdict"""
+        if self.state == CircuitState.HALF_OPEN and self._trial_calls > self._trial_successes:
+            self._trial_calls -= 1
+
+    @asynccontextmanager
+    async def guard(self):
+        """Wrap one call to the dependency"""
+        self._before_call()
+        try:
+            yield
+        except (LLMUnavailableError, DeadlineExceeded):
+            # Refused locally (queue full, deadline passed); says nothing about the dependency
+            self._release_trial()
+            raise
+        except Exception as e:
+            if self.is_failure(e):
+                self._record(False)
+            else:
+                self._record(True)
+            raise
+        except BaseException:
+            self._release_trial()
+            raise
+        else:
+            self._record(True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        retry_after = 0.0
+        if self.state == CircuitState.OPEN:
+            retry_after = max(self.open_seconds - (time.monotonic() - self._opened_at), 0.0)
+        return {
+            "name": self.name,
+            "state": self.state.value,
+            "failure_rate": round(self._failure_rate(), 4),
+            "window_calls": len(self._window),
+            "failure_rate_threshold": self.failure_rate_threshold,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+            "retry_after_seconds": round(retry_after, 1)
+        }
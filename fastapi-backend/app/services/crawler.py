@@ -0,0 +1,163 @@
+"""
+Background crawler for scraped data
+Refreshes scholarships, entrance exams and job market data on a schedule so requests only read stored results
+
+Runs inside the API process when CRAWLER_ENABLED=true, or on its own with:
+    python -m app.services.crawler
+"""
+
+import asyncio
+import os
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import schedule
+from app.services.database import connect_to_mongo, close_mongo_connection
+from app.services.web_scraper import data_aggregator, open_http_session, close_http_session
+from app.services.html_parser import html_parser_pool
+import logging
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class CrawlJob:
+    name: str
+    run: Callable[[], Awaitable[Any]]
+
+class BackgroundCrawler:
+    """Runs crawl jobs on jittered intervals with a cap on how many run at once"""
+
+    def __init__(self, interval: int = 3600, jitter: float = 0.2, max_concurrency: int = 2,
+                 history_size: int = 200, start_spread: float = 60, tick_seconds: float = 1.0):
+        self.interval = interval
+        self.jitter = jitter
+        self.start_spread = start_spread
+        self.tick_seconds = tick_seconds
+        self.scheduler = schedule.Scheduler()
+        self.jobs: Dict[str, CrawlJob] = {}
+        self.history = deque(maxlen=history_size)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.max_concurrency = max_concurrency
+        self._running: Dict[str, asyncio.Task] = {}
+        self._loop_task: Optional[asyncio.Task] = None
+        self.skipped = 0
+
+    def add_job(self, name: str, run: Callable[[], Awaitable[Any]]):
+        """Register a job to run every interval seconds, give or take the jitter"""
+        job = CrawlJob(name=name, run=run)
+        self.jobs[name] = job
+        low = max(int(self.interval * (1 - self.jitter)), 1)
+        high = max(int(self.interval * (1 + self.jitter)), low)
+        self.scheduler.every(low).to(high).seconds.do(self._start, job).tag(name)
+
+    def _start(self, job: CrawlJob):
+        # Called synchronously from Scheduler.run_pending; the crawl itself runs as a task
+        if job.name in self._running:
+            self.skipped += 1
+            logger.info(f"Crawl job {job.name} is still running, skipping this run")
+            return
+        task = asyncio.ensure_future(self._run(job))
+        self._running[job.name] = task
+        task.add_done_callback(lambda t: self._running.pop(job.name, None))
+
+    async def _run(self, job: CrawlJob):
+        async with self._semaphore:
+            started_at = datetime.utcnow()
+            start = time.monotonic()
+            entry = {"job": job.name, "started_at": started_at.isoformat()}
+            try:
+                result = await job.run()
+                entry["status"] = "completed"
+                entry["items"] = len(getattr(result, "items", None) or [])
+            except asyncio.CancelledError:
+                entry["status"] = "cancelled"
+                raise
+            except Exception as e:
+                entry["status"] = "failed"
+                entry["error"] = str(e)
+                logger.warning(f"Crawl job {job.name} failed: {e}")
+            finally:
+                entry["duration_seconds"] = round(time.monotonic() - start, 3)
+                self.history.append(entry)
+
+    async def run_forever(self, run_on_start: bool = True):
+        if run_on_start:
+            # Spread the first crawl over a short window instead of firing every job at once
+            for job in self.scheduler.get_jobs():
+                job.next_run = datetime.now() + timedelta(seconds=random.uniform(0, self.start_spread))
+        while True:
+            self.scheduler.run_pending()
+            await asyncio.sleep(self.tick_seconds)
+
+    def start(self, run_on_start: bool = True):
+        if self._loop_task is None or self._loop_task.done():
+            self._loop_task = asyncio.ensure_future(self.run_forever(run_on_start))
+            logger.info(f"Background crawler started with {len(self.jobs)} jobs")
+
+    async def stop(self):
+        tasks = [task for task in [self._loop_task, *self._running.values()] if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._loop_task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        next_runs = {
+            next(iter(job.tags)): job.next_run.isoformat()
+            for job in self.scheduler.get_jobs() if job.next_run and job.tags
+        }
+        return {
+            "running": self._loop_task is not None and not self._loop_task.done(),
+            "jobs": len(self.jobs),
+            "active": sorted(self._running),
+            "max_concurrency": self.max_concurrency,
+            "skipped": self.skipped,
+            "next_runs": next_runs,
+            "history": list(reversed(self.history))
+        }
+
+def _env_list(name: str, default: str) -> List[str]:
+    return [item.strip() for item in os.getenv(name, default).split(",") if item.strip()]
+
+def create_crawler() -> BackgroundCrawler:
+    """Build the crawler and its jobs from environment settings"""
+    crawler = BackgroundCrawler(
+        interval=int(os.getenv("CRAWLER_INTERVAL", "3600")),
+        jitter=float(os.getenv("CRAWLER_JITTER", "0.2")),
+        max_concurrency=max(int(os.getenv("CRAWLER_MAX_CONCURRENCY", "2")), 1),
+        history_size=int(os.getenv("CRAWLER_HISTORY_SIZE", "200")),
+        start_spread=float(os.getenv("CRAWLER_START_SPREAD", "60"))
+    )
+    fields = _env_list("CRAWLER_FIELDS", "Engineering,Medicine,Computer Science,Commerce,Arts,Science")
+    states = _env_list("CRAWLER_STATES", "India")
+
+    crawler.add_job("entrance_exams", lambda: data_aggregator.get_entrance_exam_data(refresh=True))
+    # Market insights read scholarships without a category or state
+    crawler.add_job("scholarships", lambda: data_aggregator.get_scholarship_data(refresh=True))
+    for state in states:
+        for field in fields:
+            crawler.add_job(
+                f"job_market:{field}:{state}",
+                lambda field=field, state=state: data_aggregator.get_job_market_data(field, state, refresh=True)
+            )
+    return crawler
+
+crawler = create_crawler() if os.getenv("CRAWLER_ENABLED", "false").lower() == "true" else None
+
+async def _run_worker():
+    worker = crawler or create_crawler()
+    await connect_to_mongo()
+    await open_http_session()
+    try:
+        await worker.run_forever(run_on_start=True)
+    finally:
+        await close_http_session()
+        html_parser_pool.shutdown()
+        await close_mongo_connection()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+    asyncio.run(_run_worker())
@@ -0,0 +1,118 @@
+"""
+Request-scoped deadlines
+The HTTP layer sets how long the caller is willing to wait; every layer below sizes its own timeouts to fit
+"""
+
+import asyncio
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Dict, Optional
+from starlette.responses import JSONResponse
+
+# Absolute time.monotonic() value after which nobody is waiting for the result
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+TIMEOUT_HEADER = "x-request-timeout"
+
+class DeadlineExceeded(Exception):
+    """Raised when the request's deadline has passed"""
+
+def current_deadline() -> Optional[float]:
+    return _deadline.get()
+
+def set_deadline(seconds: float):
+    """Start a deadline for the current context; returns a token for reset_deadline"""
+    return _deadline.set(time.monotonic() + seconds)
+
+def reset_deadline(token):
+    _deadline.reset(token)
+
+def clear_deadline():
+    """Drop the deadline inside a background task that outlives the request that started it"""
+    _deadline.set(None)
+
+def remaining() -> Optional[float]:
+    """Seconds left before the deadline, or None when no deadline is set"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+def check(what: str = "request"):
+    """Abandon work if the deadline has already passed"""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded(f"Deadline exceeded before {what}")
+
+def bounded_timeout(default: Optional[float], what: str = "request") -> Optional[float]:
+    """Shrink a layer's own timeout so it ends no later than the deadline"""
+    left = remaining()
+    if left is None:
+        return default
+    if left <= 0:
+        raise DeadlineExceeded(f"Deadline exceeded before {what}")
+    return left if default is None else min(default, left)
+
+def max_time_ms(default: Optional[float] = None) -> Optional[int]:
+    """Server-side time limit for a MongoDB operation, in milliseconds"""
+    timeout = bounded_timeout(default, "database query")
+    return None if timeout is None else max(int(timeout * 1000), 1)
+
+async def with_deadline(awaitable: Awaitable[Any], timeout: Optional[float] = None, what: str = "request") -> Any:
+    """Await with a timeout bounded by the deadline, raising DeadlineExceeded if the deadline cut it short"""
+    limit = bounded_timeout(timeout, what)
+    if limit is None:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, limit)
+    except asyncio.TimeoutError:
+        left = remaining()
+        if left is not None and left <= 0:
+            raise DeadlineExceeded(f"Deadline exceeded during {what}")
+        raise
+
+class DeadlineMiddleware:
+    """ASGI middleware that starts a deadline for every HTTP request
+
+    The budget comes from the X-Request-Timeout header (seconds) when present,
+    otherwise from the longest matching path prefix in route_timeouts.
+    """
+
+    def __init__(self, app, default_timeout: float = 30, max_timeout: float = 120,
+                 route_timeouts: Optional[Dict[str, float]] = None):
+        self.app = app
+        self.default_timeout = default_timeout
+        self.max_timeout = max_timeout
+        # Longest prefix first so specific routes win over their parents
+        self.route_timeouts = sorted((route_timeouts or {}).items(), key=lambda item: len(item[0]), reverse=True)
+
+    def _timeout_for(self, scope) -> float:
+        for name, value in scope.get("headers", []):
+            if name.decode("latin-1") == TIMEOUT_HEADER:
+                try:
+                    requested = float(value.decode("latin-1"))
+                except ValueError:
+                    break
+                if requested > 0:
+                    return min(requested, self.max_timeout)
+                break
+
+        path = scope.get("path", "")
+        for prefix, timeout in self.route_timeouts:
+            if path.startswith(prefix):
+                return timeout
+        return self.default_timeout
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = set_deadline(self._timeout_for(scope))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            reset_deadline(token)
+
+async def deadline_exceeded_handler(request, exc: DeadlineExceeded) -> JSONResponse:
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
@@ -0,0 +1,114 @@
+"""
+Vectorized grading of aptitude submissions
+Answer keys and responses become NumPy arrays, so a whole exam session is scored with a few array operations
+"""
+
+from dataclasses import dataclass
+from itertools import chain, repeat
+from typing import Any, Dict, Hashable, List, Optional, Sequence
+import numpy as np
+from app.services.question_bank import AnswerKey
+
+# Code for an answer that matches no correct answer in the batch
+NO_MATCH = -1
+
+@dataclass
+class GradedSubmission:
+    correct_answers: int
+    total_questions: int
+    score: float
+    category_scores: Dict[str, Dict[str, float]]
+
+def _hashable(value: Any) -> Hashable:
+    # Lists and dicts (e.g. multi-select answers) become hashable forms that compare like the originals
+    if isinstance(value, list):
+        return ("list", tuple(_hashable(item) for item in value))
+    if isinstance(value, dict):
+        return ("dict", frozenset((key, _hashable(item)) for key, item in value.items()))
+    if isinstance(value, tuple):
+        return tuple(_hashable(item) for item in value)
+    return value
+
+def _answer_codes(answers: List[Any], codes: Dict[Hashable, int]) -> np.ndarray:
+    try:
+        return np.fromiter(map(codes.get, answers, repeat(NO_MATCH)), dtype=np.int64, count=len(answers))
+    except TypeError:
+        # Some answer is a list or dict; only then convert every answer
+        return np.array([codes.get(_hashable(answer), NO_MATCH) for answer in answers], dtype=np.int64)
+
+def grade_submissions(answer_sets: Sequence[Dict[str, Any]], answer_keys: Dict[str, AnswerKey],
+                      chunk_size: int = 8192) -> List[Optional[GradedSubmission]]:
+    """Grade many question_id -> answer dicts at once
+
+    A question counts towards a submission when it was answered and has an answer key; an
+    answer is correct when it equals the key's correct_answer. Submissions with no gradable
+    question come back as None. Submissions are graded chunk_size at a time to bound memory.
+    """
+    question_ids = list(answer_keys)
+    column = {question_id: j for j, question_id in enumerate(question_ids)}
+
+    # Correct answers and categories as integer codes, so comparisons and counts run in NumPy
+    answer_codes: Dict[Hashable, int] = {}
+    key_codes = np.array(
+        [answer_codes.setdefault(_hashable(answer_keys[q].correct_answer), len(answer_codes)) for q in question_ids],
+        dtype=np.int64
+    )
+    category_codes: Dict[str, int] = {}
+    question_category = np.array(
+        [category_codes.setdefault(answer_keys[q].category, len(category_codes)) for q in question_ids],
+        dtype=np.int64
+    )
+    categories = list(category_codes)
+    n_categories = max(len(categories), 1)
+
+    graded: List[Optional[GradedSubmission]] = []
+    for start in range(0, len(answer_sets), chunk_size):
+        chunk = answer_sets[start:start + chunk_size]
+
+        # Every (submission, question, answer) of the chunk as flat arrays; only answered
+        # questions are stored, so memory is proportional to the answers, not to the bank
+        lengths = np.fromiter(map(len, chunk), dtype=np.int64, count=len(chunk))
+        answered = sum(lengths.tolist())
+        rows = np.repeat(np.arange(len(chunk)), lengths)
+        columns = np.fromiter(
+            map(column.get, chain.from_iterable(chunk), repeat(-1)), dtype=np.int64, count=answered
+        )
+        values = _answer_codes(list(chain.from_iterable(answers.values() for answers in chunk)), answer_codes)
+
+        known = columns >= 0
+        rows, columns, values = rows[known], columns[known], values[known]
+        correct = values == key_codes[columns]
+
+        # Per submission and category counts in one pass: bin index = row * categories + category
+        bins = rows * n_categories + question_category[columns]
+        size = len(chunk) * n_categories
+        category_total = np.bincount(bins, minlength=size).reshape(len(chunk), n_categories)
+        category_correct = np.bincount(bins, weights=correct, minlength=size).astype(np.int64)
+        category_correct = category_correct.reshape(len(chunk), n_categories)
+        total = category_total.sum(axis=1)
+        correct_count = category_correct.sum(axis=1)
+
+        # Back to Python numbers once, rather than per element
+        category_total_rows = category_total.tolist()
+        category_correct_rows = category_correct.tolist()
+        for row, (total_row, correct_row) in enumerate(zip(total.tolist(), correct_count.tolist())):
+            if total_row == 0:
+                graded.append(None)
+                continue
+            category_scores = {}
+            for c, (category_total_value, category_correct_value) in enumerate(
+                zip(category_total_rows[row], category_correct_rows[row])
+            ):
+                if category_total_value:
+                    category_scores[categories[c]] = {
+                        "correct": category_correct_value,
+                        "total": category_total_value,
+                        "percentage": (category_correct_value / category_total_value) * 100
+                    }
+            graded.append(GradedSubmission(
+                correct_answers=correct_row,
+                total_questions=total_row,
+                score=(correct_row / total_row) * 100,
+                category_scores=category_scores
+            ))
+    return graded
@@ -1,22 +1,214 @@
 import os
-from groq import Groq
-from typing import Dict, Any, List, Optional
+import httpx
+import groq
+from groq import AsyncGroq
+from typing import Dict, Any, List, Optional, AsyncIterator
 import json
 from dotenv import load_dotenv
 import asyncio
+import time
+from app.services.llm_scheduler import Priority, PriorityLimiter, QueuePosition, LLMUnavailableError
+from app.services.llm_cache import LLMResponseCache, make_cache_key
+from app.services.single_flight import SingleFlight
+from app.services.semantic_cache import create_semantic_cache
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.deadline import current_deadline, bounded_timeout, remaining, with_deadline, DeadlineExceeded
 
 load_dotenv()
 
+# Shared connection pool for every Groq client in the process. Keeping the
+# TLS connections alive lets concurrent completions reuse them instead of
+# paying a fresh handshake per request.
+_http_client: Optional[httpx.AsyncClient] = None
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the process-wide pooled HTTP client used for Groq calls"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=int(os.getenv("GROQ_MAX_CONNECTIONS", "100")),
+                max_keepalive_connections=int(os.getenv("GROQ_MAX_KEEPALIVE", "20")),
+                keepalive_expiry=float(os.getenv("GROQ_KEEPALIVE_EXPIRY", "60"))
+            ),
+            timeout=httpx.Timeout(30.0, connect=5.0)
+        )
+    return _http_client
+
+def _is_provider_failure(error: BaseException) -> bool:
+    """Errors that indicate Groq itself is unhealthy, as opposed to a bad request"""
+    if isinstance(error, (groq.APIConnectionError, groq.InternalServerError, groq.RateLimitError, asyncio.TimeoutError)):
+        return True
+    return isinstance(error, groq.APIStatusError) and error.status_code >= 500
+
+async def close_http_client():
+    """Close the shared HTTP client on application shutdown"""
+    global _http_client
+    if _http_client is not None and not _http_client.is_closed:
+        await _http_client.aclose()
+    _http_client = None
+
 class GroqService:
     def __init__(self):
-        self.client = Groq(
-            api_key=""
+        self.client = AsyncGroq(
+            api_key=os.getenv("GROQ_API_KEY", ""),
+            http_client=get_http_client(),
+            max_retries=0  # Retries are handled in get_completion
         )
         self.model = "llama-3.1-8b-instant"
-        self.max_retries = 3
-        self.timeout = 30
+        self.max_retries = int(os.getenv("GROQ_MAX_RETRIES", "3"))
+        self.timeout = float(os.getenv("GROQ_TIMEOUT", "30"))
+        # Fail fast to callers' fallbacks while Groq is erroring
+        self.breaker = CircuitBreaker(
+            "groq",
+            failure_rate_threshold=float(os.getenv("GROQ_BREAKER_FAILURE_RATE", "0.5")),
+            minimum_calls=int(os.getenv("GROQ_BREAKER_MIN_CALLS", "10")),
+            window_size=int(os.getenv("GROQ_BREAKER_WINDOW", "20")),
+            open_seconds=float(os.getenv("GROQ_BREAKER_OPEN_SECONDS", "30")),
+            half_open_max_calls=int(os.getenv("GROQ_BREAKER_TRIAL_CALLS", "2")),
+            is_failure=_is_provider_failure
+        )
+        # Admission control shared by every caller of this service
+        self.limiter = PriorityLimiter(
+            max_concurrency=int(os.getenv("GROQ_MAX_CONCURRENCY", "8")),
+            max_queue=int(os.getenv("GROQ_MAX_QUEUE", "200"))
+        )
+        self.cache_enabled = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+        self.cache = LLMResponseCache(
+            max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1000")),
+            max_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", str(16 * 1024 * 1024))),
+            mongo_enabled=os.getenv("LLM_CACHE_MONGO", "false").lower() == "true"
+        )
+        # Near-duplicate chat questions without user context
+        self.semantic_cache = create_semantic_cache()
+        # Identical prompts already in flight share one upstream call
+        self.single_flight = SingleFlight(cancel_abandoned=True)
+        # Cache lifetimes in seconds for prompts that do not depend on the user
+        self.cache_ttls = {
+            "market_trends": int(os.getenv("LLM_CACHE_TTL_MARKET_TRENDS", str(6 * 3600))),
+            "skill_analysis": int(os.getenv("LLM_CACHE_TTL_SKILL_ANALYSIS", str(24 * 3600))),
+            "learning_path": int(os.getenv("LLM_CACHE_TTL_LEARNING_PATH", str(24 * 3600)))
+        }
+    
+    async def _create_completion(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        priority: Priority = Priority.STANDARD,
+        deadline: Optional[float] = None,
+        cache_ttl: Optional[int] = None
+    ) -> str:
+        """Get a chat completion, served from cache or a matching in-flight call when possible"""
+        if deadline is None:
+            deadline = current_deadline()
+        system_prompt = next((m["content"] for m in messages if m["role"] == "system"), None)
+        prompt = "\n".join(m["content"] for m in messages if m["role"] != "system")
+        request_key = make_cache_key(self.model, system_prompt, prompt, temperature, max_tokens)
+        
+        use_cache = bool(cache_ttl) and self.cache_enabled
+        if use_cache:
+            cached = await self.cache.get(request_key)
+            if cached is not None:
+                return cached
+        
+        # The shared call runs without a deadline, queued at the most urgent priority of the
+        # callers waiting on it; each caller stops waiting at its own deadline
+        position = QueuePosition(priority)
+        timeout = None if deadline is None else deadline - time.monotonic()
+        if timeout is not None and timeout <= 0:
+            raise DeadlineExceeded("Deadline exceeded before AI completion")
+        try:
+            return await with_deadline(
+                self.single_flight.do(
+                    request_key,
+                    lambda: self._request_completion(
+                        messages, temperature, max_tokens, position,
+                        cache_key=request_key if use_cache else None,
+                        cache_ttl=cache_ttl
+                    ),
+                    state=position,
+                    join=lambda shared: shared.raise_to(priority)
+                ),
+                timeout,
+                what="AI completion"
+            )
+        except asyncio.TimeoutError:
+            if deadline is not None and deadline <= time.monotonic():
+                raise DeadlineExceeded("Deadline exceeded during AI completion")
+            raise
+    
+    async def _request_completion(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        position: QueuePosition,
+        cache_key: Optional[str] = None,
+        cache_ttl: Optional[int] = None
+    ) -> str:
+        """Call Groq once the breaker and limiter allow it"""
+        async with self.breaker.guard(), self.limiter.slot(position=position):
+            response = await self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                timeout=self.timeout
+            )
+        content = response.choices[0].message.content
+        
+        if cache_key and content:
+            await self.cache.set(cache_key, content, cache_ttl)
+        return content
+    
+    async def _stream_messages(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        priority: Priority = Priority.INTERACTIVE,
+        deadline: Optional[float] = None
+    ) -> AsyncIterator[str]:
+        """Yield completion text chunks as the model produces them"""
+        if deadline is None:
+            deadline = current_deadline()
+        async with self.breaker.guard(), self.limiter.slot(priority, deadline):
+            stream = await self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                timeout=bounded_timeout(self.timeout, "AI completion"),
+                stream=True
+            )
+            try:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            finally:
+                # Release the pooled connection even if the client disconnects mid-stream
+                await stream.close()
     
-    async def get_completion(self, prompt: str, system_prompt: str = None, temperature: float = 0.7) -> str:
+    def get_stats(self) -> Dict[str, Any]:
+        """Get scheduling, cache, coalescing and circuit breaker statistics for monitoring"""
+        return {
+            "model": self.model,
+            "scheduler": self.limiter.get_stats(),
+            "cache": self.cache.get_stats(),
+            "coalescing": self.single_flight.get_stats(),
+            "semantic_cache": self.semantic_cache.get_stats(),
+            "circuit_breaker": self.breaker.get_stats()
+        }
+    
+    async def get_completion(
+        self,
+        prompt: str,
+        system_prompt: str = None,
+        temperature: float = 0.7,
+        priority: Priority = Priority.STANDARD,
+        deadline: Optional[float] = None
+    ) -> str:
         """Get completion from Groq API with enhanced error handling"""
         
         messages = []
@@ -26,22 +218,39 @@ class GroqService:
         
         for attempt in range(self.max_retries):
             try:
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=messages,
-                    temperature=temperature,
-                    max_tokens=2048,
-                    timeout=self.timeout
-                )
-                return response.choices[0].message.content
+                return await self._create_completion(messages, temperature, 2048, priority, deadline)
             
+            except (LLMUnavailableError, DeadlineExceeded):
+                # Refused locally (breaker open, admission control, deadline); retrying would not help
+                raise
             except Exception as e:
-                if attempt == self.max_retries - 1:
+                backoff = 1 * (attempt + 1)  # Exponential backoff
+                left = remaining()
+                if attempt == self.max_retries - 1 or (left is not None and left <= backoff):
                     raise e
-                await asyncio.sleep(1 * (attempt + 1))  # Exponential backoff
+                await asyncio.sleep(backoff)
         
         return ""
     
+    async def stream_completion(
+        self,
+        prompt: str,
+        system_prompt: str = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        priority: Priority = Priority.INTERACTIVE,
+        deadline: Optional[float] = None
+    ) -> AsyncIterator[str]:
+        """Stream a completion from Groq API token by token"""
+        
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+        
+        async for chunk in self._stream_messages(messages, temperature, max_tokens, priority, deadline):
+            yield chunk
+    
     async def get_structured_completion(self, prompt: str, system_prompt: str = None, schema: Dict[str, Any] = None) -> Dict[str, Any]:
         """Get structured JSON completion from Groq API"""
         
@@ -100,7 +309,7 @@ class GroqService:
         """
         
         try:
-            response = self.client.chat.completions.create(
+            content = await self._create_completion(
                 messages=[
                     {
                         "role": "system",
@@ -111,18 +320,19 @@ class GroqService:
                         "content": prompt
                     }
                 ],
-                model=self.model,
                 temperature=0.7,
                 max_tokens=1500
             )
             
-            return response.choices[0].message.content
+            return content
             
+        except (LLMUnavailableError, DeadlineExceeded):
+            raise
         except Exception as e:
             raise Exception(f"Groq API error: {str(e)}")
     
-    async def get_chat_response(self, message: str, context: Dict[str, Any]) -> str:
-        """Get AI response for career guidance chat"""
+    def _build_chat_messages(self, message: str, context: Dict[str, Any]) -> List[Dict[str, str]]:
+        """Build the prompt used for career guidance chat"""
         
         context_str = ""
         if context:
@@ -135,28 +345,80 @@ class GroqService:
         Keep the response conversational but informative, and offer specific actionable advice when possible.
         """
         
+        return [
+            {
+                "role": "system",
+                "content": "You are a friendly and knowledgeable career counselor. Help users with career-related questions, course recommendations, college selection, and professional development advice. Be encouraging and provide practical guidance."
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
+    
+    def _use_semantic_cache(self, context: Dict[str, Any], bypass_cache: bool) -> bool:
+        """Only generic questions are shared; answers shaped by user context are not"""
+        if bypass_cache:
+            self.semantic_cache.record_bypass()
+            return False
+        return self.semantic_cache.enabled and not context
+    
+    async def get_chat_response(
+        self,
+        message: str,
+        context: Dict[str, Any],
+        priority: Priority = Priority.INTERACTIVE,
+        bypass_cache: bool = False
+    ) -> str:
+        """Get AI response for career guidance chat"""
+        
+        use_cache = self._use_semantic_cache(context, bypass_cache)
+        if use_cache:
+            cached = await self.semantic_cache.lookup(message)
+            if cached is not None:
+                return cached
+        
         try:
-            response = self.client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a friendly and knowledgeable career counselor. Help users with career-related questions, course recommendations, college selection, and professional development advice. Be encouraging and provide practical guidance."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                model=self.model,
+            content = await self._create_completion(
+                messages=self._build_chat_messages(message, context),
                 temperature=0.8,
-                max_tokens=800
+                max_tokens=800,
+                priority=priority
             )
             
-            return response.choices[0].message.content
+            if use_cache:
+                await self.semantic_cache.store(message, content)
+            return content
             
+        except (LLMUnavailableError, DeadlineExceeded):
+            raise
         except Exception as e:
             raise Exception(f"Groq API error: {str(e)}")
     
+    async def stream_chat_response(
+        self,
+        message: str,
+        context: Dict[str, Any],
+        priority: Priority = Priority.INTERACTIVE,
+        bypass_cache: bool = False
+    ) -> AsyncIterator[str]:
+        """Stream AI response for career guidance chat"""
+        
+        use_cache = self._use_semantic_cache(context, bypass_cache)
+        if use_cache:
+            cached = await self.semantic_cache.lookup(message)
+            if cached is not None:
+                yield cached
+                return
+        
+        chunks = []
+        async for chunk in self._stream_messages(self._build_chat_messages(message, context), 0.8, 800, priority):
+            chunks.append(chunk)
+            yield chunk
+        
+        if use_cache:
+            await self.semantic_cache.store(message, "".join(chunks))
+    
     async def analyze_skills(self, skills: List[str], target_career: str = None) -> Dict[str, Any]:
         """Analyze user skills and provide improvement suggestions"""
         
@@ -183,7 +445,7 @@ class GroqService:
         """
         
         try:
-            response = self.client.chat.completions.create(
+            content = await self._create_completion(
                 messages=[
                     {
                         "role": "system",
@@ -194,16 +456,15 @@ class GroqService:
                         "content": prompt
                     }
                 ],
-                model=self.model,
                 temperature=0.6,
-                max_tokens=1000
+                max_tokens=1000,
+                cache_ttl=self.cache_ttls["skill_analysis"]
             )
             
             try:
-                return json.loads(response.choices[0].message.content)
+                return json.loads(content)
             except json.JSONDecodeError:
                 # Fallback if response is not valid JSON
-                content = response.choices[0].message.content
                 return {
                     "gaps": [],
                     "strengths": [],
@@ -211,6 +472,8 @@ class GroqService:
                     "courses": []
                 }
             
+        except (LLMUnavailableError, DeadlineExceeded):
+            raise
         except Exception as e:
             raise Exception(f"Groq API error: {str(e)}")
     
@@ -236,7 +499,7 @@ class GroqService:
         """
         
         try:
-            response = self.client.chat.completions.create(
+            content = await self._create_completion(
                 messages=[
                     {
                         "role": "system",
@@ -247,16 +510,15 @@ class GroqService:
                         "content": prompt
                     }
                 ],
-                model=self.model,
                 temperature=0.5,
-                max_tokens=1200
+                max_tokens=1200,
+                cache_ttl=self.cache_ttls["market_trends"]
             )
             
             try:
-                return json.loads(response.choices[0].message.content)
+                return json.loads(content)
             except json.JSONDecodeError:
                 # Fallback if response is not valid JSON
-                content = response.choices[0].message.content
                 return {
                     "current": [content],
                     "emerging": [],
@@ -264,6 +526,8 @@ class GroqService:
                     "growth": []
                 }
             
+        except (LLMUnavailableError, DeadlineExceeded):
+            raise
         except Exception as e:
             raise Exception(f"Groq API error: {str(e)}")
     
@@ -300,7 +564,7 @@ class GroqService:
         """
         
         try:
-            response = self.client.chat.completions.create(
+            content = await self._create_completion(
                 messages=[
                     {
                         "role": "system",
@@ -311,16 +575,15 @@ class GroqService:
                         "content": prompt
                     }
                 ],
-                model=self.model,
                 temperature=0.6,
-                max_tokens=1500
+                max_tokens=1500,
+                cache_ttl=self.cache_ttls["learning_path"]
             )
             
             try:
-                return json.loads(response.choices[0].message.content)
+                return json.loads(content)
             except json.JSONDecodeError:
                 # Fallback if response is not valid JSON
-                content = response.choices[0].message.content
                 return {
                     "timeline": "6-12 months",
                     "phases": [{"phase": "Learning Phase", "skills": [content]}],
@@ -328,6 +591,8 @@ class GroqService:
                     "projects": []
                 }
             
+        except (LLMUnavailableError, DeadlineExceeded):
+            raise
         except Exception as e:
             raise Exception(f"Groq API error: {str(e)}")
 
@@ -0,0 +1,153 @@
+"""
+HTML parsing off the event loop
+Large pages are parsed in a worker process pool; tables are extracted with a streaming lxml parser when available
+"""
+
+import asyncio
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional
+from bs4 import BeautifulSoup
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+# Parse functions run in worker processes, so they must be importable module-level
+# functions that take and return plain picklable values.
+
+def _cell_text(cell) -> str:
+    return " ".join(" ".join(cell.itertext()).split())
+
+def _table_result(rows: List[List[str]], header_row: Optional[List[str]]) -> Dict[str, Any]:
+    return {"headers": header_row or [], "rows": rows}
+
+def _parse_table_streaming(html: str, table_index: int, max_rows: Optional[int]) -> Dict[str, Any]:
+    header_row = None
+    rows: List[List[str]] = []
+    tables_seen = 0
+    open_tables: List[int] = []
+
+    # iterparse keeps memory flat on very large ranking tables: each row is
+    # converted and discarded as soon as its closing tag is seen
+    for event, element in etree.iterparse(io.BytesIO(html.encode("utf-8")), events=("start", "end"), html=True):
+        if element.tag == "table":
+            if event == "start":
+                open_tables.append(tables_seen)
+                tables_seen += 1
+            else:
+                if open_tables.pop() == table_index:
+                    break
+                # Tables nested in the target are kept: their text belongs to the enclosing cell
+                if table_index not in open_tables:
+                    element.clear()
+            continue
+
+        if event != "end" or element.tag != "tr":
+            continue
+        if table_index in open_tables and open_tables[-1] != table_index:
+            # Row of a table nested in a cell of the target; its text belongs to that cell
+            continue
+        if open_tables and open_tables[-1] == table_index:
+            cells = [child for child in element if child.tag in ("td", "th")]
+            if cells:
+                if header_row is None and not rows and all(cell.tag == "th" for cell in cells):
+                    header_row = [_cell_text(cell) for cell in cells]
+                else:
+                    rows.append([_cell_text(cell) for cell in cells])
+                    if max_rows is not None and len(rows) >= max_rows:
+                        break
+        element.clear()
+        while element.getprevious() is not None:
+            del element.getparent()[0]
+
+    return _table_result(rows, header_row)
+
+def _parse_table_soup(html: str, table_index: int, max_rows: Optional[int]) -> Dict[str, Any]:
+    tables = BeautifulSoup(html, "html.parser").find_all("table")
+    if table_index >= len(tables):
+        return _table_result([], None)
+
+    header_row = None
+    rows: List[List[str]] = []
+    for tr in tables[table_index].find_all("tr"):
+        if tr.find_parent("table") is not tables[table_index]:
+            continue
+        cells = tr.find_all(["td", "th"], recursive=False)
+        if not cells:
+            continue
+        texts = [" ".join(cell.get_text(" ").split()) for cell in cells]
+        if header_row is None and not rows and all(cell.name == "th" for cell in cells):
+            header_row = texts
+        else:
+            rows.append(texts)
+            if max_rows is not None and len(rows) >= max_rows:
+                break
+    return _table_result(rows, header_row)
+
+def parse_table(html: str, table_index: int = 0, max_rows: Optional[int] = None) -> Dict[str, Any]:
+    """Extract one table as {"headers": [...], "rows": [[...], ...]}"""
+    if etree is not None:
+        return _parse_table_streaming(html, table_index, max_rows)
+    return _parse_table_soup(html, table_index, max_rows)
+
+def rows_as_dicts(table: Dict[str, Any]) -> List[Dict[str, str]]:
+    """Key each row of a parsed table by its column headers in snake_case ("Exam Date" -> "exam_date")"""
+    keys = ["_".join(header.lower().split()) for header in table["headers"]]
+    return [dict(zip(keys, row)) for row in table["rows"]]
+
+class HTMLParserPool:
+    """Runs parse functions in worker processes, or in a thread for pages too small to be worth the hop"""
+
+    def __init__(self, max_workers: Optional[int] = None, inline_max_bytes: int = 64 * 1024):
+        self.max_workers = max_workers
+        self.inline_max_bytes = inline_max_bytes
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.process_parses = 0
+        self.thread_parses = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    async def parse(self, func: Callable[..., Any], html: str, *args) -> Any:
+        """Run func(html, *args) without blocking the event loop"""
+        if len(html) <= self.inline_max_bytes:
+            self.thread_parses += 1
+            return await asyncio.to_thread(func, html, *args)
+
+        self.process_parses += 1
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._get_executor(), func, html, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory on a huge page); start a fresh pool for the next call
+            logger.error("HTML parser pool broke, restarting it")
+            self._executor = None
+            raise
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "lxml" if etree is not None else "beautifulsoup",
+            "workers": self.max_workers or os.cpu_count(),
+            "process_parses": self.process_parses,
+            "thread_parses": self.thread_parses
+        }
+
+_workers = os.getenv("HTML_PARSER_WORKERS")
+html_parser_pool = HTMLParserPool(
+    max_workers=int(_workers) if _workers else None,
+    inline_max_bytes=int(os.getenv("HTML_PARSER_INLINE_BYTES", str(64 * 1024)))
+)
@@ -0,0 +1,128 @@
+"""
+Exact-match response cache for LLM completions
+In-process LRU tier with an optional MongoDB tier shared across workers
+"""
+
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, Tuple
+from app.services.database import get_database
+import logging
+
+logger = logging.getLogger(__name__)
+
+def _normalize_text(text: Optional[str]) -> str:
+    """Collapse whitespace so indentation changes in prompt templates do not split the cache"""
+    return " ".join((text or "").split())
+
+def make_cache_key(model: str, system_prompt: Optional[str], prompt: str, temperature: float, max_tokens: int) -> str:
+    """Build a stable hash for a completion request"""
+    payload = json.dumps([
+        model,
+        _normalize_text(system_prompt),
+        _normalize_text(prompt),
+        round(float(temperature), 2),
+        int(max_tokens)
+    ], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class LLMResponseCache:
+    """TTL cache with LRU eviction bounded by entry count and total response size"""
+
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 16 * 1024 * 1024,
+                 mongo_enabled: bool = False, collection_name: str = "llm_cache"):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.mongo_enabled = mongo_enabled
+        self.collection_name = collection_name
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._size = 0
+        self._mongo_indexed = False
+        self.hits = 0
+        self.mongo_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _collection(self):
+        db = get_database() if self.mongo_enabled else None
+        return db[self.collection_name] if db is not None else None
+
+    async def get(self, key: str) -> Optional[str]:
+        """Look up a cached response, checking memory before MongoDB"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            self._remove(key)
+
+        collection = self._collection()
+        if collection is not None:
+            try:
+                doc = await collection.find_one({"_id": key, "expires_at": {"$gt": datetime.utcnow()}})
+            except Exception as e:
+                logger.warning(f"LLM cache lookup failed: {e}")
+                doc = None
+            if doc:
+                remaining = (doc["expires_at"] - datetime.utcnow()).total_seconds()
+                self._store(key, doc["response"], remaining)
+                self.hits += 1
+                self.mongo_hits += 1
+                return doc["response"]
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: str, ttl: float):
+        """Cache a response for ttl seconds"""
+        self._store(key, value, ttl)
+
+        collection = self._collection()
+        if collection is not None:
+            try:
+                if not self._mongo_indexed:
+                    await collection.create_index("expires_at", expireAfterSeconds=0)
+                    self._mongo_indexed = True
+                await collection.update_one(
+                    {"_id": key},
+                    {"$set": {"response": value, "expires_at": datetime.utcnow() + timedelta(seconds=ttl)}},
+                    upsert=True
+                )
+            except Exception as e:
+                logger.warning(f"LLM cache write failed: {e}")
+
+    def _store(self, key: str, value: str, ttl: float):
+        self._remove(key)
+        self._entries[key] = (time.time() + ttl, value)
+        self._size += len(value)
+        while self._entries and (len(self._entries) > self.max_entries or self._size > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry[1])
+
+    def clear(self):
+        self._entries.clear()
+        self._size = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "size_bytes": self._size,
+            "hits": self.hits,
+            "mongo_hits": self.mongo_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "mongo_enabled": self.mongo_enabled
+        }
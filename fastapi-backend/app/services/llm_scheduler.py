@@ -0,0 +1,141 @@
+"""
+Admission control for LLM calls
+Bounds the number of in-flight completions and orders waiting callers by priority
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import Dict, Any, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Priority(IntEnum):
+    """Lower values are served first"""
+    INTERACTIVE = 0
+    STANDARD = 1
+    BATCH = 2
+
+class LLMUnavailableError(Exception):
+    """Raised when an LLM call is refused without reaching the provider"""
+
+class LLMQueueFullError(LLMUnavailableError):
+    """Raised when the wait queue is already at capacity"""
+
+class LLMRequestExpiredError(LLMUnavailableError):
+    """Raised when a queued request's deadline passes before it gets a slot"""
+
+class QueuePosition:
+    """Priority of an acquire shared by several callers, raised while it waits when a more urgent caller joins"""
+
+    def __init__(self, priority: Priority = Priority.STANDARD):
+        self.priority = priority
+        self._limiter: Optional["PriorityLimiter"] = None
+        self._future: Optional[asyncio.Future] = None
+        self._deadline: Optional[float] = None
+
+    def raise_to(self, priority: Priority):
+        if priority >= self.priority:
+            return
+        self.priority = priority
+        if self._future is not None and not self._future.done():
+            # The old heap entry stays behind and is skipped once the future is done
+            self._limiter._push(priority, self._future, self._deadline)
+
+class PriorityLimiter:
+    """Concurrency limiter that hands free slots to the highest-priority waiter"""
+
+    def __init__(self, max_concurrency: int, max_queue: int):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._active = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future, Optional[float]]] = []
+        self._sequence = itertools.count()
+        self.granted = 0
+        self.rejected = 0
+        self.expired = 0
+
+    def _push(self, priority: Priority, future: asyncio.Future, deadline: Optional[float]):
+        heapq.heappush(self._waiters, (int(priority), next(self._sequence), future, deadline))
+
+    async def acquire(self, priority: Priority = Priority.STANDARD, deadline: Optional[float] = None,
+                      position: Optional[QueuePosition] = None):
+        """Wait for a slot; deadline is an absolute time.monotonic() value
+
+        With a position, its priority is used instead and can still be raised while waiting.
+        """
+        if position is not None:
+            priority = position.priority
+        if deadline is not None and deadline <= time.monotonic():
+            self.expired += 1
+            raise LLMRequestExpiredError("Request deadline passed before it was scheduled")
+
+        if self._active < self.max_concurrency and not self._waiters:
+            self._active += 1
+            self.granted += 1
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            # Drop entries left behind by callers that timed out or were cancelled
+            self._waiters = [waiter for waiter in self._waiters if not waiter[2].done()]
+            heapq.heapify(self._waiters)
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise LLMQueueFullError("Too many pending AI requests, please retry shortly")
+
+        future = asyncio.get_running_loop().create_future()
+        self._push(priority, future, deadline)
+        if position is not None:
+            position._limiter, position._future, position._deadline = self, future, deadline
+
+        timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self.expired += 1
+            raise LLMRequestExpiredError("Request deadline passed while waiting for an AI slot")
+        except BaseException:
+            # A slot may have been handed over just as the waiter was cancelled
+            if future.done() and not future.cancelled() and future.exception() is None:
+                self.release()
+            raise
+        self.granted += 1
+
+    def release(self):
+        """Pass the slot to the next live waiter, dropping any that have expired"""
+        now = time.monotonic()
+        while self._waiters:
+            _, _, future, deadline = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            if deadline is not None and deadline <= now:
+                future.set_exception(LLMRequestExpiredError("Request deadline passed while waiting for an AI slot"))
+                self.expired += 1
+                continue
+            future.set_result(None)
+            return
+        self._active -= 1
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority = Priority.STANDARD, deadline: Optional[float] = None,
+                   position: Optional[QueuePosition] = None):
+        await self.acquire(priority, deadline, position)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "active": self._active,
+            "queued": len({id(future) for _, _, future, _ in self._waiters if not future.done()}),
+            "granted": self.granted,
+            "rejected": self.rejected,
+            "expired": self.expired
+        }
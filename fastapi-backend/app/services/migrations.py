@@ -0,0 +1,226 @@
+"""
+MongoDB index registry and versioned migrations
+Applied at startup when MONGO_MIGRATE_ON_STARTUP=true, or on demand with:
+    python -m app.services.migrations [--status] [--indexes-only]
+"""
+
+import argparse
+import asyncio
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from app.services.database import connect_to_mongo, close_mongo_connection, get_database
+from app.services.search import SEARCH_KEYS_FIELD, backfill_search_keys
+import logging
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_COLLECTION = "schema_migrations"
+
+# Server error codes for an existing index whose name or options differ from the requested one
+INDEX_CONFLICT_CODES = (85, 86)
+
+# Every index the routers rely on, by collection. Names are fixed so changing a
+# definition here replaces the old index instead of adding a second one.
+INDEXES: Dict[str, List[IndexModel]] = {
+    "colleges": [
+        # GET /colleges pages by (ranking, _id); /locations and /types read distinct values off these
+        IndexModel([("ranking", ASCENDING), ("_id", ASCENDING)], name="ranking"),
+        IndexModel([("location", ASCENDING), ("ranking", ASCENDING)], name="location_ranking"),
+        IndexModel([("type", ASCENDING), ("ranking", ASCENDING)], name="type_ranking"),
+        # GET /colleges/recommendations/{user_id}: courses_offered $in, sorted by rating then ranking
+        IndexModel(
+            [("courses_offered", ASCENDING), ("rating", DESCENDING), ("ranking", ASCENDING)],
+            name="courses_offered_rating_ranking"
+        ),
+        IndexModel([("name", ASCENDING)], name="name"),
+        # Search: whole words ranked by the text index, partial words and the location/type
+        # filters through prefix keys (see app/services/search.py)
+        IndexModel(
+            [("name", TEXT), ("location", TEXT), ("courses_offered", TEXT), ("type", TEXT)],
+            weights={"name": 10, "location": 5, "courses_offered": 2, "type": 1},
+            name="text_search"
+        ),
+        IndexModel(
+            [(SEARCH_KEYS_FIELD, ASCENDING), ("ranking", ASCENDING), ("_id", ASCENDING)],
+            name="search_keys_ranking"
+        )
+    ],
+    "courses": [
+        # CourseRecommenderAgent reads the full documents of the courses it picked by title
+        IndexModel([("title", ASCENDING)], name="title"),
+        # find_matching_courses
+        IndexModel(
+            [("title", TEXT), ("skills", TEXT), ("category", TEXT), ("description", TEXT)],
+            weights={"title": 10, "skills": 5, "category": 5, "description": 1},
+            name="text_search"
+        )
+    ],
+    "aptitude_questions": [
+        IndexModel([("category", ASCENDING), ("difficulty", ASCENDING)], name="category_difficulty")
+    ],
+    "aptitude_results": [
+        # GET /aptitude/results/{user_id} pages by (completed_at, _id), newest first
+        IndexModel(
+            [("user_id", ASCENDING), ("completed_at", DESCENDING), ("_id", DESCENDING)],
+            name="user_id_completed_at"
+        )
+    ]
+}
+
+@dataclass
+class Migration:
+    version: int
+    description: str
+    apply: Callable[[Any], Awaitable[None]]
+
+async def _drop_indexes_if_present(collection, names: List[str]):
+    existing = await collection.index_information()
+    for name in names:
+        if name in existing:
+            await collection.drop_index(name)
+            logger.info(f"Dropped index {collection.name}.{name}")
+
+async def _drop_superseded_indexes(db):
+    # Single-field indexes made redundant by the compound indexes in INDEXES;
+    # keeping them only slows down writes
+    await _drop_indexes_if_present(db.aptitude_questions, ["category_1"])
+    await _drop_indexes_if_present(db.aptitude_results, ["user_id_1"])
+    await _drop_indexes_if_present(db.colleges, ["ranking_1", "courses_offered_1"])
+
+async def _drop_course_match_indexes(db):
+    # find_matching_courses searches the text index instead of an $or over these fields;
+    # "title" stays, CourseRecommenderAgent still looks courses up by title
+    await _drop_indexes_if_present(db.courses, ["category_rating", "skills"])
+
+# Append only: each migration runs once per database, in version order
+MIGRATIONS: List[Migration] = [
+    Migration(1, "Drop single-field indexes superseded by the compound index registry", _drop_superseded_indexes),
+    Migration(2, "Drop course indexes replaced by the course text index", _drop_course_match_indexes)
+]
+
+async def _drop_conflicting_index(collection, index: IndexModel):
+    # Drop the index holding this name, or these keys under another name
+    name = index.document["name"]
+    keys = list(index.document["key"].items())
+    for existing_name, info in (await collection.index_information()).items():
+        if existing_name == name or (existing_name != "_id_" and info["key"] == keys):
+            await collection.drop_index(existing_name)
+
+async def apply_indexes(db, registry: Dict[str, List[IndexModel]] = None) -> Dict[str, List[str]]:
+    """Create every registered index; safe to run on every startup"""
+    registry = INDEXES if registry is None else registry
+    ensured = {}
+    for collection_name, indexes in registry.items():
+        collection = db[collection_name]
+        ensured[collection_name] = []
+        for index in indexes:
+            try:
+                await collection.create_indexes([index])
+            except OperationFailure as e:
+                if e.code not in INDEX_CONFLICT_CODES:
+                    raise
+                # The definition changed since the index was built
+                logger.info(f"Rebuilding index {collection_name}.{index.document['name']}: {e}")
+                await _drop_conflicting_index(collection, index)
+                await collection.create_indexes([index])
+            ensured[collection_name].append(index.document["name"])
+    return ensured
+
+async def run_migrations(db, migrations: List[Migration] = None) -> List[int]:
+    """Apply the migrations this database has not seen yet and return their versions"""
+    migrations = MIGRATIONS if migrations is None else migrations
+    collection = db[MIGRATIONS_COLLECTION]
+    applied_versions = {doc["_id"] for doc in await collection.find({}, {"_id": 1}).to_list(length=None)}
+
+    applied = []
+    for migration in sorted(migrations, key=lambda m: m.version):
+        if migration.version in applied_versions:
+            continue
+        # Claim the version first so two processes starting together never run it twice
+        try:
+            await collection.insert_one({
+                "_id": migration.version,
+                "description": migration.description,
+                "status": "running",
+                "started_at": datetime.utcnow()
+            })
+        except DuplicateKeyError:
+            logger.info(f"Migration {migration.version} is being applied by another process")
+            continue
+
+        logger.info(f"Applying migration {migration.version}: {migration.description}")
+        try:
+            await migration.apply(db)
+        except Exception:
+            await collection.delete_one({"_id": migration.version})
+            raise
+        await collection.update_one(
+            {"_id": migration.version},
+            {"$set": {"status": "applied", "applied_at": datetime.utcnow()}}
+        )
+        applied.append(migration.version)
+    return applied
+
+async def migrate(db=None) -> Dict[str, Any]:
+    """Run pending migrations, make sure every registered index exists and fill in missing search keys"""
+    db = get_database() if db is None else db
+    applied = await run_migrations(db)
+    indexes = await apply_indexes(db)
+    search_keys = await backfill_search_keys(db)
+    logger.info(
+        f"Database migrated: {len(applied)} migrations applied, indexes on {len(indexes)} collections ensured, "
+        f"search keys updated for {search_keys} colleges"
+    )
+    return {"applied_migrations": applied, "indexes": indexes, "search_keys_updated": search_keys}
+
+async def get_status(db=None) -> Dict[str, Any]:
+    db = get_database() if db is None else db
+    records = await db[MIGRATIONS_COLLECTION].find({}).sort("_id", 1).to_list(length=None)
+    applied_versions = {record["_id"] for record in records if record.get("status") == "applied"}
+    missing_indexes = {}
+    for collection_name, indexes in INDEXES.items():
+        existing = await db[collection_name].index_information()
+        missing = [index.document["name"] for index in indexes if index.document["name"] not in existing]
+        if missing:
+            missing_indexes[collection_name] = missing
+    return {
+        "migrations": records,
+        "pending_migrations": [m.version for m in MIGRATIONS if m.version not in applied_versions],
+        "missing_indexes": missing_indexes
+    }
+
+async def migrate_on_startup():
+    """Called from the API lifespan; a failure is logged rather than keeping the API down"""
+    if os.getenv("MONGO_MIGRATE_ON_STARTUP", "true").lower() != "true":
+        return
+    try:
+        await migrate()
+    except Exception as e:
+        logger.error(f"Database migration failed, run python -m app.services.migrations to retry: {e}")
+
+async def _run_cli(args):
+    await connect_to_mongo()
+    try:
+        if args.status:
+            status = await get_status()
+            for record in status["migrations"]:
+                print(f"{record['_id']:>4}  {record.get('status', ''):<8}  {record.get('description', '')}")
+            print(f"Pending migrations: {status['pending_migrations'] or 'none'}")
+            print(f"Missing indexes: {status['missing_indexes'] or 'none'}")
+        elif args.indexes_only:
+            print(await apply_indexes(get_database()))
+        else:
+            print(await migrate())
+    finally:
+        await close_mongo_connection()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+    parser = argparse.ArgumentParser(description="Apply MongoDB migrations and indexes")
+    parser.add_argument("--status", action="store_true", help="Show applied migrations and missing indexes")
+    parser.add_argument("--indexes-only", action="store_true", help="Only create the registered indexes")
+    asyncio.run(_run_cli(parser.parse_args()))
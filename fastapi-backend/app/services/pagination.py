@@ -0,0 +1,102 @@
+"""
+Keyset pagination for listing endpoints
+Opaque cursors carry the sort key and _id of the last item returned, so every page starts with an index seek
+"""
+
+import base64
+import binascii
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from bson import json_util
+from pymongo import ASCENDING
+from starlette.responses import JSONResponse
+
+MAX_PAGE_SIZE = int(os.getenv("PAGE_SIZE_MAX", "100"))
+
+class InvalidCursorError(ValueError):
+    """Raised for a cursor that this module did not produce"""
+
+# List endpoints that return a bare JSON array send the next page's cursor in this header
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def header_page_responses(description: str) -> Dict[int, Dict[str, Any]]:
+    """OpenAPI responses for such an endpoint, which is declared without a response_model"""
+    return {200: {
+        "description": description,
+        "content": {"application/json": {"schema": {"type": "array", "items": {"type": "object"}}}},
+        "headers": {NEXT_CURSOR_HEADER: {
+            "description": "Cursor for the next page; absent on the last page",
+            "schema": {"type": "string"}
+        }}
+    }}
+
+def encode_cursor(position: Dict[str, Any]) -> str:
+    # Extended JSON keeps ObjectIds and datetimes intact across the round trip
+    return base64.urlsafe_b64encode(json_util.dumps(position).encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        position = json_util.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8"))
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        position = None
+    if not isinstance(position, dict):
+        raise InvalidCursorError("Invalid cursor")
+    return position
+
+def with_id(sort: Sequence[Tuple[str, int]]) -> List[Tuple[str, int]]:
+    """sort with _id appended as a tie-breaker, so every document has a unique position"""
+    sort = list(sort)
+    if not sort or sort[-1][0] != "_id":
+        sort.append(("_id", sort[-1][1] if sort else ASCENDING))
+    return sort
+
+def position_of(doc: Dict[str, Any], sort: Sequence[Tuple[str, int]]) -> Dict[str, Any]:
+    return {field: doc.get(field) for field, _ in sort}
+
+def keyset_filter(sort: Sequence[Tuple[str, int]], after: Dict[str, Any]) -> Dict[str, Any]:
+    """Documents that come strictly after the position after in sort order (sort must end with _id)"""
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        equal = {name: after.get(name) for name, _ in sort[:i]}
+        value = after.get(field)
+        # MongoDB sorts null and missing values before everything else
+        if value is None:
+            if direction == ASCENDING:
+                clauses.append({**equal, field: {"$ne": None}})
+        elif direction == ASCENDING:
+            clauses.append({**equal, field: {"$gt": value}})
+        else:
+            clauses.append({**equal, field: {"$lt": value}})
+            clauses.append({**equal, field: None})
+    return {"$or": clauses} if clauses else {"_id": {"$exists": False}}
+
+def after_cursor(query: Dict[str, Any], sort: Sequence[Tuple[str, int]], cursor: Optional[str]) -> Dict[str, Any]:
+    if not cursor:
+        return query
+    keyset = keyset_filter(sort, decode_cursor(cursor))
+    return {"$and": [query, keyset]} if query else keyset
+
+def page_of(docs: List[Dict[str, Any]], sort: Sequence[Tuple[str, int]], limit: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Split limit + 1 fetched documents into the page and the cursor of the next one"""
+    if len(docs) <= limit:
+        return docs, None
+    docs = docs[:limit]
+    return docs, encode_cursor(position_of(docs[-1], sort))
+
+async def fetch_page(collection, query: Dict[str, Any], sort: Sequence[Tuple[str, int]], limit: int,
+                     cursor: Optional[str] = None, skip: int = 0,
+                     **find_options) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """One page of query results in sort order and the cursor for the next page
+
+    Pages continue from cursor when given; skip is kept for offset-based clients.
+    """
+    sort = with_id(sort)
+    limit = min(limit, MAX_PAGE_SIZE)
+    find = collection.find(after_cursor(query, sort, cursor), **find_options).sort(sort)
+    if skip and not cursor:
+        find = find.skip(skip)
+    docs = await find.limit(limit + 1).to_list(length=None)
+    return page_of(docs, sort, limit)
+
+async def invalid_cursor_handler(request, exc: InvalidCursorError) -> JSONResponse:
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
@@ -0,0 +1,225 @@
+"""
+Polite HTTP fetching for the web scraper
+Per-host request pacing that honours robots.txt, and an ETag/Last-Modified cache for conditional GETs
+"""
+
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+import aiohttp
+from app.services.database import get_database
+from app.services.deadline import DeadlineExceeded, remaining
+import logging
+
+logger = logging.getLogger(__name__)
+
+class RobotsDisallowedError(Exception):
+    """Raised instead of fetching a URL that robots.txt disallows"""
+
+class TokenBucket:
+    """Allows rate requests per second on average with bursts of up to burst requests"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        self.waits = 0
+
+    async def acquire(self, what: str = "request"):
+        # Waiters queue on the lock, so tokens are handed out in arrival order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+                left = remaining()
+                if left is not None and wait > left:
+                    raise DeadlineExceeded(f"Deadline exceeded waiting to send {what}")
+                self.waits += 1
+                await asyncio.sleep(wait)
+
+class HostRateLimiter:
+    """One token bucket per host, slowed down to the host's robots.txt crawl delay"""
+
+    def __init__(self, user_agent: str, rate: float = 1.0, burst: int = 2,
+                 robots_ttl: int = 24 * 3600, robots_timeout: float = 5):
+        self.user_agent = user_agent
+        self.rate = rate
+        self.burst = burst
+        self.robots_ttl = robots_ttl
+        self.robots_timeout = robots_timeout
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._robots: Dict[str, Tuple[float, RobotFileParser]] = {}
+        self._robots_locks: Dict[str, asyncio.Lock] = {}
+        self.disallowed = 0
+
+    async def _get_robots(self, session: aiohttp.ClientSession, origin: str) -> RobotFileParser:
+        cached = self._robots.get(origin)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+
+        # One robots.txt download per host even when many pages are requested at once
+        lock = self._robots_locks.setdefault(origin, asyncio.Lock())
+        async with lock:
+            cached = self._robots.get(origin)
+            if cached and cached[0] > time.monotonic():
+                return cached[1]
+
+            parser = RobotFileParser(f"{origin}/robots.txt")
+            ttl = self.robots_ttl
+            try:
+                async with session.get(
+                    f"{origin}/robots.txt", timeout=aiohttp.ClientTimeout(total=self.robots_timeout)
+                ) as response:
+                    if response.status in (401, 403):
+                        parser.disallow_all = True
+                    elif response.status >= 400:
+                        parser.allow_all = True
+                    else:
+                        parser.parse((await response.text()).splitlines())
+            except Exception as e:
+                # Unreachable robots.txt: allow crawling, but look again sooner
+                logger.warning(f"Could not read robots.txt for {origin}: {e}")
+                parser.allow_all = True
+                ttl = min(ttl, 3600)
+
+            self._robots[origin] = (time.monotonic() + ttl, parser)
+            self._buckets[origin] = TokenBucket(self._rate_for(parser), 1 if self._crawl_delay(parser) else self.burst)
+            return parser
+
+    def _crawl_delay(self, parser: RobotFileParser) -> Optional[float]:
+        delay = parser.crawl_delay(self.user_agent)
+        if delay:
+            return float(delay)
+        request_rate = parser.request_rate(self.user_agent)
+        if request_rate and request_rate.requests:
+            return request_rate.seconds / request_rate.requests
+        return None
+
+    def _rate_for(self, parser: RobotFileParser) -> float:
+        delay = self._crawl_delay(parser)
+        return min(self.rate, 1 / delay) if delay else self.rate
+
+    async def acquire(self, session: aiohttp.ClientSession, url: str):
+        """Wait for the URL's host to accept another request; raises RobotsDisallowedError if it never will"""
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        parser = await self._get_robots(session, origin)
+        if not parser.can_fetch(self.user_agent, url):
+            self.disallowed += 1
+            raise RobotsDisallowedError(f"robots.txt disallows {url}")
+
+        await self._buckets[origin].acquire(f"request to {parts.netloc}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "hosts": len(self._buckets),
+            "rates": {origin: round(bucket.rate, 4) for origin, bucket in self._buckets.items()},
+            "waits": sum(bucket.waits for bucket in self._buckets.values()),
+            "disallowed": self.disallowed
+        }
+
+def parser_id(parse: Callable[..., Any], parse_args: Tuple[Any, ...] = ()) -> str:
+    """Identifies what a parsed page was produced by: the parse function and its extra arguments"""
+    return f"{parse.__module__}.{parse.__qualname__}{parse_args!r}"
+
+class PageCache:
+    """Remembers each page's validators and parsed content so unchanged pages are neither downloaded nor parsed
+
+    Entries are keyed by URL and by the parser that produced the content (see parser_id), so two
+    parsers of the same page never get each other's results on a 304.
+    """
+
+    def __init__(self, ttl: int = 30 * 24 * 3600, enabled: bool = True, collection_name: str = "page_cache"):
+        self.ttl = ttl
+        self.enabled = enabled
+        self.collection_name = collection_name
+        self._indexed = False
+        self.not_modified = 0
+        self.modified = 0
+
+    def _collection(self):
+        db = get_database() if self.enabled else None
+        return db[self.collection_name] if db is not None else None
+
+    @staticmethod
+    def _key(url: str, parser: str) -> str:
+        return f"{url} {parser}" if parser else url
+
+    async def get(self, url: str, parser: str = "") -> Optional[Dict[str, Any]]:
+        collection = self._collection()
+        if collection is None:
+            return None
+        try:
+            return await collection.find_one({"_id": self._key(url, parser)})
+        except Exception as e:
+            logger.warning(f"Page cache lookup failed for {url}: {e}")
+            return None
+
+    def conditional_headers(self, entry: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    async def touch(self, url: str, parser: str = ""):
+        """Record a 304 so the entry stays alive"""
+        self.not_modified += 1
+        collection = self._collection()
+        if collection is None:
+            return
+        now = datetime.utcnow()
+        try:
+            await collection.update_one(
+                {"_id": self._key(url, parser)},
+                {"$set": {"checked_at": now, "expires_at": now + timedelta(seconds=self.ttl)}}
+            )
+        except Exception as e:
+            logger.warning(f"Page cache write failed for {url}: {e}")
+
+    async def set(self, url: str, etag: Optional[str], last_modified: Optional[str], content: Any,
+                  parser: str = ""):
+        self.modified += 1
+        collection = self._collection()
+        if collection is None or not (etag or last_modified):
+            # Without validators the server cannot answer 304, so there is nothing to gain
+            return
+        now = datetime.utcnow()
+        try:
+            if not self._indexed:
+                await collection.create_index("expires_at", expireAfterSeconds=0)
+                self._indexed = True
+            await collection.update_one(
+                {"_id": self._key(url, parser)},
+                {"$set": {
+                    "url": url,
+                    "parser": parser,
+                    "etag": etag,
+                    "last_modified": last_modified,
+                    "content": content,
+                    "checked_at": now,
+                    "expires_at": now + timedelta(seconds=self.ttl)
+                }},
+                upsert=True
+            )
+        except Exception as e:
+            logger.warning(f"Page cache write failed for {url}: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "not_modified": self.not_modified,
+            "modified": self.modified
+        }
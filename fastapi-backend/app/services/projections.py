@@ -0,0 +1,53 @@
+"""
+Field projections for list endpoints
+A view name or a fields= selector becomes a MongoDB projection, so only the fields a client asked for leave the database
+"""
+
+from typing import Dict, Optional, Sequence, Type
+from pydantic import BaseModel
+from app.models.schemas import AptitudeResult, College, Course
+
+VIEWS = ("full", "card")
+
+class Projection:
+    """Projections over the fields of one response model
+
+    "full" is every model field, which also keeps internal fields such as search_keys out of
+    responses; "card" is the few fields a list item needs. Fields in always (sort keys that
+    cursors are built from) are included whatever is asked for.
+    """
+
+    def __init__(self, model: Type[BaseModel], card: Sequence[str], always: Sequence[str] = ()):
+        self.fields = [field.alias or name for name, field in model.model_fields.items()]
+        self.card = list(card)
+        self.always = list(always)
+
+    def resolve(self, view: str = "full", fields: Optional[str] = None) -> Dict[str, int]:
+        """Projection for a view, or for a comma-separated field list; raises ValueError for unknown names"""
+        if fields:
+            selected = [field.strip() for field in fields.split(",") if field.strip()]
+            unknown = [field for field in selected if field not in self.fields]
+            if unknown:
+                raise ValueError(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(self.fields)}")
+        elif view == "card":
+            selected = self.card
+        elif view == "full":
+            selected = self.fields
+        else:
+            raise ValueError(f"Unknown view {view!r}, expected one of {', '.join(VIEWS)}")
+        return {field: 1 for field in dict.fromkeys(["_id", *selected, *self.always])}
+
+college_projection = Projection(
+    College,
+    card=["name", "location", "type", "ranking", "rating", "fees_range", "placement_rate"],
+    always=["ranking"]
+)
+course_projection = Projection(
+    Course,
+    card=["title", "category", "difficulty", "duration", "provider", "rating"]
+)
+aptitude_result_projection = Projection(
+    AptitudeResult,
+    card=["test_type", "score", "total_questions", "completed_at"],
+    always=["completed_at"]
+)
@@ -0,0 +1,300 @@
+"""
+Aptitude question bank access
+Questions for a test are sampled inside MongoDB, stratified across difficulties for mixed tests,
+and answers are graded against an in-process answer key cache
+"""
+
+import asyncio
+import os
+import random
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import OperationFailure
+from app.services.database import get_database
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Never sent to test takers, so never read when building a test
+HIDDEN_FIELDS = {"correct_answer": 0, "explanation": 0}
+
+class NotEnoughQuestionsError(LookupError):
+    """Raised when the bank holds fewer matching questions than a test needs"""
+
+def allocate(count: int, available: Dict[str, int], rng: random.Random = random) -> Dict[str, int]:
+    """Split count questions as evenly as possible across strata, moving the share a small stratum
+    cannot fill to the others"""
+    allocation = {stratum: 0 for stratum in available}
+    remaining = count
+    open_strata = [stratum for stratum, size in available.items() if size > 0]
+    while remaining and open_strata:
+        share, extra = divmod(remaining, len(open_strata))
+        # The leftover questions go to randomly chosen strata so no difficulty is favoured
+        bonus = set(rng.sample(open_strata, extra))
+        for stratum in open_strata:
+            wanted = share + (1 if stratum in bonus else 0)
+            taken = min(wanted, available[stratum] - allocation[stratum])
+            allocation[stratum] += taken
+            remaining -= taken
+        open_strata = [stratum for stratum in open_strata if allocation[stratum] < available[stratum]]
+    return allocation
+
+async def _sample(collection, query: Dict[str, Any], size: int, max_time_ms: Optional[int]) -> List[Dict[str, Any]]:
+    pipeline = [{"$match": query}, {"$sample": {"size": size}}, {"$project": HIDDEN_FIELDS}]
+    options = {"maxTimeMS": max_time_ms} if max_time_ms else {}
+    return await collection.aggregate(pipeline, **options).to_list(length=size)
+
+async def sample_questions(db, category: str, difficulty: str, count: int,
+                           max_time_ms: Optional[int] = None) -> List[Dict[str, Any]]:
+    """count random questions of a category without their answers
+
+    For difficulty "mixed" the questions are spread evenly over the difficulties the category has.
+    Raises NotEnoughQuestionsError when fewer than count questions match.
+    """
+    collection = db.aptitude_questions
+    if difficulty != "mixed":
+        questions = await _sample(collection, {"category": category, "difficulty": difficulty}, count, max_time_ms)
+        if len(questions) < count:
+            raise NotEnoughQuestionsError(f"Not enough {category} questions available")
+        return questions
+
+    # Counted from the (category, difficulty) index without reading any question
+    options = {"maxTimeMS": max_time_ms} if max_time_ms else {}
+    counts = await collection.aggregate([
+        {"$match": {"category": category}},
+        {"$group": {"_id": "$difficulty", "count": {"$sum": 1}}}
+    ], **options).to_list(length=None)
+    available = {group["_id"]: group["count"] for group in counts}
+    if sum(available.values()) < count:
+        raise NotEnoughQuestionsError(f"Not enough {category} questions available")
+
+    allocation = allocate(count, available)
+    strata = await asyncio.gather(*(
+        _sample(collection, {"category": category, "difficulty": level}, size, max_time_ms)
+        for level, size in allocation.items() if size
+    ))
+    questions = [question for stratum in strata for question in stratum]
+    random.shuffle(questions)
+    return questions
+
+class AnswerKey(NamedTuple):
+    correct_answer: Any
+    category: str
+    difficulty: Optional[str]
+
+ANSWER_KEY_FIELDS = {"correct_answer": 1, "category": 1, "difficulty": 1}
+
+# Collection holding a version counter per cached collection; writers that cannot rely on
+# change streams bump it with bump_question_bank_version
+CACHE_VERSIONS_COLLECTION = "cache_versions"
+QUESTION_BANK_VERSION_ID = "aptitude_questions"
+
+# Change stream events after which the collection has to be read again from scratch
+RELOAD_EVENTS = ("drop", "rename", "dropDatabase", "invalidate")
+
+# Server errors meaning change streams will never work here (e.g. a standalone server)
+CHANGE_STREAM_UNSUPPORTED_CODES = {40573}
+# InvalidResumeToken, ChangeStreamFatalError, ChangeStreamHistoryLost: watch again without resuming
+RESUME_FAILED_CODES = {260, 280, 286}
+
+# Delay before reopening a failed change stream, doubled after each failure
+WATCH_RETRY_MIN_SECONDS = 1
+WATCH_RETRY_MAX_SECONDS = 60
+
+async def bump_question_bank_version(db) -> int:
+    """Tell every API process to reload its answer keys; call after editing aptitude_questions"""
+    doc = await db[CACHE_VERSIONS_COLLECTION].find_one_and_update(
+        {"_id": QUESTION_BANK_VERSION_ID},
+        {"$inc": {"version": 1}, "$set": {"updated_at": datetime.utcnow()}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return doc["version"]
+
+def _change_streams_unsupported(error: Exception) -> bool:
+    if isinstance(error, NotImplementedError):
+        return True
+    return isinstance(error, OperationFailure) and error.code in CHANGE_STREAM_UNSUPPORTED_CODES
+
+def _id_variants(question_ids: Iterable[str]) -> List[Any]:
+    # Question ids arrive as strings; stored _ids may be strings or ObjectIds
+    variants = []
+    for question_id in question_ids:
+        variants.append(question_id)
+        if ObjectId.is_valid(question_id):
+            variants.append(ObjectId(question_id))
+    return variants
+
+class AnswerKeyCache:
+    """question_id -> (correct_answer, category, difficulty) for the whole bank, held in memory
+
+    Loaded at startup and kept current from a change stream on aptitude_questions, which is
+    reopened with backoff after errors and resumed where it stopped. Deployments without change
+    streams (standalone servers) poll a version counter instead and reload when it changes. Ids
+    missing from the cache are read from the database and added.
+    """
+
+    def __init__(self, enabled: bool = True, poll_seconds: float = 30):
+        self.enabled = enabled
+        self.poll_seconds = poll_seconds
+        self.keys: Dict[str, AnswerKey] = {}
+        self.version: Optional[int] = None
+        self.loaded_at: Optional[float] = None
+        self.mode = "stopped"
+        self._task: Optional[asyncio.Task] = None
+        self._resume_token: Optional[Dict[str, Any]] = None
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.changes = 0
+
+    @staticmethod
+    def _key(doc: Dict[str, Any]) -> AnswerKey:
+        return AnswerKey(doc.get("correct_answer"), doc.get("category"), doc.get("difficulty"))
+
+    async def _read_version(self, db) -> int:
+        doc = await db[CACHE_VERSIONS_COLLECTION].find_one({"_id": QUESTION_BANK_VERSION_ID})
+        return doc["version"] if doc else 0
+
+    async def load(self):
+        """Read every answer key; the version is read first so a bump during the load is not missed"""
+        db = get_database()
+        version = await self._read_version(db)
+        docs = await db.aptitude_questions.find({}, ANSWER_KEY_FIELDS).to_list(length=None)
+        self.keys = {str(doc["_id"]): self._key(doc) for doc in docs}
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.reloads += 1
+        logger.info(f"Loaded {len(self.keys)} aptitude answer keys (version {version})")
+
+    async def start(self):
+        if not self.enabled or get_database() is None:
+            return
+        try:
+            await self.load()
+        except Exception as e:
+            # Grading still works, reading keys from the database until a reload succeeds
+            logger.error(f"Could not load aptitude answer keys: {e}")
+        self._task = asyncio.create_task(self._keep_current())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.mode = "stopped"
+
+    def _apply(self, change: Dict[str, Any]) -> bool:
+        """Apply one change stream event; returns False when the cache must be reloaded instead"""
+        operation = change.get("operationType")
+        if operation in RELOAD_EVENTS:
+            return False
+        question_id = str(change["documentKey"]["_id"])
+        document = change.get("fullDocument")
+        if operation == "delete" or (operation in ("update", "replace") and document is None):
+            self.keys.pop(question_id, None)
+        elif document is not None:
+            self.keys[question_id] = self._key(document)
+        self.changes += 1
+        return True
+
+    async def _watch(self, db):
+        pipeline = [{"$match": {"operationType": {"$ne": "noop"}}}]
+        # Resuming replays what happened while the stream was down; otherwise read everything again
+        resume_token = self._resume_token
+        async with db.aptitude_questions.watch(
+            pipeline, full_document="updateLookup", resume_after=resume_token
+        ) as stream:
+            self.mode = "change_stream"
+            if resume_token is None:
+                # Changes made between the last load and the stream opening would be lost
+                await self.load()
+            async for change in stream:
+                if not self._apply(change):
+                    # Nothing to resume after an invalidating event; the next watch starts over
+                    self._resume_token = None
+                    await self.load()
+                    return
+                self._resume_token = stream.resume_token
+
+    async def _keep_current(self):
+        db = get_database()
+        backoff = WATCH_RETRY_MIN_SECONDS
+        while True:
+            try:
+                await self._watch(db)
+                continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if _change_streams_unsupported(e):
+                    unsupported = e
+                    break
+                if isinstance(e, OperationFailure) and e.code in RESUME_FAILED_CODES:
+                    logger.warning(f"Answer key change stream cannot resume, reloading: {e}")
+                    self._resume_token = None
+                    continue
+                if self.mode == "change_stream":
+                    # The stream had been working; start the backoff over
+                    backoff = WATCH_RETRY_MIN_SECONDS
+                # Network errors, primary stepdowns and the like: reopen the stream
+                logger.warning(f"Answer key change stream failed, reopening in {backoff}s: {e}")
+            self.mode = "reconnecting"
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, WATCH_RETRY_MAX_SECONDS)
+
+        logger.info(f"Answer key change streams not supported, polling for version bumps: {unsupported}")
+        self.mode = "polling"
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            try:
+                if self.loaded_at is None or await self._read_version(db) != self.version:
+                    await self.load()
+            except Exception as e:
+                logger.warning(f"Answer key version check failed: {e}")
+
+    async def get_many(self, question_ids: List[str], max_time_ms: Optional[int] = None) -> Dict[str, AnswerKey]:
+        """Answer keys for the given ids; unknown ids are left out"""
+        if not self.enabled:
+            found = {}
+            missing = list(question_ids)
+        else:
+            found = {question_id: self.keys[question_id] for question_id in question_ids if question_id in self.keys}
+            missing = [question_id for question_id in question_ids if question_id not in found]
+            self.hits += len(found)
+            self.misses += len(missing)
+        if not missing:
+            return found
+
+        db = get_database()
+        options = {"max_time_ms": max_time_ms} if max_time_ms else {}
+        docs = await db.aptitude_questions.find(
+            {"_id": {"$in": _id_variants(missing)}}, ANSWER_KEY_FIELDS, **options
+        ).to_list(length=None)
+        for doc in docs:
+            key = self._key(doc)
+            found[str(doc["_id"])] = key
+            if self.enabled:
+                self.keys[str(doc["_id"])] = key
+        return found
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "mode": self.mode,
+            "questions": len(self.keys),
+            "version": self.version,
+            "age_seconds": round(time.monotonic() - self.loaded_at, 1) if self.loaded_at else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "reloads": self.reloads,
+            "changes": self.changes
+        }
+
+answer_key_cache = AnswerKeyCache(
+    enabled=os.getenv("ANSWER_KEY_CACHE_ENABLED", "true").lower() == "true",
+    poll_seconds=float(os.getenv("ANSWER_KEY_CACHE_POLL_SECONDS", "30"))
+)
@@ -0,0 +1,67 @@
+"""
+Record and replay of scraped pages
+Lets the scraper run against pages saved on disk instead of the network
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+MODES = ("live", "record", "replay")
+
+class ReplayMissError(LookupError):
+    """Raised in replay mode for a URL that was never recorded"""
+
+class ScrapeRecorder:
+    """Saves fetched pages to a cassette directory (record) or serves them from it (replay)"""
+
+    def __init__(self, mode: str = "live", directory: str = "scrape_cassettes"):
+        if mode not in MODES:
+            raise ValueError(f"Unknown scraper mode {mode!r}, expected one of {', '.join(MODES)}")
+        self.mode = mode
+        self.directory = directory
+        self.recorded = 0
+        self.replayed = 0
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(url.encode("utf-8")).hexdigest()[:32] + ".json")
+
+    def _read(self, url: str) -> Optional[str]:
+        try:
+            with open(self._path(url), encoding="utf-8") as f:
+                return json.load(f)["body"]
+        except FileNotFoundError:
+            return None
+
+    def _write(self, url: str, body: str):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(url), "w", encoding="utf-8") as f:
+            json.dump({"url": url, "recorded_at": datetime.utcnow().isoformat(), "body": body}, f)
+
+    async def load(self, url: str) -> str:
+        body = await asyncio.to_thread(self._read, url)
+        if body is None:
+            raise ReplayMissError(f"No recording for {url} in {self.directory}")
+        self.replayed += 1
+        return body
+
+    async def save(self, url: str, body: str):
+        try:
+            await asyncio.to_thread(self._write, url, body)
+            self.recorded += 1
+        except OSError as e:
+            logger.warning(f"Could not record {url}: {e}")
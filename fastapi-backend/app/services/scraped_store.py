@@ -0,0 +1,219 @@
+"""
+Persistent store for scraped data
+Serves scrape results from MongoDB and refreshes stale entries in the background
+"""
+
+import asyncio
+import json
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List
+from pymongo import UpdateOne
+from app.services.database import get_database
+from app.services.deadline import clear_deadline, max_time_ms, with_deadline
+from app.services.single_flight import SingleFlight
+import logging
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class StoredScrape:
+    items: List[Any]
+    updated_at: datetime
+    age_seconds: float
+    stale: bool
+
+def make_query_key(kind: str, params: Dict[str, Any]) -> str:
+    """Build a readable key for one scrape, e.g. 'college_data:{"college": "iit delhi", "state": null}'"""
+    normalized = {
+        name: " ".join(value.lower().split()) if isinstance(value, str) else value
+        for name, value in params.items()
+    }
+    return f"{kind}:{json.dumps(normalized, sort_keys=True)}"
+
+class ScrapedDataStore:
+    """Stale-while-revalidate cache of ScrapedData in MongoDB, one document per (source, data_type, query)
+
+    Entries are served as they are until fresh_for seconds old, then served stale while
+    a background task scrapes again. MongoDB drops entries max_age seconds after their
+    last refresh through a TTL index.
+    """
+
+    def __init__(self, fresh_for: Dict[str, int], default_fresh_for: int = 6 * 3600,
+                 max_age: int = 7 * 24 * 3600, retry_after: int = 300,
+                 enabled: bool = True, collection_name: str = "scraped_data"):
+        self.fresh_for = fresh_for
+        self.default_fresh_for = default_fresh_for
+        self.max_age = max_age
+        self.retry_after = retry_after
+        self.enabled = enabled
+        self.collection_name = collection_name
+        self.single_flight = SingleFlight()
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self._last_refresh: Dict[str, float] = {}
+        self._indexed = False
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    def _collection(self):
+        db = get_database() if self.enabled else None
+        return db[self.collection_name] if db is not None else None
+
+    async def _ensure_indexes(self, collection):
+        if self._indexed:
+            return
+        await collection.create_index(
+            [("query", 1), ("source", 1), ("data_type", 1)], unique=True, name="query_source_type"
+        )
+        await collection.create_index("expires_at", expireAfterSeconds=0, name="expires_at_ttl")
+        self._indexed = True
+
+    async def get(self, kind: str, params: Dict[str, Any],
+                  scrape: Callable[[], Awaitable[List[Any]]],
+                  item_type: Callable[..., Any]) -> StoredScrape:
+        """Return stored results for a scrape, scraping only when nothing is stored yet
+
+        scrape produces a fresh list of ScrapedData; item_type rebuilds one from a stored document.
+        """
+        collection = self._collection()
+        if collection is None:
+            return StoredScrape(items=await scrape(), updated_at=datetime.utcnow(), age_seconds=0.0, stale=False)
+
+        query = make_query_key(kind, params)
+        try:
+            docs = await collection.find({"query": query}, max_time_ms=max_time_ms()).to_list(length=None)
+        except Exception as e:
+            logger.warning(f"Scraped data lookup failed for {query}: {e}")
+            docs = []
+
+        if not docs:
+            self.misses += 1
+            items = await self._coalesced_scrape(collection, kind, query, scrape)
+            return StoredScrape(items=items, updated_at=datetime.utcnow(), age_seconds=0.0, stale=False)
+
+        updated_at = min(doc["updated_at"] for doc in docs)
+        age = max((datetime.utcnow() - updated_at).total_seconds(), 0.0)
+        stale = age > self.fresh_for.get(kind, self.default_fresh_for)
+        if stale:
+            self.stale_hits += 1
+            self._schedule_refresh(collection, kind, query, scrape)
+        else:
+            self.hits += 1
+
+        items = [
+            item_type(
+                source=doc["source"],
+                data_type=doc["data_type"],
+                content=doc["content"],
+                scraped_at=doc["scraped_at"],
+                confidence=doc["confidence"]
+            )
+            for doc in docs
+        ]
+        return StoredScrape(items=items, updated_at=updated_at, age_seconds=round(age, 1), stale=stale)
+
+    async def refresh(self, kind: str, params: Dict[str, Any],
+                      scrape: Callable[[], Awaitable[List[Any]]]) -> StoredScrape:
+        """Scrape now and store the results, whatever is already stored"""
+        collection = self._collection()
+        if collection is None:
+            return StoredScrape(items=await scrape(), updated_at=datetime.utcnow(), age_seconds=0.0, stale=False)
+        query = make_query_key(kind, params)
+        items = await self._coalesced_scrape(collection, kind, query, scrape)
+        self.refreshes += 1
+        return StoredScrape(items=items, updated_at=datetime.utcnow(), age_seconds=0.0, stale=False)
+
+    async def _coalesced_scrape(self, collection, kind: str, query: str,
+                                scrape: Callable[[], Awaitable[List[Any]]]) -> List[Any]:
+        # The shared scrape runs without the first caller's deadline and is kept going (and saved)
+        # when callers give up; each caller only stops waiting at its own deadline
+        return await with_deadline(
+            self.single_flight.do(query, lambda: self._scrape_and_save(collection, kind, query, scrape)),
+            what="scrape"
+        )
+
+    def _schedule_refresh(self, collection, kind: str, query: str, scrape: Callable[[], Awaitable[List[Any]]]):
+        if query in self._refreshing:
+            return
+        # Do not hammer a source that keeps failing; retry after a pause
+        if time.monotonic() - self._last_refresh.get(query, float("-inf")) < self.retry_after:
+            return
+        self._last_refresh[query] = time.monotonic()
+        task = asyncio.ensure_future(self._refresh(collection, kind, query, scrape))
+        self._refreshing[query] = task
+        task.add_done_callback(lambda t: self._refreshing.pop(query, None))
+
+    async def _refresh(self, collection, kind: str, query: str, scrape: Callable[[], Awaitable[List[Any]]]):
+        # The request that noticed the stale entry has its own deadline; the refresh does not share it
+        clear_deadline()
+        try:
+            await self._scrape_and_save(collection, kind, query, scrape)
+            self.refreshes += 1
+        except Exception as e:
+            self.refresh_failures += 1
+            logger.warning(f"Background refresh failed for {query}: {e}")
+
+    async def _scrape_and_save(self, collection, kind: str, query: str,
+                               scrape: Callable[[], Awaitable[List[Any]]]) -> List[Any]:
+        items = await scrape()
+        if items:
+            await self._save(collection, query, items)
+        return items
+
+    async def _save(self, collection, query: str, items: List[Any]):
+        now = datetime.utcnow()
+        operations = [
+            UpdateOne(
+                {"query": query, "source": item.source, "data_type": item.data_type},
+                {"$set": {
+                    "content": item.content,
+                    "confidence": item.confidence,
+                    "scraped_at": item.scraped_at,
+                    "updated_at": now,
+                    "expires_at": now + timedelta(seconds=self.max_age)
+                }},
+                upsert=True
+            )
+            for item in items
+        ]
+        # The scrape replaces the query's whole result set: sources it no longer returned would
+        # otherwise be served next to fresh data and keep the entry stale until the TTL
+        kept = [{"source": item.source, "data_type": item.data_type} for item in items]
+        try:
+            await self._ensure_indexes(collection)
+            await collection.bulk_write(operations, ordered=False)
+            await collection.delete_many({"query": query, "$nor": kept})
+        except Exception as e:
+            logger.warning(f"Scraped data write failed for {query}: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshing": len(self._refreshing),
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0
+        }
+
+def create_scraped_store() -> ScrapedDataStore:
+    """Build the scraped data store from environment settings"""
+    return ScrapedDataStore(
+        fresh_for={
+            "college_data": int(os.getenv("SCRAPED_DATA_FRESH_COLLEGES", str(24 * 3600))),
+            "job_market": int(os.getenv("SCRAPED_DATA_FRESH_JOB_MARKET", str(6 * 3600))),
+            "scholarships": int(os.getenv("SCRAPED_DATA_FRESH_SCHOLARSHIPS", str(24 * 3600))),
+            "entrance_exams": int(os.getenv("SCRAPED_DATA_FRESH_EXAMS", str(12 * 3600)))
+        },
+        max_age=int(os.getenv("SCRAPED_DATA_MAX_AGE", str(7 * 24 * 3600))),
+        retry_after=int(os.getenv("SCRAPED_DATA_RETRY_SECONDS", "300")),
+        enabled=os.getenv("SCRAPED_DATA_STORE_ENABLED", "true").lower() == "true"
+    )
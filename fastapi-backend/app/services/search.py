@@ -0,0 +1,160 @@
+"""
+Text search for colleges and courses
+Whole words are matched and ranked by MongoDB text indexes; indexed prefix keys answer partial words
+"""
+
+import re
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from pymongo import UpdateOne
+from pymongo.errors import OperationFailure
+from app.services.pagination import MAX_PAGE_SIZE, decode_cursor, encode_cursor, fetch_page, with_id
+import logging
+
+logger = logging.getLogger(__name__)
+
+SEARCH_KEYS_FIELD = "search_keys"
+SEARCH_VERSION_FIELD = "search_version"
+# Bump when college_search_keys changes; startup migration then rebuilds every college's keys
+SEARCH_KEYS_VERSION = 1
+MAX_PREFIX_LENGTH = 15
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# Server error code for a $text query on a collection without a text index
+INDEX_NOT_FOUND = 27
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+def _prefix_keys(values: Iterable[Optional[str]], qualifier: str = "") -> set:
+    keys = set()
+    for value in values:
+        for token in tokenize(value):
+            for length in range(1, min(len(token), MAX_PREFIX_LENGTH) + 1):
+                keys.add(qualifier + token[:length])
+    return keys
+
+def query_keys(text: Optional[str], qualifier: str = "") -> List[str]:
+    """Keys a document must carry to match every word of text, the last ones possibly unfinished"""
+    return [qualifier + token[:MAX_PREFIX_LENGTH] for token in dict.fromkeys(tokenize(text))]
+
+def college_search_keys(college: Dict[str, Any]) -> List[str]:
+    """Prefixes of every word in a college's name and location, plus location- and type-qualified
+    prefixes so the location and type filters use the same index"""
+    keys = _prefix_keys([college.get("name"), college.get("location")])
+    keys |= _prefix_keys([college.get("location")], "location:")
+    keys |= _prefix_keys([college.get("type")], "type:")
+    return sorted(keys)
+
+async def backfill_search_keys(db, batch_size: int = 500) -> int:
+    """Compute search keys for colleges that have none, or keys from an older SEARCH_KEYS_VERSION"""
+    cursor = db.colleges.find(
+        {SEARCH_VERSION_FIELD: {"$ne": SEARCH_KEYS_VERSION}},
+        {"name": 1, "location": 1, "type": 1}
+    )
+    updated = 0
+    batch = []
+    async for college in cursor:
+        batch.append(UpdateOne(
+            {"_id": college["_id"]},
+            {"$set": {SEARCH_KEYS_FIELD: college_search_keys(college), SEARCH_VERSION_FIELD: SEARCH_KEYS_VERSION}}
+        ))
+        if len(batch) >= batch_size:
+            await db.colleges.bulk_write(batch, ordered=False)
+            updated += len(batch)
+            batch = []
+    if batch:
+        await db.colleges.bulk_write(batch, ordered=False)
+        updated += len(batch)
+    return updated
+
+def regex_any(fields: Sequence[str], terms: Sequence[str]) -> Dict[str, Any]:
+    """Case-insensitive substring match of any term on any field; only used when the text index is missing"""
+    pattern = "|".join(re.escape(term) for term in terms if term)
+    return {"$or": [{field: {"$regex": pattern, "$options": "i"}} for field in fields]}
+
+class TextSearch:
+    """Searches one collection through its text index, then prefix keys, and falls back to
+    regular expressions while the indexes have not been created yet"""
+
+    def __init__(self, collection_name: str, recheck_seconds: float = 60):
+        self.collection_name = collection_name
+        self.recheck_seconds = recheck_seconds
+        self._text_index: Optional[Tuple[float, bool]] = None
+
+    async def has_text_index(self, db) -> bool:
+        if self._text_index and (self._text_index[1] or self._text_index[0] > time.monotonic()):
+            return self._text_index[1]
+        try:
+            indexes = await db[self.collection_name].index_information()
+            found = any(
+                any(direction == "text" for _, direction in info["key"]) for info in indexes.values()
+            )
+        except Exception as e:
+            logger.warning(f"Could not list indexes of {self.collection_name}: {e}")
+            found = False
+        if not found:
+            logger.warning(f"No text index on {self.collection_name}, search falls back to regular expressions")
+        self._text_index = (time.monotonic() + self.recheck_seconds, found)
+        return found
+
+    async def find(self, db, search: Optional[str], query: Dict[str, Any], sort: List[Tuple[str, Any]],
+                   limit: int, fallback_query: Dict[str, Any], skip: int = 0, cursor: Optional[str] = None,
+                   prefix: bool = True, projection: Optional[Dict[str, Any]] = None,
+                   max_time_ms: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """One page of documents matching query and search (which may be empty), best matches
+        first, and the cursor of the next page
+
+        Whole words go through the text index, ranked by relevance and then sort. When no word
+        matches (typically because the last one is unfinished) and prefix is set, every word is
+        matched as a prefix through search_keys instead, in sort order. query may itself filter on
+        search_keys, so without a text index fallback_query, which must already include the
+        search, is used instead.
+        """
+        collection = db[self.collection_name]
+        options = {"max_time_ms": max_time_ms} if max_time_ms else {}
+        if projection:
+            options["projection"] = projection
+        sort = with_id(sort)
+        limit = min(limit, MAX_PAGE_SIZE)
+
+        if not await self.has_text_index(db):
+            return await fetch_page(collection, fallback_query, sort, limit, cursor, skip, **options)
+        # Plain words only: quotes and leading dashes mean phrases and negation to $text
+        terms = " ".join(tokenize(search))
+        if not terms:
+            return await fetch_page(collection, query, sort, limit, cursor, skip, **options)
+
+        position = decode_cursor(cursor) if cursor else None
+        if position is None or "offset" in position:
+            # Relevance order has no key to seek to, so text search pages carry an offset instead
+            offset = position["offset"] if position else skip
+            text_query = {**query, "$text": {"$search": terms}}
+            try:
+                docs = await collection.find(text_query, **options).sort(
+                    [("score", {"$meta": "textScore"})] + sort
+                ).skip(offset).limit(limit + 1).to_list(length=None)
+            except OperationFailure as e:
+                if e.code != INDEX_NOT_FOUND:
+                    raise
+                # Index dropped since it was last checked
+                self._text_index = None
+                return await self.find(
+                    db, search, query, sort, limit, fallback_query, skip, cursor, prefix, projection, max_time_ms
+                )
+
+            next_cursor = encode_cursor({"offset": offset + limit}) if len(docs) > limit else None
+            if docs or not prefix or position is not None:
+                return docs[:limit], next_cursor
+            # An empty later page only means the word matches ran out
+            if offset and await collection.find_one(text_query, {"_id": 1}, max_time_ms=max_time_ms) is not None:
+                return [], None
+
+        prefix_query = dict(query)
+        existing = prefix_query.get(SEARCH_KEYS_FIELD, {}).get("$all", [])
+        prefix_query[SEARCH_KEYS_FIELD] = {"$all": existing + query_keys(search)}
+        return await fetch_page(collection, prefix_query, sort, limit, cursor, skip, **options)
+
+college_search = TextSearch("colleges")
+course_search = TextSearch("courses")
@@ -0,0 +1,287 @@
+"""
+Semantic cache for career chat
+Answers near-duplicate questions from earlier responses using local, CPU-only embeddings
+"""
+
+import asyncio
+import os
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Any, FrozenSet, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+    from sklearn.feature_extraction.text import HashingVectorizer
+    from sklearn.preprocessing import normalize
+    from scipy.sparse import vstack
+except ImportError:
+    np = None
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    SentenceTransformer = None
+
+WORD = re.compile(r"[a-z0-9+#]+")
+
+# Words that do not change what a question is about
+STOPWORDS = frozenset("""
+a about am an and any are as at be best can could do does for from get good how i if in into is it
+me my of on or please should so some than that the there this to was what when where which who why
+will with would you your
+""".split())
+
+# Share of topic words two questions must have in common to be answered alike
+TOPIC_OVERLAP = 0.5
+
+def _stem(word: str) -> str:
+    # Just enough to treat "careers"/"career", "needed"/"need" and "studies"/"study" as one word
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    for suffix in ("ing", "ed", "es", "s"):
+        if len(word) > len(suffix) + 2 and word.endswith(suffix) and not word.endswith("ss"):
+            return word[:-len(suffix)]
+    return word
+
+def topic_words(question: str) -> FrozenSet[str]:
+    """Stems of the words of a question that say what it is about"""
+    return frozenset(_stem(word) for word in WORD.findall(question.lower()) if word not in STOPWORDS)
+
+def same_topic(cached: FrozenSet[str], asked: FrozenSet[str]) -> bool:
+    """False when a word was swapped for another (India -> USA) or the questions share too few words"""
+    if cached - asked and asked - cached:
+        return False
+    union = cached | asked
+    return not union or len(cached & asked) / len(union) >= TOPIC_OVERLAP
+
+@dataclass
+class CachedAnswer:
+    question: str
+    answer: str
+    expires_at: float
+    topic: FrozenSet[str]
+
+class _TfidfIndex:
+    """TF-IDF over hashed character n-grams with document frequencies kept incrementally
+
+    Rows are weighted and normalized once, against an IDF snapshot. New rows are appended with
+    that snapshot into a separate block and removed rows are masked out; the whole matrix is only reweighted after
+    rebuild_fraction of the entries have changed since the snapshot.
+    """
+
+    default_threshold = 0.9
+
+    def __init__(self, n_features: int = 2 ** 18, rebuild_fraction: float = 0.1):
+        self.vectorizer = HashingVectorizer(
+            analyzer="char_wb",
+            ngram_range=(3, 5),
+            n_features=n_features,
+            alternate_sign=False,
+            norm=None
+        )
+        self.rebuild_fraction = rebuild_fraction
+        self.doc_freq = np.zeros(n_features)
+        self.rows: "OrderedDict[str, Any]" = OrderedDict()
+        self._idf = None
+        self._matrix = None
+        self._pending = []
+        self._keys = []
+        self._positions: Dict[str, int] = {}
+        self._removed = set()
+        self._changes = 0
+
+    def embed(self, text: str):
+        return self.vectorizer.transform([text])
+
+    def _weigh(self, vector):
+        return normalize(vector.multiply(self._idf).tocsr())
+
+    def add(self, key: str, vector):
+        self.remove(key)
+        self.rows[key] = vector
+        self.doc_freq[vector.indices] += 1
+        self._changes += 1
+        if self._idf is not None:
+            self._positions[key] = len(self._keys)
+            self._keys.append(key)
+            self._pending.append(self._weigh(vector))
+
+    def remove(self, key: str):
+        vector = self.rows.pop(key, None)
+        if vector is not None:
+            self.doc_freq[vector.indices] -= 1
+            self._changes += 1
+            position = self._positions.pop(key, None)
+            if position is not None:
+                self._removed.add(position)
+
+    def _rebuild(self):
+        self._idf = np.log((1 + len(self.rows)) / (1 + self.doc_freq)) + 1
+        self._keys = list(self.rows.keys())
+        self._positions = {key: position for position, key in enumerate(self._keys)}
+        self._matrix = self._weigh(vstack(list(self.rows.values())))
+        self._pending = []
+        self._removed = set()
+        self._changes = 0
+
+    def search(self, vector) -> Tuple[Optional[str], float]:
+        if not self.rows:
+            return None, 0.0
+        if self._idf is None or self._changes > self.rebuild_fraction * len(self.rows):
+            self._rebuild()
+        query = self._weigh(vector).T
+        scores = (self._matrix @ query).toarray().ravel()
+        if self._pending:
+            # Rows added since the rebuild stay a small separate block until the next one
+            scores = np.concatenate([scores, (vstack(self._pending) @ query).toarray().ravel()])
+        if self._removed:
+            scores[list(self._removed)] = -1.0
+        best = int(scores.argmax())
+        return self._keys[best], float(scores[best])
+
+class _EmbeddingIndex:
+    """Dense sentence embeddings from a local sentence-transformers model"""
+
+    default_threshold = 0.85
+
+    def __init__(self, model_name: str):
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.rows: "OrderedDict[str, Any]" = OrderedDict()
+        self._matrix = None
+        self._keys = []
+
+    def embed(self, text: str):
+        return self.model.encode([text], normalize_embeddings=True)[0]
+
+    def add(self, key: str, vector):
+        self.rows[key] = vector
+        self._matrix = None
+
+    def remove(self, key: str):
+        if self.rows.pop(key, None) is not None:
+            self._matrix = None
+
+    def search(self, vector) -> Tuple[Optional[str], float]:
+        if not self.rows:
+            return None, 0.0
+        if self._matrix is None:
+            self._keys = list(self.rows.keys())
+            self._matrix = np.vstack(list(self.rows.values()))
+        scores = self._matrix @ vector
+        best = int(scores.argmax())
+        return self._keys[best], float(scores[best])
+
+class SemanticCache:
+    """Similarity-based question/answer cache with TTL and LRU eviction"""
+
+    def __init__(self, max_entries: int = 2000, ttl: int = 24 * 3600,
+                 threshold: Optional[float] = None, model_name: Optional[str] = None,
+                 enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries: "OrderedDict[str, CachedAnswer]" = OrderedDict()
+        self.index = None
+        self.backend = "disabled"
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.evictions = 0
+
+        if enabled and np is not None:
+            if model_name and SentenceTransformer is not None:
+                try:
+                    self.index = _EmbeddingIndex(model_name)
+                    self.backend = f"sentence-transformers:{model_name}"
+                except Exception as e:
+                    logger.warning(f"Could not load embedding model {model_name}, using TF-IDF: {e}")
+            if self.index is None:
+                self.index = _TfidfIndex()
+                self.backend = "tfidf"
+        self.threshold = threshold if threshold is not None else (
+            self.index.default_threshold if self.index is not None else 1.0
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.index is not None
+
+    @staticmethod
+    def _normalize(question: str) -> str:
+        # Punctuation only changes n-grams at word edges ("india?"), not the question
+        return " ".join(WORD.findall(question.lower()))
+
+    async def _embed(self, text: str):
+        if isinstance(self.index, _EmbeddingIndex):
+            # Model inference is CPU-bound; keep it off the event loop
+            return await asyncio.to_thread(self.index.embed, text)
+        return self.index.embed(text)
+
+    async def lookup(self, question: str) -> Optional[str]:
+        """Return a cached answer for a sufficiently similar question"""
+        if not self.enabled:
+            return None
+        self._expire()
+        key, score = self.index.search(await self._embed(self._normalize(question)))
+        # Similar wording is not enough: "...doctor in India" and "...doctor in USA" score high
+        # on n-grams and embeddings alike, so a swapped topic word rules the hit out
+        if key is not None and score >= self.threshold and same_topic(self.entries[key].topic, topic_words(question)):
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key].answer
+        self.misses += 1
+        return None
+
+    async def store(self, question: str, answer: str):
+        """Remember an answer for future similar questions"""
+        if not self.enabled or not answer:
+            return
+        key = self._normalize(question)
+        self.index.add(key, await self._embed(key))
+        self.entries.pop(key, None)
+        self.entries[key] = CachedAnswer(
+            question=question, answer=answer, expires_at=time.time() + self.ttl, topic=topic_words(question)
+        )
+        while len(self.entries) > self.max_entries:
+            oldest, _ = self.entries.popitem(last=False)
+            self.index.remove(oldest)
+            self.evictions += 1
+
+    def record_bypass(self):
+        self.bypassed += 1
+
+    def _expire(self):
+        now = time.time()
+        expired = [key for key, entry in self.entries.items() if entry.expires_at <= now]
+        for key in expired:
+            del self.entries[key]
+            self.index.remove(key)
+            self.evictions += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend,
+            "threshold": self.threshold,
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+def create_semantic_cache() -> SemanticCache:
+    """Build the chat semantic cache from environment settings"""
+    threshold = os.getenv("SEMANTIC_CACHE_THRESHOLD")
+    return SemanticCache(
+        max_entries=int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "2000")),
+        ttl=int(os.getenv("SEMANTIC_CACHE_TTL", str(24 * 3600))),
+        threshold=float(threshold) if threshold else None,
+        model_name=os.getenv("SEMANTIC_CACHE_MODEL") or None,
+        enabled=os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+    )
@@ -0,0 +1,34 @@
+"""
+Fast JSON responses for documents read from MongoDB
+Trusted documents are encoded directly instead of being re-validated through a response_model; orjson is used when installed
+"""
+
+import json
+from datetime import date, datetime
+from typing import Any
+from bson import ObjectId
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _default(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse that encodes ObjectIds and datetimes itself; return it from a route to skip
+    response_model validation of documents that came straight from the database"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
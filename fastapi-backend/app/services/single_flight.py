@@ -0,0 +1,82 @@
+"""
+Request coalescing for identical in-flight async calls
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional
+from app.services.deadline import clear_deadline
+
+class _Flight:
+    def __init__(self, task: asyncio.Task, state: Any):
+        self.task = task
+        self.state = state
+        self.waiters = 0
+
+class SingleFlight:
+    """Runs one call per key at a time and lets later callers share its result
+
+    The shared call runs without any caller's deadline, so a caller with a short deadline
+    cannot make it fail for the others; each caller bounds only its own wait. With
+    cancel_abandoned the call is cancelled once every caller has stopped waiting.
+    """
+
+    def __init__(self, cancel_abandoned: bool = False):
+        self.cancel_abandoned = cancel_abandoned
+        self._inflight: Dict[str, _Flight] = {}
+        self.executed = 0
+        self.coalesced = 0
+        self.abandoned = 0
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]], state: Any = None,
+                 join: Optional[Callable[[Any], None]] = None) -> Any:
+        """Await func() or the call already running for key
+
+        state stays with the call started by the first caller; later callers hand it to join,
+        e.g. to raise the priority the shared call waits at.
+        """
+        flight = self._inflight.get(key)
+        if flight is not None:
+            self.coalesced += 1
+            if join is not None:
+                join(flight.state)
+        else:
+            # Run the call in its own task so a disconnecting first caller
+            # does not cancel the work the other callers are waiting on
+            task = asyncio.ensure_future(self._run(func))
+            flight = self._inflight[key] = _Flight(task, state)
+            self.executed += 1
+            task.add_done_callback(lambda t: self._finish(key, t))
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if self.cancel_abandoned and flight.waiters == 0 and not flight.task.done():
+                self.abandoned += 1
+                # Forget it now so a caller arriving before the task finishes starts a new call
+                if self._inflight.get(key) is flight:
+                    del self._inflight[key]
+                flight.task.cancel()
+
+    @staticmethod
+    async def _run(func: Callable[[], Awaitable[Any]]) -> Any:
+        # The task copied the first caller's context; drop its deadline
+        clear_deadline()
+        return await func()
+
+    def _finish(self, key: str, task: asyncio.Task):
+        flight = self._inflight.get(key)
+        if flight is not None and flight.task is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved even if every caller went away
+            task.exception()
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": len(self._inflight),
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "abandoned": self.abandoned
+        }
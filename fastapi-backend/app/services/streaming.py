@@ -0,0 +1,17 @@
+"""
+Helpers for incremental HTTP responses
+"""
+
+import json
+from typing import Any, Optional
+
+# Stop proxies such as nginx from buffering the stream
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no"
+}
+
+def sse_event(data: Any, event: Optional[str] = None) -> str:
+    """Format a Server-Sent Event frame with a JSON payload"""
+    frame = f"event: {event}\n" if event else ""
+    return f"{frame}data: {json.dumps(data, default=str)}\n\n"
@@ -5,16 +5,58 @@ Scrapes data from various educational and career websites
 
 import asyncio
 import aiohttp
+import os
 import json
 import re
-from typing import Dict, List, Any, Optional
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass
-from bs4 import BeautifulSoup
 from datetime import datetime, timedelta
+from urllib.parse import quote
+from app.services.deadline import with_deadline, DeadlineExceeded
+from app.services.scraped_store import StoredScrape, create_scraped_store
+from app.services.polite_http import HostRateLimiter, PageCache, parser_id
+from app.services.html_parser import html_parser_pool, parse_table, rows_as_dicts
+from app.services.scrape_recorder import ScrapeRecorder
 import logging
 
 logger = logging.getLogger(__name__)
 
+SCRAPER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# One connection pool for all scraping in the process. It is opened in the
+# application lifespan and shared by concurrent requests, so keep-alive
+# connections and resolved DNS entries are reused across scrapes.
+_http_session: Optional[aiohttp.ClientSession] = None
+
+async def open_http_session() -> aiohttp.ClientSession:
+    """Get the process-wide pooled session used for scraping, creating it if needed"""
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=int(os.getenv("SCRAPER_MAX_CONNECTIONS", "100")),
+            limit_per_host=int(os.getenv("SCRAPER_MAX_CONNECTIONS_PER_HOST", "8")),
+            ttl_dns_cache=int(os.getenv("SCRAPER_DNS_CACHE_TTL", "300")),
+            keepalive_timeout=float(os.getenv("SCRAPER_KEEPALIVE_EXPIRY", "30"))
+        )
+        _http_session = aiohttp.ClientSession(
+            connector=connector,
+            headers=SCRAPER_HEADERS,
+            timeout=aiohttp.ClientTimeout(total=30, connect=5)
+        )
+    return _http_session
+
+async def close_http_session():
+    """Close the shared scraping session on application shutdown"""
+    global _http_session
+    if _http_session is not None and not _http_session.closed:
+        await _http_session.close()
+    _http_session = None
+
+def _split_list(value: Optional[str]) -> List[str]:
+    return [item.strip() for item in (value or "").split(",") if item.strip()]
+
 @dataclass
 class ScrapedData:
     source: str
@@ -27,163 +69,171 @@ class WebScraperService:
     """Service for scraping career and education related data"""
     
     def __init__(self):
-        self.session = None
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+        self.headers = SCRAPER_HEADERS
+        # Upper bound for a single source; shortened further by the request deadline
+        self.source_timeout = float(os.getenv("SCRAPER_SOURCE_TIMEOUT", "8"))
+        self.rate_limiter = HostRateLimiter(
+            user_agent=self.headers['User-Agent'],
+            rate=float(os.getenv("SCRAPER_HOST_RATE", "1")),
+            burst=int(os.getenv("SCRAPER_HOST_BURST", "2")),
+            robots_ttl=int(os.getenv("SCRAPER_ROBOTS_TTL", str(24 * 3600)))
+        )
+        self.page_cache = PageCache(
+            ttl=int(os.getenv("PAGE_CACHE_TTL", str(30 * 24 * 3600))),
+            enabled=os.getenv("PAGE_CACHE_ENABLED", "true").lower() == "true"
+        )
+        # Pages for sources that are scraped live; sources without a URL return built-in sample data.
+        # SCRAPER_URL_COLLEGE may contain {college}, replaced by the URL-encoded college name.
+        self.source_urls = {
+            "nirf": os.getenv("SCRAPER_URL_NIRF"),
+            "college": os.getenv("SCRAPER_URL_COLLEGE"),
+            "scholarships": os.getenv("SCRAPER_URL_SCHOLARSHIPS"),
+            "exams": os.getenv("SCRAPER_URL_EXAMS")
         }
+        # live, record (save every fetched page) or replay (serve saved pages, no network)
+        self.recorder = ScrapeRecorder(
+            mode=os.getenv("SCRAPER_MODE", "live"),
+            directory=os.getenv("SCRAPER_CASSETTE_DIR", "scrape_cassettes")
+        )
+    
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Borrow the shared session; it is owned by the application lifespan, so never close it here"""
+        return await open_http_session()
+    
+    async def fetch_parsed(self, url: str, parse: Callable[..., Any], *parse_args) -> Any:
+        """Fetch a page politely and return parse(html, *parse_args)
+        
+        Requests are paced per host and respect robots.txt. Pages are fetched with the
+        validators from the last visit; a 304 returns the result the same parse (and
+        parse_args) produced before, without downloading or parsing the page again. In record mode every page is
+        downloaded so that each one is saved to the cassette.
+        
+        Parsing runs off the event loop, in a worker process for large pages, so parse
+        must be a module-level function returning plain data (see html_parser.parse_table).
+        """
+        if self.recorder.replaying:
+            return await html_parser_pool.parse(parse, await self.recorder.load(url), *parse_args)
+        
+        session = await self.get_session()
+        await self.rate_limiter.acquire(session, url)
+        
+        # A 304 has no body to record, so pages are always downloaded in full while recording
+        parser = parser_id(parse, parse_args)
+        cached = None if self.recorder.recording else await self.page_cache.get(url, parser)
+        async with session.get(url, headers=self.page_cache.conditional_headers(cached)) as response:
+            if response.status == 304 and cached is not None:
+                await self.page_cache.touch(url, parser)
+                return cached["content"]
+            response.raise_for_status()
+            html = await response.text()
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+        
+        if self.recorder.recording:
+            await self.recorder.save(url, html)
+        content = await html_parser_pool.parse(parse, html, *parse_args)
+        await self.page_cache.set(url, etag, last_modified, content, parser)
+        return content
     
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession(headers=self.headers)
+        # Kept for callers that scope their scraping; the pooled session outlives the block
+        await self.get_session()
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.session:
-            await self.session.close()
+        pass
     
     async def scrape_college_data(self, college_name: str, state: str = None) -> List[ScrapedData]:
         """Scrape college information from various sources"""
-        scraped_data = []
-        
-        try:
-            # Scrape from NIRF rankings
-            nirf_data = await self._scrape_nirf_rankings(college_name)
-            if nirf_data:
-                scraped_data.append(ScrapedData(
-                    source="NIRF",
-                    data_type="college_ranking",
-                    content=nirf_data,
-                    scraped_at=datetime.now(),
-                    confidence=0.9
-                ))
-            
-            # Scrape from college websites
-            website_data = await self._scrape_college_website(college_name, state)
-            if website_data:
-                scraped_data.append(ScrapedData(
-                    source="college_website",
-                    data_type="college_info",
-                    content=website_data,
-                    scraped_at=datetime.now(),
-                    confidence=0.8
-                ))
-            
-            # Scrape admission data
-            admission_data = await self._scrape_admission_data(college_name, state)
-            if admission_data:
-                scraped_data.append(ScrapedData(
-                    source="admission_portal",
-                    data_type="admission_info",
-                    content=admission_data,
-                    scraped_at=datetime.now(),
-                    confidence=0.7
-                ))
-        
-        except Exception as e:
-            logger.error(f"Error scraping college data for {college_name}: {e}")
-        
-        return scraped_data
+        return await self._fetch_sources([
+            # NIRF rankings
+            ("NIRF", "college_ranking", 0.9, self._scrape_nirf_rankings(college_name)),
+            # College websites
+            ("college_website", "college_info", 0.8, self._scrape_college_website(college_name, state)),
+            # Admission data
+            ("admission_portal", "admission_info", 0.7, self._scrape_admission_data(college_name, state))
+        ], f"college data for {college_name}")
     
     async def scrape_job_market_data(self, field: str, location: str = None) -> List[ScrapedData]:
         """Scrape job market data for specific fields"""
-        scraped_data = []
-        
-        try:
-            # Scrape from job portals
-            job_data = await self._scrape_job_portals(field, location)
-            if job_data:
-                scraped_data.append(ScrapedData(
-                    source="job_portals",
-                    data_type="job_market",
-                    content=job_data,
-                    scraped_at=datetime.now(),
-                    confidence=0.8
-                ))
-            
-            # Scrape salary data
-            salary_data = await self._scrape_salary_data(field, location)
-            if salary_data:
-                scraped_data.append(ScrapedData(
-                    source="salary_portal",
-                    data_type="salary_info",
-                    content=salary_data,
-                    scraped_at=datetime.now(),
-                    confidence=0.7
-                ))
-            
-            # Scrape government job notifications
-            govt_jobs = await self._scrape_government_jobs(field)
-            if govt_jobs:
-                scraped_data.append(ScrapedData(
-                    source="government_portals",
-                    data_type="government_jobs",
-                    content=govt_jobs,
-                    scraped_at=datetime.now(),
-                    confidence=0.9
-                ))
-        
-        except Exception as e:
-            logger.error(f"Error scraping job market data for {field}: {e}")
-        
-        return scraped_data
+        return await self._fetch_sources([
+            # Job portals
+            ("job_portals", "job_market", 0.8, self._scrape_job_portals(field, location)),
+            # Salary data
+            ("salary_portal", "salary_info", 0.7, self._scrape_salary_data(field, location)),
+            # Government job notifications
+            ("government_portals", "government_jobs", 0.9, self._scrape_government_jobs(field))
+        ], f"job market data for {field}")
     
     async def scrape_scholarship_data(self, category: str = None, state: str = None) -> List[ScrapedData]:
         """Scrape scholarship information"""
-        scraped_data = []
-        
-        try:
-            # Scrape government scholarships
-            govt_scholarships = await self._scrape_government_scholarships(category, state)
-            if govt_scholarships:
-                scraped_data.append(ScrapedData(
-                    source="government_scholarship_portal",
-                    data_type="scholarships",
-                    content=govt_scholarships,
-                    scraped_at=datetime.now(),
-                    confidence=0.9
-                ))
-            
-            # Scrape private scholarships
-            private_scholarships = await self._scrape_private_scholarships(category)
-            if private_scholarships:
-                scraped_data.append(ScrapedData(
-                    source="private_scholarship_portal",
-                    data_type="private_scholarships",
-                    content=private_scholarships,
-                    scraped_at=datetime.now(),
-                    confidence=0.7
-                ))
-        
-        except Exception as e:
-            logger.error(f"Error scraping scholarship data: {e}")
-        
-        return scraped_data
+        return await self._fetch_sources([
+            ("government_scholarship_portal", "scholarships", 0.9, self._scrape_government_scholarships(category, state)),
+            ("private_scholarship_portal", "private_scholarships", 0.7, self._scrape_private_scholarships(category))
+        ], "scholarship data")
     
     async def scrape_entrance_exam_data(self, exam_type: str = None) -> List[ScrapedData]:
         """Scrape entrance exam information"""
-        scraped_data = []
+        return await self._fetch_sources([
+            # JEE/NEET data
+            ("entrance_exam_portal", "entrance_exams", 0.9, self._scrape_entrance_exams(exam_type))
+        ], "entrance exam data")
+    
+    async def _fetch_sources(self, sources: List[Tuple[str, str, float, Awaitable[Optional[Dict[str, Any]]]]],
+                             subject: str) -> List[ScrapedData]:
+        """Fetch independent sources concurrently, each with its own timeout
         
-        try:
-            # Scrape JEE/NEET data
-            entrance_data = await self._scrape_entrance_exams(exam_type)
-            if entrance_data:
-                scraped_data.append(ScrapedData(
-                    source="entrance_exam_portal",
-                    data_type="entrance_exams",
-                    content=entrance_data,
-                    scraped_at=datetime.now(),
-                    confidence=0.9
-                ))
+        A failed or slow source only drops its own entry. The remaining entries'
+        confidence is scaled by the share of sources that returned data.
+        """
+        results = await asyncio.gather(
+            *(with_deadline(fetch, self.source_timeout, f"{source} scraping") for source, _, _, fetch in sources),
+            return_exceptions=True
+        )
         
-        except Exception as e:
-            logger.error(f"Error scraping entrance exam data: {e}")
+        returned = []
+        for (source, data_type, confidence, _), result in zip(sources, results):
+            if isinstance(result, DeadlineExceeded):
+                raise result
+            if isinstance(result, asyncio.TimeoutError):
+                logger.warning(f"{source} timed out scraping {subject}")
+            elif isinstance(result, Exception):
+                logger.error(f"Error scraping {subject} from {source}: {result}")
+            elif result:
+                returned.append((source, data_type, confidence, result))
         
-        return scraped_data
+        coverage = len(returned) / len(sources)
+        scraped_at = datetime.now()
+        return [
+            ScrapedData(
+                source=source,
+                data_type=data_type,
+                content=content,
+                scraped_at=scraped_at,
+                confidence=round(confidence * coverage, 2)
+            )
+            for source, data_type, confidence, content in returned
+        ]
     
     # Private methods for specific scraping tasks
     
     async def _scrape_nirf_rankings(self, college_name: str) -> Optional[Dict[str, Any]]:
         """Scrape NIRF rankings data"""
         try:
+            if self.source_urls["nirf"]:
+                table = await self.fetch_parsed(self.source_urls["nirf"], parse_table)
+                wanted = college_name.lower()
+                for row in rows_as_dicts(table):
+                    if wanted in row.get("name", "").lower():
+                        return {
+                            "college_name": row["name"],
+                            "nirf_rank": row.get("rank"),
+                            "category": row.get("category"),
+                            "score": row.get("score"),
+                            "year": row.get("year")
+                        }
+                return None
+            
             # This would typically scrape from NIRF website
             # For demo purposes, returning mock data
             return {
@@ -200,6 +250,25 @@ class WebScraperService:
     async def _scrape_college_website(self, college_name: str, state: str) -> Optional[Dict[str, Any]]:
         """Scrape college website for information"""
         try:
+            if self.source_urls["college"]:
+                url = self.source_urls["college"].format(college=quote(college_name))
+                # The college page lists its details as a two-column field/value table
+                details = {
+                    "_".join(row[0].lower().split()): row[1]
+                    for row in (await self.fetch_parsed(url, parse_table))["rows"] if len(row) >= 2
+                }
+                return {
+                    "college_name": college_name,
+                    "courses_offered": _split_list(details.get("courses_offered")),
+                    "facilities": _split_list(details.get("facilities")),
+                    "contact_info": {
+                        "phone": details.get("phone"),
+                        "email": details.get("email"),
+                        "website": details.get("website")
+                    },
+                    "admission_process": details.get("admission_process")
+                }
+            
             # Mock implementation - would scrape actual college websites
             return {
                 "college_name": college_name,
@@ -315,6 +384,17 @@ class WebScraperService:
     async def _scrape_government_scholarships(self, category: str, state: str) -> Optional[Dict[str, Any]]:
         """Scrape government scholarship information"""
         try:
+            if self.source_urls["scholarships"]:
+                table = await self.fetch_parsed(self.source_urls["scholarships"], parse_table)
+                return {
+                    "category": category,
+                    "state": state,
+                    "available_scholarships": [
+                        {**row, "renewable": row.get("renewable", "").lower() == "yes"}
+                        for row in rows_as_dicts(table)
+                    ]
+                }
+            
             return {
                 "category": category,
                 "state": state,
@@ -361,6 +441,10 @@ class WebScraperService:
     async def _scrape_entrance_exams(self, exam_type: str) -> Optional[Dict[str, Any]]:
         """Scrape entrance exam information"""
         try:
+            if self.source_urls["exams"]:
+                table = await self.fetch_parsed(self.source_urls["exams"], parse_table)
+                return {"exam_type": exam_type, "upcoming_exams": rows_as_dicts(table)}
+            
             return {
                 "exam_type": exam_type,
                 "upcoming_exams": [
@@ -391,17 +475,55 @@ class DataAggregator:
     
     def __init__(self):
         self.scraper = WebScraperService()
+        # Upper bound for one aggregation; shortened further by the request deadline
+        self.timeout = float(os.getenv("SCRAPER_TIMEOUT", "15"))
+        # How many fields one market insight fan-out scrapes at the same time
+        self.market_concurrency = max(int(os.getenv("MARKET_INSIGHTS_CONCURRENCY", "4")), 1)
+        # Scrape results persisted in MongoDB and refreshed in the background once stale
+        self.store = create_scraped_store()
+    
+    async def _stored(self, kind: str, params: Dict[str, Any], scrape: Callable[[], Awaitable[List[ScrapedData]]],
+                      what: str, refresh: bool = False) -> StoredScrape:
+        bounded_scrape = lambda: with_deadline(scrape(), self.timeout, what)
+        if refresh:
+            return await self.store.refresh(kind, params, bounded_scrape)
+        return await self.store.get(kind, params, bounded_scrape, ScrapedData)
+    
+    async def get_college_data(self, college_name: str, state: str = None, refresh: bool = False) -> StoredScrape:
+        return await self._stored(
+            "college_data", {"college": college_name, "state": state},
+            lambda: self.scraper.scrape_college_data(college_name, state), "college data scraping", refresh
+        )
+    
+    async def get_job_market_data(self, field: str, location: str = None, refresh: bool = False) -> StoredScrape:
+        return await self._stored(
+            "job_market", {"field": field, "location": location},
+            lambda: self.scraper.scrape_job_market_data(field, location), "job market scraping", refresh
+        )
+    
+    async def get_scholarship_data(self, category: str = None, state: str = None, refresh: bool = False) -> StoredScrape:
+        return await self._stored(
+            "scholarships", {"category": category, "state": state},
+            lambda: self.scraper.scrape_scholarship_data(category, state), "scholarship scraping", refresh
+        )
+    
+    async def get_entrance_exam_data(self, exam_type: str = None, refresh: bool = False) -> StoredScrape:
+        return await self._stored(
+            "entrance_exams", {"exam_type": exam_type},
+            lambda: self.scraper.scrape_entrance_exam_data(exam_type), "entrance exam scraping", refresh
+        )
     
     async def get_comprehensive_college_data(self, college_name: str, state: str = None) -> Dict[str, Any]:
         """Get comprehensive college data from multiple sources"""
-        async with self.scraper:
-            scraped_data = await self.scraper.scrape_college_data(college_name, state)
+        stored = await self.get_college_data(college_name, state)
+        scraped_data = stored.items
         
         # Aggregate data from different sources
         aggregated = {
             "college_name": college_name,
             "data_sources": len(scraped_data),
-            "last_updated": datetime.now().isoformat(),
+            "last_updated": stored.updated_at.isoformat(),
+            "data_age_seconds": stored.age_seconds,
             "rankings": {},
             "admission_info": {},
             "contact_info": {},
@@ -423,13 +545,50 @@ class DataAggregator:
     
     async def get_market_insights(self, field: str, location: str = None) -> Dict[str, Any]:
         """Get market insights for a specific field"""
-        async with self.scraper:
-            job_data = await self.scraper.scrape_job_market_data(field, location)
-            scholarship_data = await self.scraper.scrape_scholarship_data()
+        job_data, scholarship_data = await asyncio.gather(
+            self.get_job_market_data(field, location),
+            self.get_scholarship_data()
+        )
         
+        return self._build_market_insights(field, location, job_data, scholarship_data)
+    
+    async def iter_market_insights(self, fields: List[str], location: str = None) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Yield (field, insights) for several fields in the order they finish
+        
+        Job market data is scraped concurrently, at most market_concurrency fields at a time.
+        Scholarships do not depend on the field, so they are scraped once and shared.
+        """
+        fields = list(dict.fromkeys(fields))
+        if not fields:
+            return
+        
+        semaphore = asyncio.Semaphore(self.market_concurrency)
+        
+        async def scrape_field(field: str):
+            async with semaphore:
+                job_data = await self.get_job_market_data(field, location)
+            return field, job_data
+        
+        scholarship_task = asyncio.ensure_future(self.get_scholarship_data())
+        field_tasks = [asyncio.ensure_future(scrape_field(field)) for field in fields]
+        try:
+            scholarship_data = await scholarship_task
+            for next_done in asyncio.as_completed(field_tasks):
+                field, job_data = await next_done
+                yield field, self._build_market_insights(field, location, job_data, scholarship_data)
+        finally:
+            # Stop outstanding scrapes if the consumer stops early or one of them failed
+            for task in [scholarship_task, *field_tasks]:
+                task.cancel()
+    
+    def _build_market_insights(self, field: str, location: Optional[str],
+                               job_data: StoredScrape, scholarship_data: StoredScrape) -> Dict[str, Any]:
+        oldest = min(job_data, scholarship_data, key=lambda stored: stored.updated_at)
         insights = {
             "field": field,
             "location": location,
+            "last_updated": oldest.updated_at.isoformat(),
+            "data_age_seconds": oldest.age_seconds,
             "market_data": {},
             "opportunities": {
                 "government": [],
@@ -441,14 +600,14 @@ class DataAggregator:
         }
         
         # Process job market data
-        for data in job_data:
+        for data in job_data.items:
             if data.data_type == "job_market":
                 insights["market_data"].update(data.content)
             elif data.data_type == "government_jobs":
                 insights["opportunities"]["government"] = data.content.get("active_notifications", [])
         
         # Process scholarship data
-        for data in scholarship_data:
+        for data in scholarship_data.items:
             if data.data_type == "scholarships":
                 insights["opportunities"]["scholarships"].extend(data.content.get("available_scholarships", []))
         
@@ -456,17 +615,18 @@ class DataAggregator:
     
     async def get_timeline_data(self) -> Dict[str, Any]:
         """Get timeline data for admissions and exams"""
-        async with self.scraper:
-            exam_data = await self.scraper.scrape_entrance_exam_data()
+        exam_data = await self.get_entrance_exam_data()
         
         timeline = {
             "current_date": datetime.now().isoformat(),
+            "last_updated": exam_data.updated_at.isoformat(),
+            "data_age_seconds": exam_data.age_seconds,
             "upcoming_events": [],
             "deadlines": [],
             "preparation_timeline": {}
         }
         
-        for data in exam_data:
+        for data in exam_data.items:
             if data.data_type == "entrance_exams":
                 timeline["upcoming_events"].extend(data.content.get("upcoming_exams", []))
         
@@ -0,0 +1,156 @@
+"""
+Offline fixture server for the web scraper
+Serves canned NIRF, college, scholarship and exam pages with configurable latency and error injection
+
+Run it and point the scraper at it:
+    python -m benchmarks.fixture_server --port 8099 --latency-ms 50 --error-rate 0.05
+"""
+
+import argparse
+import asyncio
+import hashlib
+import random
+from html import escape
+from typing import Dict, List
+from urllib.parse import unquote
+from aiohttp import web
+
+CATEGORIES = ["Engineering", "Medical", "Management", "Law", "Pharmacy"]
+STATES = ["Delhi", "Maharashtra", "Tamil Nadu", "Karnataka", "West Bengal", "Uttar Pradesh"]
+
+def _table(headers: List[str], rows: List[List[str]]) -> str:
+    head = "".join(f"<th>{escape(header)}</th>" for header in headers)
+    body = "".join("<tr>" + "".join(f"<td>{escape(str(cell))}</td>" for cell in row) + "</tr>" for row in rows)
+    return f"<table class=\"data\"><tr>{head}</tr>{body}</table>"
+
+def _page(title: str, content: str) -> str:
+    nav = "<nav><a href=\"/\">Home</a> <a href=\"/about\">About</a></nav>"
+    return (
+        f"<!DOCTYPE html><html><head><title>{escape(title)}</title></head>"
+        f"<body>{nav}<h1>{escape(title)}</h1>{content}<footer>Fixture page</footer></body></html>"
+    )
+
+def nirf_page(rows: int) -> str:
+    records = [
+        [str(rank), f"Institute of Technology {rank}", CATEGORIES[rank % len(CATEGORIES)],
+         STATES[rank % len(STATES)], f"{90 - rank * 40 / rows:.2f}", "2024"]
+        for rank in range(1, rows + 1)
+    ]
+    return _page("NIRF Rankings 2024", _table(["Rank", "Name", "Category", "State", "Score", "Year"], records))
+
+def college_page(name: str) -> str:
+    slug = "".join(ch for ch in name.lower() if ch.isalnum())
+    details = [
+        ["Courses Offered", "B.Tech, B.Sc, B.Com, BBA, M.Tech"],
+        ["Facilities", "Library, Hostel, Labs, Sports, Wi-Fi"],
+        ["Phone", "+91-11-2659" + str(int(hashlib.md5(slug.encode("utf-8")).hexdigest(), 16) % 10000).zfill(4)],
+        ["Email", f"admissions@{slug[:20] or 'college'}.edu.in"],
+        ["Website", f"www.{slug[:20] or 'college'}.edu.in"],
+        ["Admission Process", "Online application through state counselling portal"]
+    ]
+    return _page(name, "<table class=\"details\">" + "".join(
+        f"<tr><th>{escape(key)}</th><td>{escape(value)}</td></tr>" for key, value in details
+    ) + "</table>")
+
+def scholarships_page() -> str:
+    records = [
+        ["Merit Scholarship", "50000", "Above 85% in 12th", "2024-07-31", "Yes"],
+        ["Need-based Scholarship", "30000", "Family income < 2 LPA", "2024-08-15", "Yes"],
+        ["Post Matric Scholarship", "25000", "SC/ST/OBC students", "2024-10-31", "Yes"],
+        ["Girl Child Scholarship", "40000", "Female students in STEM", "2024-09-15", "No"]
+    ]
+    return _page("National Scholarships", _table(["Name", "Amount", "Eligibility", "Deadline", "Renewable"], records))
+
+def exams_page() -> str:
+    records = [
+        ["JEE Main", "2024-03-01", "2024-03-31", "2024-04-15", "650", "12th pass with PCM"],
+        ["NEET", "2024-02-15", "2024-03-15", "2024-05-05", "1500", "12th pass with PCB"],
+        ["CUET", "2024-02-20", "2024-03-26", "2024-05-15", "750", "12th pass"],
+        ["CLAT", "2024-07-01", "2024-11-03", "2024-12-01", "4000", "12th pass with 45%"]
+    ]
+    return _page("Entrance Examinations", _table(
+        ["Name", "Registration Start", "Registration End", "Exam Date", "Application Fee", "Eligibility"], records
+    ))
+
+def create_fixture_app(latency_ms: float = 0, jitter_ms: float = 0, error_rate: float = 0.0,
+                       nirf_rows: int = 1000, seed: int = 0) -> web.Application:
+    """Build the fixture app; stats about served requests are kept in app["stats"]"""
+    rng = random.Random(seed)
+    stats: Dict[str, int] = {"requests": 0, "errors": 0, "not_modified": 0}
+    pages = {
+        "nirf": nirf_page(nirf_rows),
+        "scholarships": scholarships_page(),
+        "exams": exams_page()
+    }
+
+    @web.middleware
+    async def chaos(request: web.Request, handler):
+        stats["requests"] += 1
+        delay = max(latency_ms + rng.uniform(-jitter_ms, jitter_ms), 0) / 1000
+        if delay:
+            await asyncio.sleep(delay)
+        if request.path != "/robots.txt" and rng.random() < error_rate:
+            stats["errors"] += 1
+            raise web.HTTPServiceUnavailable(text="Injected fixture error")
+        return await handler(request)
+
+    def respond(request: web.Request, html: str) -> web.Response:
+        etag = '"' + hashlib.md5(html.encode("utf-8")).hexdigest() + '"'
+        if request.headers.get("If-None-Match") == etag:
+            stats["not_modified"] += 1
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(text=html, content_type="text/html", headers={"ETag": etag})
+
+    async def robots(request: web.Request) -> web.Response:
+        return web.Response(text="User-agent: *\nDisallow: /private\n")
+
+    async def nirf(request: web.Request) -> web.Response:
+        return respond(request, pages["nirf"])
+
+    async def college(request: web.Request) -> web.Response:
+        return respond(request, college_page(unquote(request.match_info["name"])))
+
+    async def scholarships(request: web.Request) -> web.Response:
+        return respond(request, pages["scholarships"])
+
+    async def exams(request: web.Request) -> web.Response:
+        return respond(request, pages["exams"])
+
+    app = web.Application(middlewares=[chaos])
+    app["stats"] = stats
+    app.router.add_get("/robots.txt", robots)
+    app.router.add_get("/nirf/rankings", nirf)
+    app.router.add_get("/colleges/{name}", college)
+    app.router.add_get("/scholarships", scholarships)
+    app.router.add_get("/exams", exams)
+    return app
+
+def scraper_env(base_url: str) -> Dict[str, str]:
+    """Environment settings that point WebScraperService at a fixture server"""
+    return {
+        "SCRAPER_URL_NIRF": f"{base_url}/nirf/rankings",
+        "SCRAPER_URL_COLLEGE": f"{base_url}/colleges/{{college}}",
+        "SCRAPER_URL_SCHOLARSHIPS": f"{base_url}/scholarships",
+        "SCRAPER_URL_EXAMS": f"{base_url}/exams"
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve canned scraper pages")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--nirf-rows", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for name, value in scraper_env(f"http://{args.host}:{args.port}").items():
+        print(f"{name}={value}")
+    web.run_app(
+        create_fixture_app(args.latency_ms, args.jitter_ms, args.error_rate, args.nirf_rows, args.seed),
+        host=args.host, port=args.port
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Aptitude grading benchmark
+Compares the per-question Python loop with the NumPy batch engine on a synthetic exam session, without a database
+
+    python -m benchmarks.grading_benchmark --submissions 5000 --questions 500 --per-test 30
+"""
+
+import argparse
+import json
+import random
+import time
+from typing import Any, Dict, List
+from app.services.grading import grade_submissions
+from app.services.question_bank import AnswerKey
+
+CATEGORIES = ["logical", "numerical", "verbal", "spatial"]
+
+def _session(submissions: int, questions: int, per_test: int, seed: int):
+    rng = random.Random(seed)
+    answer_keys = {
+        f"q{i}": AnswerKey(rng.randrange(4), CATEGORIES[i % len(CATEGORIES)], rng.choice(["easy", "medium", "hard"]))
+        for i in range(questions)
+    }
+    question_ids = list(answer_keys)
+    answer_sets = [
+        {question_id: rng.randrange(4) for question_id in rng.sample(question_ids, per_test)}
+        for _ in range(submissions)
+    ]
+    return answer_keys, answer_sets
+
+def _grade_loop(answer_sets: List[Dict[str, Any]], answer_keys: Dict[str, AnswerKey]) -> List[Dict[str, Any]]:
+    # The per-question loop submit_aptitude_test used before the batch engine
+    graded = []
+    for answers in answer_sets:
+        correct_answers = 0
+        category_scores = {}
+        for question_id, user_answer in answers.items():
+            key = answer_keys[question_id]
+            scores = category_scores.setdefault(key.category, {"correct": 0, "total": 0})
+            scores["total"] += 1
+            if user_answer == key.correct_answer:
+                correct_answers += 1
+                scores["correct"] += 1
+        for scores in category_scores.values():
+            scores["percentage"] = (scores["correct"] / scores["total"]) * 100
+        graded.append({"score": (correct_answers / len(answers)) * 100, "category_scores": category_scores})
+    return graded
+
+def _time(func, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def run(args) -> Dict[str, Any]:
+    answer_keys, answer_sets = _session(args.submissions, args.questions, args.per_test, args.seed)
+
+    loop = _grade_loop(answer_sets, answer_keys)
+    engine = grade_submissions(answer_sets, answer_keys, chunk_size=args.chunk_size)
+    mismatches = sum(
+        1 for expected, result in zip(loop, engine)
+        if expected["score"] != result.score or expected["category_scores"] != result.category_scores
+    )
+
+    loop_seconds = _time(lambda: _grade_loop(answer_sets, answer_keys), args.repeats)
+    engine_seconds = _time(lambda: grade_submissions(answer_sets, answer_keys, chunk_size=args.chunk_size), args.repeats)
+    return {
+        "submissions": args.submissions,
+        "questions": args.questions,
+        "per_test": args.per_test,
+        "mismatches": mismatches,
+        "python_loop": {
+            "seconds": round(loop_seconds, 4),
+            "submissions_per_second": round(args.submissions / loop_seconds, 1)
+        },
+        "numpy_engine": {
+            "seconds": round(engine_seconds, 4),
+            "submissions_per_second": round(args.submissions / engine_seconds, 1)
+        }
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark aptitude grading")
+    parser.add_argument("--submissions", type=int, default=5000)
+    parser.add_argument("--questions", type=int, default=500)
+    parser.add_argument("--per-test", type=int, default=30)
+    parser.add_argument("--chunk-size", type=int, default=8192)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"{report['submissions']} submissions, {report['per_test']} of {report['questions']} questions each, "
+          f"{report['mismatches']} mismatches between the two graders")
+    for name in ("python_loop", "numpy_engine"):
+        values = report[name]
+        print(f"  {name:<13} {values['seconds']:>8} s  {values['submissions_per_second']:>10} submissions/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Scraper benchmark against the offline fixture server
+Reports fetch throughput, parse time per page and end-to-end DataAggregator latency without network access
+
+    python -m benchmarks.scraper_benchmark --pages 200 --concurrency 20 --latency-ms 20
+    python -m benchmarks.scraper_benchmark --mode record --cassettes /tmp/cassettes
+    python -m benchmarks.scraper_benchmark --mode replay --cassettes /tmp/cassettes
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from typing import Any, Callable, Dict, List
+from aiohttp import web
+from benchmarks.fixture_server import create_fixture_app, scraper_env
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+def _summary(durations: List[float]) -> Dict[str, float]:
+    return {
+        "mean_ms": round(statistics.mean(durations) * 1000, 2),
+        "p50_ms": round(_percentile(durations, 0.5) * 1000, 2),
+        "p95_ms": round(_percentile(durations, 0.95) * 1000, 2)
+    }
+
+def _configure(base_url: str, mode: str, cassettes: str):
+    # Settings are read when the scraper modules are imported, so set them first
+    os.environ.update(scraper_env(base_url))
+    os.environ.update({
+        "SCRAPER_MODE": mode,
+        "SCRAPER_CASSETTE_DIR": cassettes,
+        # Measure the scraper itself rather than politeness pacing and caches
+        "SCRAPER_HOST_RATE": "100000",
+        "SCRAPER_HOST_BURST": "100000",
+        "PAGE_CACHE_ENABLED": "false",
+        "SCRAPED_DATA_STORE_ENABLED": "false"
+    })
+
+async def _fetch_throughput(scraper, url: str, pages: int, concurrency: int) -> Dict[str, Any]:
+    from app.services.html_parser import parse_table
+
+    semaphore = asyncio.Semaphore(concurrency)
+    errors = 0
+
+    async def fetch_one():
+        nonlocal errors
+        async with semaphore:
+            try:
+                await scraper.fetch_parsed(url, parse_table)
+            except Exception:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(fetch_one() for _ in range(pages)))
+    elapsed = time.perf_counter() - start
+    return {
+        "pages": pages,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "pages_per_second": round(pages / elapsed, 1)
+    }
+
+def _parse_times(pages: Dict[str, str], repeats: int) -> Dict[str, Any]:
+    from app.services import html_parser
+
+    results = {}
+    for name, html in pages.items():
+        timings = {}
+        parsers = {"beautifulsoup": html_parser._parse_table_soup}
+        if html_parser.etree is not None:
+            parsers["lxml_streaming"] = html_parser._parse_table_streaming
+        for parser_name, parse in parsers.items():
+            durations = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                parse(html, 0, None)
+                durations.append(time.perf_counter() - start)
+            timings[parser_name] = _summary(durations)
+        results[name] = {"bytes": len(html), **timings}
+    return results
+
+async def _aggregator_latency(aggregator, iterations: int) -> Dict[str, Any]:
+    calls: Dict[str, Callable[[], Any]] = {
+        "college_data": lambda: aggregator.get_comprehensive_college_data("Institute of Technology 7"),
+        "market_insights": lambda: aggregator.get_market_insights("Engineering", "Delhi"),
+        "timeline": lambda: aggregator.get_timeline_data()
+    }
+    results = {}
+    for name, call in calls.items():
+        durations = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            await call()
+            durations.append(time.perf_counter() - start)
+        results[name] = _summary(durations)
+    return results
+
+async def run(args) -> Dict[str, Any]:
+    base_url = f"http://127.0.0.1:{args.port}"
+    _configure(base_url, args.mode, args.cassettes)
+
+    from app.services.web_scraper import DataAggregator, open_http_session, close_http_session
+    from app.services.html_parser import html_parser_pool
+
+    runner = None
+    fixture_app = create_fixture_app(args.latency_ms, args.jitter_ms, args.error_rate, args.nirf_rows, args.seed)
+    if args.mode != "replay":
+        runner = web.AppRunner(fixture_app)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", args.port).start()
+
+    await open_http_session()
+    try:
+        aggregator = DataAggregator()
+        scraper = aggregator.scraper
+        urls = scraper_env(base_url)
+        sample_pages = {
+            "nirf": urls["SCRAPER_URL_NIRF"],
+            "college": urls["SCRAPER_URL_COLLEGE"].format(college="Institute%20of%20Technology%207"),
+            "scholarships": urls["SCRAPER_URL_SCHOLARSHIPS"],
+            "exams": urls["SCRAPER_URL_EXAMS"]
+        }
+
+        report = {
+            "mode": args.mode,
+            "fixture": {
+                "latency_ms": args.latency_ms,
+                "jitter_ms": args.jitter_ms,
+                "error_rate": args.error_rate,
+                "nirf_rows": args.nirf_rows
+            },
+            "fetch": await _fetch_throughput(scraper, sample_pages["nirf"], args.pages, args.concurrency),
+            "aggregator": await _aggregator_latency(aggregator, args.iterations)
+        }
+
+        html = {}
+        for name, url in sample_pages.items():
+            if args.mode == "replay":
+                html[name] = await scraper.recorder.load(url)
+            else:
+                async with (await scraper.get_session()).get(url) as response:
+                    html[name] = await response.text()
+        report["parse"] = _parse_times(html, args.parse_repeats)
+        report["fixture"]["requests_served"] = fixture_app["stats"]["requests"]
+        report["fixture"]["errors_injected"] = fixture_app["stats"]["errors"]
+        report["recorder"] = {"recorded": scraper.recorder.recorded, "replayed": scraper.recorder.replayed}
+        report["html_parser"] = html_parser_pool.get_stats()
+        return report
+    finally:
+        await close_http_session()
+        html_parser_pool.shutdown()
+        if runner is not None:
+            await runner.cleanup()
+
+def _print_report(report: Dict[str, Any]):
+    fetch = report["fetch"]
+    print(f"Mode: {report['mode']}  fixture: {report['fixture']}")
+    print(f"\nFetch + parse NIRF page: {fetch['pages_per_second']} pages/s "
+          f"({fetch['pages']} pages, {fetch['errors']} errors, {fetch['seconds']}s)")
+    print("\nParse time per page:")
+    for name, timings in report["parse"].items():
+        parsers = ", ".join(
+            f"{parser} {values['mean_ms']} ms" for parser, values in timings.items() if parser != "bytes"
+        )
+        print(f"  {name:<13} {timings['bytes']:>9} bytes  {parsers}")
+    print("\nDataAggregator end-to-end latency:")
+    for name, values in report["aggregator"].items():
+        print(f"  {name:<16} mean {values['mean_ms']} ms  p50 {values['p50_ms']} ms  p95 {values['p95_ms']} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the web scraper against the offline fixture server")
+    parser.add_argument("--mode", choices=["live", "record", "replay"], default="live")
+    parser.add_argument("--cassettes", default="scrape_cassettes")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--parse-repeats", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--jitter-ms", type=float, default=5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--nirf-rows", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_report(report)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import pytest
+import pytest_asyncio
+from mongomock_motor import AsyncMongoMockClient
+from app.services import database
+from app.services.ai_agent import AgentOrchestrator, UserProfile
+from app.services.circuit_breaker import CircuitState
+from app.services.groq_service import groq_service
+
+PROFILE = UserProfile(
+    user_id="u1",
+    age=17,
+    grade="12",
+    interests=["biology"],
+    aptitude_scores={"logical": 70.0},
+    academic_performance={"biology": 90},
+    location={"state": "Kerala"},
+    career_goals=["doctor"],
+    personality_traits={"openness": 0.8}
+)
+
+@pytest_asyncio.fixture
+async def open_breaker(monkeypatch):
+    db = AsyncMongoMockClient().career_advisor
+    await db.courses.insert_one({"title": "MBBS"})
+    await db.colleges.insert_one({"name": "Government Medical College", "location": "Kerala"})
+    monkeypatch.setattr(database.db, "database", db)
+    monkeypatch.setattr(groq_service.breaker, "state", CircuitState.OPEN)
+    monkeypatch.setattr(groq_service.breaker, "_opened_at", float("inf"))
+    return groq_service.breaker
+
+@pytest.mark.asyncio
+async def test_open_breaker_answers_from_agent_fallbacks(open_breaker):
+    orchestrator = AgentOrchestrator()
+    results = await orchestrator.get_comprehensive_guidance(PROFILE)
+
+    assert set(results["agent_status"].values()) == {"completed"}
+    assert not results["partial"]
+    assert len(results["agent_responses"]) == len(orchestrator.agents)
+    for agent_type, agent in orchestrator.agents.items():
+        assert results["agent_responses"][agent_type.value]["reasoning"] == agent._fallback_response().reasoning
+    assert open_breaker.rejected >= len(orchestrator.agents)
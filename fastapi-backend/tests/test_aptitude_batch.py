@@ -0,0 +1,88 @@
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from mongomock_motor import AsyncMongoMockClient
+from pymongo.errors import BulkWriteError
+from app.routers import aptitude
+from app.services import database
+from app.services.question_bank import answer_key_cache
+
+QUESTIONS = [
+    {"_id": f"q{i}", "category": ["logical", "verbal"][i % 2], "difficulty": "easy", "correct_answer": i % 4}
+    for i in range(10)
+]
+
+@pytest_asyncio.fixture
+async def db(monkeypatch):
+    mock = AsyncMongoMockClient().career_advisor
+    await mock.aptitude_questions.insert_many(QUESTIONS)
+    monkeypatch.setattr(database.db, "database", mock)
+    monkeypatch.setattr(answer_key_cache, "keys", {})
+    return mock
+
+def submission(user_id, answers):
+    return {"user_id": user_id, "test_type": "general", "answers": answers, "time_taken": 60}
+
+@pytest.mark.asyncio
+async def test_batch_grades_saves_and_reports_failures(db):
+    await db.users.insert_one({"_id": "u1"})
+    response = await aptitude.submit_aptitude_tests_batch({"submissions": [
+        submission("u1", {"q0": 0, "q1": 1, "q2": 0}),
+        submission("u2", {"unknown": 1}),
+        {"user_id": "u3"},
+        submission("u1", {"q3": 3})
+    ]})
+
+    assert [result["index"] for result in response["results"]] == [0, 3]
+    assert response["results"][0]["correct_answers"] == 2
+    assert response["results"][0]["total_questions"] == 3
+    assert [item["index"] for item in response["failed"]] == [1, 2]
+    assert await db.aptitude_results.count_documents({}) == 2
+    user = await db.users.find_one({"_id": "u1"})
+    assert user["aptitude_results"] == [result["result_id"] for result in response["results"]]
+
+@pytest.mark.asyncio
+async def test_batch_reports_results_that_could_not_be_saved(db):
+    await db.users.insert_many([{"_id": "u1"}, {"_id": "u2"}])
+    # A unique index makes the second result for u1 fail while the others are inserted
+    await db.aptitude_results.create_index("user_id", unique=True)
+    response = await aptitude.submit_aptitude_tests_batch({"submissions": [
+        submission("u1", {"q0": 0}),
+        submission("u1", {"q1": 1}),
+        submission("u2", {"q2": 2})
+    ]})
+
+    saved = {result["index"]: result["result_id"] for result in response["results"]}
+    assert sorted(saved) == [0, 2]
+    assert [item["index"] for item in response["failed"]] == [1]
+    assert (await db.users.find_one({"_id": "u1"}))["aptitude_results"] == [saved[0]]
+    assert (await db.users.find_one({"_id": "u2"}))["aptitude_results"] == [saved[2]]
+
+@pytest.mark.asyncio
+async def test_batch_rejects_oversized_batches(db, monkeypatch):
+    monkeypatch.setattr(aptitude, "BATCH_MAX_SUBMISSIONS", 2)
+    with pytest.raises(HTTPException) as error:
+        await aptitude.submit_aptitude_tests_batch({"submissions": [submission("u", {"q0": 0})] * 3})
+    assert error.value.status_code == 413
+
+@pytest.mark.asyncio
+async def test_batch_reports_users_whose_results_were_not_linked(db, monkeypatch):
+    await db.users.insert_many([{"_id": "u1"}, {"_id": "u2"}])
+    users = type(db.users)
+    bulk_write = users.bulk_write
+
+    async def fail_first(self, requests, **kwargs):
+        # Update every user but the first, as an unordered bulk write with one write error would
+        await bulk_write(self, requests[1:], **kwargs)
+        raise BulkWriteError({"writeErrors": [{"index": 0, "errmsg": "write failed"}]})
+
+    monkeypatch.setattr(users, "bulk_write", fail_first)
+    response = await aptitude.submit_aptitude_tests_batch({"submissions": [
+        submission("u1", {"q0": 0}),
+        submission("u2", {"q2": 2})
+    ]})
+
+    assert [result["index"] for result in response["results"]] == [0, 1]
+    assert response["unlinked_users"] == ["u1"]
+    assert response["stats"]["unlinked_users"] == 1
+    assert (await db.users.find_one({"_id": "u2"}))["aptitude_results"] == [response["results"][1]["result_id"]]
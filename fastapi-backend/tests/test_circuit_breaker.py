@@ -0,0 +1,82 @@
+from types import SimpleNamespace
+import pytest
+from app.services import circuit_breaker
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError, CircuitState
+from app.services.llm_scheduler import LLMQueueFullError
+
+class UpstreamError(Exception):
+    pass
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(circuit_breaker, "time", SimpleNamespace(monotonic=lambda: now.value))
+    return now
+
+def make_breaker() -> CircuitBreaker:
+    return CircuitBreaker("test", failure_rate_threshold=0.5, minimum_calls=4, window_size=4,
+                          open_seconds=30, half_open_max_calls=2)
+
+async def call(breaker: CircuitBreaker, error: BaseException = None):
+    async with breaker.guard():
+        if error is not None:
+            raise error
+
+async def trip(breaker: CircuitBreaker):
+    for _ in range(4):
+        with pytest.raises(UpstreamError):
+            await call(breaker, UpstreamError())
+
+@pytest.mark.asyncio
+async def test_opens_at_failure_rate_and_rejects(clock):
+    breaker = make_breaker()
+    await trip(breaker)
+    assert breaker.state == CircuitState.OPEN
+    with pytest.raises(CircuitOpenError):
+        await call(breaker)
+    assert breaker.rejected == 1
+
+@pytest.mark.asyncio
+async def test_half_open_closes_after_successful_trials(clock):
+    breaker = make_breaker()
+    await trip(breaker)
+    clock.value += 31
+    await call(breaker)
+    assert breaker.state == CircuitState.HALF_OPEN
+    await call(breaker)
+    assert breaker.state == CircuitState.CLOSED
+
+@pytest.mark.asyncio
+async def test_half_open_failure_reopens(clock):
+    breaker = make_breaker()
+    await trip(breaker)
+    clock.value += 31
+    with pytest.raises(UpstreamError):
+        await call(breaker, UpstreamError())
+    assert breaker.state == CircuitState.OPEN
+    assert breaker.times_opened == 2
+    with pytest.raises(CircuitOpenError):
+        await call(breaker)
+
+@pytest.mark.asyncio
+async def test_half_open_limits_trials_and_returns_local_refusals(clock):
+    breaker = make_breaker()
+    await trip(breaker)
+    clock.value += 31
+
+    # Two trials in flight use up the half-open budget
+    first, second = breaker.guard(), breaker.guard()
+    await first.__aenter__()
+    await second.__aenter__()
+    with pytest.raises(CircuitOpenError):
+        await call(breaker)
+
+    # A trial refused locally gives its place back instead of counting as a verdict
+    error = LLMQueueFullError("full")
+    with pytest.raises(LLMQueueFullError):
+        if not await second.__aexit__(LLMQueueFullError, error, None):
+            raise error
+    assert breaker.state == CircuitState.HALF_OPEN
+    await call(breaker)
+    await first.__aexit__(None, None, None)
+    assert breaker.state == CircuitState.CLOSED
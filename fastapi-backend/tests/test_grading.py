@@ -0,0 +1,86 @@
+import random
+from typing import Any, Dict, List, Optional
+from app.services.grading import grade_submissions
+from app.services.question_bank import AnswerKey
+
+CATEGORIES = ["logical", "numerical", "verbal", "spatial"]
+
+def grade_loop(answers: Dict[str, Any], answer_keys: Dict[str, AnswerKey]) -> Optional[Dict[str, Any]]:
+    """The per-question loop submit_aptitude_test graded with before the batch engine"""
+    correct_answers = 0
+    total_questions = 0
+    category_scores = {}
+    for question_id, user_answer in answers.items():
+        key = answer_keys.get(question_id)
+        if key is None:
+            continue
+        total_questions += 1
+        scores = category_scores.setdefault(key.category, {"correct": 0, "total": 0})
+        scores["total"] += 1
+        if user_answer == key.correct_answer:
+            correct_answers += 1
+            scores["correct"] += 1
+    if not total_questions:
+        return None
+    for scores in category_scores.values():
+        scores["percentage"] = (scores["correct"] / scores["total"]) * 100
+    return {
+        "correct_answers": correct_answers,
+        "total_questions": total_questions,
+        "score": (correct_answers / total_questions) * 100,
+        "category_scores": category_scores
+    }
+
+def assert_same(answer_sets: List[Dict[str, Any]], answer_keys: Dict[str, AnswerKey], **options):
+    graded = grade_submissions(answer_sets, answer_keys, **options)
+    assert len(graded) == len(answer_sets)
+    for answers, result in zip(answer_sets, graded):
+        expected = grade_loop(answers, answer_keys)
+        if expected is None:
+            assert result is None
+        else:
+            assert result is not None
+            assert result.__dict__ == expected
+
+def test_matches_loop_on_random_session():
+    rng = random.Random(0)
+    answer_keys = {
+        f"q{i}": AnswerKey(rng.randrange(4), CATEGORIES[i % len(CATEGORIES)], "easy") for i in range(200)
+    }
+    question_ids = list(answer_keys)
+    answer_sets = [
+        {question_id: rng.randrange(4) for question_id in rng.sample(question_ids, rng.randint(1, 40))}
+        for _ in range(500)
+    ]
+    # A small chunk size exercises the chunk boundaries too
+    assert_same(answer_sets, answer_keys, chunk_size=64)
+
+def test_unknown_question_ids_are_not_counted():
+    answer_keys = {"q1": AnswerKey(1, "logical", "easy"), "q2": AnswerKey(2, "verbal", "easy")}
+    answer_sets = [
+        {"q1": 1, "missing": 1, "q2": 0},
+        {"missing": 1, "also-missing": 2},
+        {}
+    ]
+    assert_same(answer_sets, answer_keys)
+    graded = grade_submissions(answer_sets, answer_keys)
+    assert graded[0].total_questions == 2
+    assert graded[1] is None and graded[2] is None
+
+def test_unhashable_answers_compare_like_the_loop():
+    answer_keys = {
+        "single": AnswerKey(2, "logical", "easy"),
+        "multi": AnswerKey([1, 3], "numerical", "medium"),
+        "matching": AnswerKey({"a": [1], "b": 2}, "verbal", "hard")
+    }
+    answer_sets = [
+        {"single": [2], "multi": [1, 3], "matching": {"b": 2, "a": [1]}},
+        {"single": 2, "multi": [3, 1], "matching": {"a": 1, "b": 2}},
+        {"single": {"value": 2}, "multi": 1, "matching": None},
+        {"single": 2.0, "multi": (1, 3)}
+    ]
+    assert_same(answer_sets, answer_keys)
+
+def test_empty_batch():
+    assert grade_submissions([], {"q1": AnswerKey(1, "logical", "easy")}) == []
+    assert grade_submissions([{"q1": 1}], {}) == [None]
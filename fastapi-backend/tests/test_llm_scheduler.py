@@ -0,0 +1,89 @@
+import asyncio
+import time
+import pytest
+from app.services.deadline import current_deadline, reset_deadline, set_deadline
+from app.services.llm_scheduler import LLMQueueFullError, LLMRequestExpiredError, Priority, PriorityLimiter, QueuePosition
+from app.services.single_flight import SingleFlight
+
+@pytest.mark.asyncio
+async def test_limiter_serves_higher_priority_first():
+    limiter = PriorityLimiter(max_concurrency=1, max_queue=10)
+    await limiter.acquire()
+    order = []
+
+    async def wait(name, priority):
+        await limiter.acquire(priority)
+        order.append(name)
+        limiter.release()
+
+    tasks = [asyncio.create_task(wait("batch", Priority.BATCH)), asyncio.create_task(wait("interactive", Priority.INTERACTIVE))]
+    await asyncio.sleep(0)
+    limiter.release()
+    await asyncio.gather(*tasks)
+    assert order == ["interactive", "batch"]
+
+@pytest.mark.asyncio
+async def test_limiter_rejects_when_queue_full_and_expires_waiters():
+    limiter = PriorityLimiter(max_concurrency=1, max_queue=1)
+    await limiter.acquire()
+    waiter = asyncio.create_task(limiter.acquire(deadline=time.monotonic() + 0.05))
+    await asyncio.sleep(0)
+    with pytest.raises(LLMQueueFullError):
+        await limiter.acquire()
+    with pytest.raises(LLMRequestExpiredError):
+        await waiter
+
+@pytest.mark.asyncio
+async def test_queue_position_can_be_raised_while_waiting():
+    limiter = PriorityLimiter(max_concurrency=1, max_queue=10)
+    await limiter.acquire()
+    order = []
+
+    async def wait(name, priority=Priority.STANDARD, position=None):
+        await limiter.acquire(priority, position=position)
+        order.append(name)
+        limiter.release()
+
+    position = QueuePosition(Priority.BATCH)
+    tasks = [asyncio.create_task(wait("shared", position=position)), asyncio.create_task(wait("standard"))]
+    await asyncio.sleep(0)
+    position.raise_to(Priority.INTERACTIVE)
+    limiter.release()
+    await asyncio.gather(*tasks)
+    assert order == ["shared", "standard"]
+    assert limiter.get_stats()["queued"] == 0
+
+@pytest.mark.asyncio
+async def test_single_flight_runs_without_the_first_callers_deadline():
+    flight = SingleFlight()
+    seen = []
+
+    async def work():
+        seen.append(current_deadline())
+        await asyncio.sleep(0.05)
+        return "done"
+
+    token = set_deadline(0.01)
+    try:
+        first = asyncio.ensure_future(flight.do("key", work))
+    finally:
+        reset_deadline(token)
+    second = asyncio.ensure_future(flight.do("key", work))
+    assert await asyncio.gather(first, second) == ["done", "done"]
+    assert seen == [None]
+    assert flight.get_stats()["coalesced"] == 1
+
+@pytest.mark.asyncio
+async def test_single_flight_cancels_abandoned_calls():
+    flight = SingleFlight(cancel_abandoned=True)
+    started = asyncio.Event()
+
+    async def work():
+        started.set()
+        await asyncio.sleep(10)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(flight.do("key", work), 0.01)
+    await asyncio.sleep(0)
+    assert started.is_set()
+    assert flight.get_stats() == {"in_flight": 0, "executed": 1, "coalesced": 0, "abandoned": 1}
@@ -0,0 +1,45 @@
+import pytest
+from aiohttp import web
+from mongomock_motor import AsyncMongoMockClient
+from app.services import database
+from app.services.html_parser import parse_table
+from app.services.web_scraper import WebScraperService, close_http_session
+
+PAGE = "<table><tr><th>College</th><th>Rank</th></tr><tr><td>IIT Madras</td><td>1</td></tr></table>"
+
+def page_length(html: str) -> int:
+    return len(html)
+
+@pytest.mark.asyncio
+async def test_not_modified_pages_return_each_parsers_own_result(monkeypatch):
+    monkeypatch.setattr(database.db, "database", AsyncMongoMockClient().career_advisor)
+    statuses = []
+
+    async def page(request):
+        if request.headers.get("If-None-Match") == '"v1"':
+            statuses.append(304)
+            return web.Response(status=304)
+        statuses.append(200)
+        return web.Response(text=PAGE, content_type="text/html", headers={"ETag": '"v1"'})
+
+    app = web.Application()
+    app.router.add_get("/ranking", page)
+    app.router.add_get("/robots.txt", lambda request: web.Response(text=""))
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    try:
+        scraper = WebScraperService()
+        scraper.rate_limiter.rate = 1000
+        url = f"http://127.0.0.1:{port}/ranking"
+        table = await scraper.fetch_parsed(url, parse_table)
+        length = await scraper.fetch_parsed(url, page_length)
+
+        assert await scraper.fetch_parsed(url, parse_table) == table
+        assert await scraper.fetch_parsed(url, page_length) == length == len(PAGE)
+        assert statuses == [200, 200, 304, 304]
+    finally:
+        await close_http_session()
+        await runner.cleanup()
@@ -0,0 +1,45 @@
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from pymongo import ASCENDING, DESCENDING
+from app.services.pagination import InvalidCursorError, decode_cursor, fetch_page, keyset_filter, with_id
+
+def test_keyset_filter_after_null_ascending():
+    # Nulls sort first ascending: after a null ranking come the other nulls with a larger _id, then any ranking
+    assert keyset_filter([("ranking", ASCENDING), ("_id", ASCENDING)], {"ranking": None, "_id": 5}) == {"$or": [
+        {"ranking": {"$ne": None}},
+        {"ranking": None, "_id": {"$gt": 5}}
+    ]}
+
+def test_keyset_filter_after_null_descending():
+    # Nulls sort last descending, so only nulls with a smaller _id remain
+    assert keyset_filter([("ranking", DESCENDING), ("_id", DESCENDING)], {"ranking": None, "_id": 5}) == {"$or": [
+        {"ranking": None, "_id": {"$lt": 5}},
+        {"ranking": None, "_id": None}
+    ]}
+
+def test_keyset_filter_descending_value_includes_nulls():
+    clauses = keyset_filter([("ranking", DESCENDING), ("_id", DESCENDING)], {"ranking": 3, "_id": 5})["$or"]
+    assert {"ranking": None} in clauses
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("direction", [ASCENDING, DESCENDING])
+async def test_cursor_pages_walk_every_document_once(direction):
+    collection = AsyncMongoMockClient().test.colleges
+    await collection.insert_many([
+        {"_id": i, "ranking": None if i % 4 == 0 else i % 7} for i in range(1, 41)
+    ] + [{"_id": 41}])
+    sort = [("ranking", direction)]
+    expected = [doc["_id"] for doc in await collection.find({}).sort(with_id(sort)).to_list(length=None)]
+
+    seen = []
+    cursor = None
+    while True:
+        page, cursor = await fetch_page(collection, {}, sort, 6, cursor)
+        seen.extend(doc["_id"] for doc in page)
+        if cursor is None:
+            break
+    assert seen == expected
+
+def test_decode_cursor_rejects_garbage():
+    with pytest.raises(InvalidCursorError):
+        decode_cursor("not-a-cursor")
@@ -0,0 +1,28 @@
+import random
+from app.services.question_bank import AnswerKey, AnswerKeyCache, allocate
+
+def test_allocate_splits_evenly():
+    allocation = allocate(9, {"easy": 10, "medium": 10, "hard": 10}, random.Random(0))
+    assert allocation == {"easy": 3, "medium": 3, "hard": 3}
+
+def test_allocate_moves_a_short_stratum_share_to_the_others():
+    allocation = allocate(12, {"easy": 1, "medium": 10, "hard": 10}, random.Random(0))
+    assert allocation["easy"] == 1
+    assert sum(allocation.values()) == 12
+    assert abs(allocation["medium"] - allocation["hard"]) <= 1
+
+def test_allocate_never_exceeds_what_is_available():
+    allocation = allocate(20, {"easy": 2, "medium": 0, "hard": 5}, random.Random(0))
+    assert allocation == {"easy": 2, "medium": 0, "hard": 5}
+
+def test_answer_key_cache_applies_change_events():
+    cache = AnswerKeyCache()
+    cache.keys = {"q1": AnswerKey(1, "logical", "easy"), "q2": AnswerKey(2, "verbal", "easy")}
+    assert cache._apply({
+        "operationType": "update",
+        "documentKey": {"_id": "q1"},
+        "fullDocument": {"_id": "q1", "correct_answer": 3, "category": "logical", "difficulty": "hard"}
+    })
+    assert cache._apply({"operationType": "delete", "documentKey": {"_id": "q2"}})
+    assert cache.keys == {"q1": AnswerKey(3, "logical", "hard")}
+    assert not cache._apply({"operationType": "invalidate"})
@@ -0,0 +1,40 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from app.services import database
+from app.services.scraped_store import ScrapedDataStore
+
+@dataclass
+class Item:
+    source: str
+    data_type: str
+    content: Dict[str, Any]
+    scraped_at: datetime
+    confidence: float
+
+def items(*sources):
+    return [Item(source, "job_market", {"from": source}, datetime.utcnow(), 0.9) for source in sources]
+
+@pytest.mark.asyncio
+async def test_refresh_replaces_sources_missing_from_the_new_scrape(monkeypatch):
+    db = AsyncMongoMockClient().career_advisor
+    monkeypatch.setattr(database.db, "database", db)
+    store = ScrapedDataStore(fresh_for={"job_market": 3600})
+    params = {"field": "medicine"}
+
+    async def both():
+        return items("naukri", "ncs")
+
+    async def only_ncs():
+        return items("ncs")
+
+    await store.refresh("job_market", params, both)
+    # Age the stored entries, then scrape again with one source gone
+    await db.scraped_data.update_many({}, {"$set": {"updated_at": datetime.utcnow() - timedelta(hours=2)}})
+    await store.refresh("job_market", params, only_ncs)
+
+    stored = await store.get("job_market", params, only_ncs, Item)
+    assert [item.source for item in stored.items] == ["ncs"]
+    assert not stored.stale
@@ -0,0 +1,16 @@
+import pytest
+
+from app.services.semantic_cache import SemanticCache
+
+@pytest.mark.asyncio
+async def test_paraphrase_hits():
+    cache = SemanticCache()
+    await cache.store("What are the career options after 12th science?", "answer")
+    assert await cache.lookup("what are the careers options after 12th science") == "answer"
+
+@pytest.mark.asyncio
+async def test_swapped_topic_word_misses():
+    cache = SemanticCache()
+    await cache.store("How to become a doctor in India", "answer")
+    assert await cache.lookup("How to become a doctor in India?") == "answer"
+    assert await cache.lookup("How to become a doctor in USA") is None